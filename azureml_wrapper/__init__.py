@@ -1,5 +1,32 @@
-__all__ = ["WorkspaceWrapper", "PipelineWrapper", "PipelineStep", "ScriptWrapper"]
-from .workspace_wrapper import WorkspaceWrapper
-from .pipeline_wrapper import PipelineWrapper
-from .pipeline_step import PipelineStep
-from .script_wrapper import ScriptWrapper
+"""Les wrappers sont importés à la première utilisation (PEP 562), pour qu'un script de step qui n'utilise que ScriptWrapper
+n'importe ni azureml.pipeline, ni azureml.data, ni pandas au démarrage."""
+from typing import Any, List, TYPE_CHECKING
+import importlib
+
+__all__ = ["WorkspaceWrapper", "WorkspaceRegistry", "PipelineWrapper", "PipelineStep", "ScriptWrapper", "RunMonitor"]
+
+_MODULES = {"WorkspaceWrapper": ".workspace_wrapper",
+            "WorkspaceRegistry": ".workspace_wrapper",
+            "PipelineWrapper": ".pipeline_wrapper",
+            "PipelineStep": ".pipeline_step",
+            "ScriptWrapper": ".script_wrapper",
+            "RunMonitor": ".run_monitor"}
+
+if TYPE_CHECKING:
+    from .workspace_wrapper import WorkspaceWrapper, WorkspaceRegistry
+    from .pipeline_wrapper import PipelineWrapper
+    from .pipeline_step import PipelineStep
+    from .script_wrapper import ScriptWrapper
+    from .run_monitor import RunMonitor
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_MODULES[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(list(globals()) + __all__)
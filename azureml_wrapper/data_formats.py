@@ -0,0 +1,504 @@
+from __future__ import annotations
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Union, TYPE_CHECKING
+import json
+import operator
+import os
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+DEFAULT_CHUNKSIZE = 100_000
+SCHEMA_SUFFIX = ".schema.json"
+# Un filtre est une liste de conditions (colonne, opérateur, valeur), toutes vraies pour qu'une ligne soit gardée. Ex: [("annee", ">=", 2020)]
+Filters = List[Tuple[str, str, Any]]
+COMPARISONS = {"==": operator.eq, "!=": operator.ne, "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+FILTER_OPERATORS = [*COMPARISONS, "in", "not in"]
+
+
+class ChunkWriter():
+    """Écrit un fichier morceau par morceau, sans jamais garder plus d'un DataFrame en mémoire. S'utilise comme context manager.
+        Si persist_schema est vrai, le schéma du premier morceau est écrit à côté du fichier (voir write_schema()). Pour les
+        formats typés, schema (un schéma pyarrow, voir unify_schemas()) impose les types des colonnes plutôt que ceux du premier morceau.
+    """
+
+    def __init__(self, path: str, index: bool = False, compression: Union[str, None] = None) -> None:
+        self.path = path
+        self.index = index
+        self.compression = compression
+        self.persist_schema = False
+        self.schema: Any = None
+        self.rows = 0
+
+    def write(self, dataframe: pd.DataFrame) -> None:
+        if self.rows == 0 and self.persist_schema:
+            write_schema(dataframe, self.path)
+        self._write(dataframe)
+        self.rows += len(dataframe)
+
+    def _write(self, dataframe: pd.DataFrame) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> ChunkWriter:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+class DataFormat():
+    """Format de fichier utilisé pour passer des DataFrames d'une étape du pipeline à l'autre.
+        Les lectures acceptent une projection (columns), des filtres (filters, voir Filters) et des dtypes explicites (dtypes).
+    """
+    name = ""
+    extension = ""
+    # Les compressions supportées et le suffixe qu'elles ajoutent au nom du fichier
+    compressions: Dict[str, str] = {}
+    # Vrai si le fichier conserve lui-même les dtypes, auquel cas aucun schéma n'est écrit à côté
+    typed = False
+
+    def read(self, path: str, columns: Union[List[str], None] = None, filters: Union[Filters, None] = None,
+             dtypes: Union[Dict[str, str], None] = None) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def write(self, dataframe: pd.DataFrame, path: str, index: bool = False, compression: Union[str, None] = None) -> None:
+        raise NotImplementedError
+
+    def iter_read(self, path: str, chunksize: int = DEFAULT_CHUNKSIZE, columns: Union[List[str], None] = None,
+                  filters: Union[Filters, None] = None, dtypes: Union[Dict[str, str], None] = None) -> Iterator[pd.DataFrame]:
+        """Lit le fichier par morceaux d'au plus chunksize lignes."""
+        raise NotImplementedError
+
+    def open_writer(self, path: str, index: bool = False, compression: Union[str, None] = None) -> ChunkWriter:
+        """Retourne un ChunkWriter qui ajoute les morceaux reçus au fichier path."""
+        raise NotImplementedError
+
+    def arrow_schema(self, path: str) -> Any:
+        """Le schéma pyarrow du fichier, sans le lire. None si le format ne conserve pas les types."""
+        return None
+
+    def count_rows(self, path: str) -> int:
+        """Le nombre de lignes du fichier. Par défaut, le fichier est lu par morceaux."""
+        return sum(len(chunk) for chunk in self.iter_read(path))
+
+    def read_rows(self, path: str, start: int, stop: int) -> pd.DataFrame:
+        """Lit les lignes [start, stop[ du fichier. Par défaut, le fichier est lu par morceaux jusqu'à stop."""
+        import pandas as pd
+        chunks, offset = [], 0
+        for chunk in self.iter_read(path):
+            if offset + len(chunk) > start:
+                chunks.append(chunk.iloc[max(start - offset, 0):stop - offset])
+            offset += len(chunk)
+            if offset >= stop:
+                break
+        return pd.concat(chunks, ignore_index=True) if chunks else self.read(path).iloc[0:0]
+
+    def file_name(self, name: str, compression: Union[str, None] = None) -> str:
+        """Ajoute l'extension du format (et le suffixe de la compression) à name si elle n'y est pas déjà."""
+        suffix = self.compression_suffix(compression)
+        if name.endswith(self.extension + suffix):
+            return name
+        if name.endswith(self.extension):
+            return f"{name}{suffix}"
+        return f"{name}{self.extension}{suffix}"
+
+    def compression_suffix(self, compression: Union[str, None]) -> str:
+        if compression is None:
+            return ""
+        if compression not in self.compressions:
+            raise ValueError(f"La compression {compression} n'est pas supportée par le format {self.name}. Compressions possibles : {list(self.compressions)}.")
+        return self.compressions[compression]
+
+
+class CsvFormat(DataFormat):
+    """Csv, compressé en gzip ou zstd (nécessite zstandard) au besoin. Sans dtypes explicites, ceux du schéma écrit à côté du
+        fichier sont utilisés, sinon pandas les infère.
+    """
+    name = "csv"
+    extension = ".csv"
+    compressions = {"gzip": ".gz", "zstd": ".zst"}
+
+    def read(self, path: str, columns: Union[List[str], None] = None, filters: Union[Filters, None] = None,
+             dtypes: Union[Dict[str, str], None] = None) -> pd.DataFrame:
+        import pandas as pd
+        return apply_filters(pd.read_csv(path, **self._read_options(path, columns, filters, dtypes)), filters, columns)
+
+    def write(self, dataframe: pd.DataFrame, path: str, index: bool = False, compression: Union[str, None] = None,
+              header: bool = True) -> None:
+        self.compression_suffix(compression)
+        dataframe.to_csv(path, index=index, header=header, compression=compression)
+
+    def iter_read(self, path: str, chunksize: int = DEFAULT_CHUNKSIZE, columns: Union[List[str], None] = None,
+                  filters: Union[Filters, None] = None, dtypes: Union[Dict[str, str], None] = None) -> Iterator[pd.DataFrame]:
+        import pandas as pd
+        with pd.read_csv(path, chunksize=chunksize, **self._read_options(path, columns, filters, dtypes)) as reader:
+            for chunk in reader:
+                chunk = apply_filters(chunk, filters, columns)
+                if filters is None or len(chunk) > 0:
+                    yield chunk
+
+    def open_writer(self, path: str, index: bool = False, compression: Union[str, None] = None) -> ChunkWriter:
+        self.compression_suffix(compression)
+        return CsvChunkWriter(path, index, compression)
+
+    def read_rows(self, path: str, start: int, stop: int) -> pd.DataFrame:
+        import pandas as pd
+        return pd.read_csv(path, skiprows=range(1, start + 1), nrows=stop - start, **self._read_options(path, None, None, None))
+
+    @staticmethod
+    def _read_options(path: str, columns: Union[List[str], None], filters: Union[Filters, None],
+                      dtypes: Union[Dict[str, str], None]) -> Dict[str, Any]:
+        check_filters(filters)
+        options: Dict[str, Any] = {}
+        if columns is not None:
+            options["usecols"] = list(dict.fromkeys([*columns, *(column for column, _, _ in filters or [])]))
+        dtypes = dtypes if dtypes is not None else read_schema(path)
+        if dtypes:
+            dtypes = {column: dtype for column, dtype in dtypes.items() if columns is None or column in options["usecols"]}
+            options["parse_dates"] = [column for column, dtype in dtypes.items() if dtype.startswith("datetime64")]
+            options["dtype"] = {column: dtype for column, dtype in dtypes.items() if column not in options["parse_dates"]}
+        return options
+
+
+class ParquetFormat(DataFormat):
+    """Parquet, colonnaire et compressé. Les dtypes (catégories, dates, etc.) sont conservés d'une étape à l'autre. Seules les
+        colonnes demandées sont lues et les filtres sont appliqués à la lecture (les row groups exclus par leurs statistiques sont sautés).
+    """
+    name = "parquet"
+    extension = ".parquet"
+    compressions = {"snappy": "", "gzip": "", "zstd": "", "brotli": "", "lz4": "", "none": ""}
+    typed = True
+
+    def read(self, path: str, columns: Union[List[str], None] = None, filters: Union[Filters, None] = None,
+             dtypes: Union[Dict[str, str], None] = None) -> pd.DataFrame:
+        pq = _import_pyarrow("parquet")
+        check_filters(filters)
+        table = pq.read_table(path, columns=columns, filters=[tuple(condition) for condition in filters] if filters else None, memory_map=True)
+        return apply_dtypes(table.to_pandas(), dtypes)
+
+    def write(self, dataframe: pd.DataFrame, path: str, index: bool = False, compression: Union[str, None] = None) -> None:
+        pa = _import_pyarrow()
+        pq = _import_pyarrow("parquet")
+        self.compression_suffix(compression)
+        pq.write_table(pa.Table.from_pandas(dataframe, preserve_index=index), path, compression=compression or "snappy")
+
+    def iter_read(self, path: str, chunksize: int = DEFAULT_CHUNKSIZE, columns: Union[List[str], None] = None,
+                  filters: Union[Filters, None] = None, dtypes: Union[Dict[str, str], None] = None) -> Iterator[pd.DataFrame]:
+        pa = _import_pyarrow()
+        pq = _import_pyarrow("parquet")
+        check_filters(filters)
+        read_columns = list(dict.fromkeys([*columns, *(column for column, _, _ in filters or [])])) if columns is not None else None
+        for batch in pq.ParquetFile(path, memory_map=True).iter_batches(batch_size=chunksize, columns=read_columns):
+            table = select_table(pa.Table.from_batches([batch]), columns, filters)
+            if filters is None or table.num_rows > 0:
+                yield apply_dtypes(table.to_pandas(), dtypes)
+
+    def open_writer(self, path: str, index: bool = False, compression: Union[str, None] = None) -> ChunkWriter:
+        self.compression_suffix(compression)
+        return ParquetChunkWriter(path, index, compression)
+
+    def arrow_schema(self, path: str) -> Any:
+        return _import_pyarrow("parquet").read_schema(path)
+
+    def count_rows(self, path: str) -> int:
+        pq = _import_pyarrow("parquet")
+        return int(pq.ParquetFile(path).metadata.num_rows)
+
+    def read_rows(self, path: str, start: int, stop: int) -> pd.DataFrame:
+        """Seuls les row groups qui recoupent [start, stop[ sont lus."""
+        pq = _import_pyarrow("parquet")
+        parquet_file = pq.ParquetFile(path, memory_map=True)
+        row_groups, first_row, offset = [], 0, 0
+        for i in range(parquet_file.num_row_groups):
+            rows = parquet_file.metadata.row_group(i).num_rows
+            if offset < stop and offset + rows > start:
+                row_groups.append(i)
+                first_row = offset if len(row_groups) == 1 else first_row
+            offset += rows
+        if not row_groups:
+            return parquet_file.schema_arrow.empty_table().to_pandas()
+        return parquet_file.read_row_groups(row_groups).slice(start - first_row, stop - start).to_pandas()
+
+
+class ArrowFormat(DataFormat):
+    """Arrow IPC (Feather v2), non compressé par défaut (zstd ou lz4 possibles). La lecture est faite via un memory map, sans
+        copie du fichier en mémoire : seules les colonnes et les lignes demandées sont converties en DataFrame.
+    """
+    name = "arrow"
+    extension = ".arrow"
+    compressions = {"zstd": "", "lz4": ""}
+    typed = True
+
+    def read(self, path: str, columns: Union[List[str], None] = None, filters: Union[Filters, None] = None,
+             dtypes: Union[Dict[str, str], None] = None) -> pd.DataFrame:
+        pa = _import_pyarrow()
+        check_filters(filters)
+        with pa.memory_map(path, "r") as source:
+            return apply_dtypes(select_table(pa.ipc.open_file(source).read_all(), columns, filters).to_pandas(), dtypes)
+
+    def write(self, dataframe: pd.DataFrame, path: str, index: bool = False, compression: Union[str, None] = None) -> None:
+        pa = _import_pyarrow()
+        self.compression_suffix(compression)
+        table = pa.Table.from_pandas(dataframe, preserve_index=index)
+        with pa.OSFile(path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema, options=pa.ipc.IpcWriteOptions(compression=compression)) as writer:
+                writer.write_table(table)
+
+    def iter_read(self, path: str, chunksize: int = DEFAULT_CHUNKSIZE, columns: Union[List[str], None] = None,
+                  filters: Union[Filters, None] = None, dtypes: Union[Dict[str, str], None] = None) -> Iterator[pd.DataFrame]:
+        pa = _import_pyarrow()
+        check_filters(filters)
+        with pa.memory_map(path, "r") as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                for offset in range(0, batch.num_rows, chunksize):
+                    table = select_table(pa.Table.from_batches([batch.slice(offset, chunksize)]), columns, filters)
+                    if filters is None or table.num_rows > 0:
+                        yield apply_dtypes(table.to_pandas(), dtypes)
+
+    def open_writer(self, path: str, index: bool = False, compression: Union[str, None] = None) -> ChunkWriter:
+        self.compression_suffix(compression)
+        return ArrowChunkWriter(path, index, compression)
+
+    def arrow_schema(self, path: str) -> Any:
+        pa = _import_pyarrow()
+        with pa.memory_map(path, "r") as source:
+            return pa.ipc.open_file(source).schema
+
+    def count_rows(self, path: str) -> int:
+        pa = _import_pyarrow()
+        with pa.memory_map(path, "r") as source:
+            reader = pa.ipc.open_file(source)
+            return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+
+    def read_rows(self, path: str, start: int, stop: int) -> pd.DataFrame:
+        """Seules les lignes [start, stop[ sont converties en DataFrame, le reste du fichier n'est pas copié en mémoire."""
+        pa = _import_pyarrow()
+        with pa.memory_map(path, "r") as source:
+            return pa.ipc.open_file(source).read_all().slice(start, stop - start).to_pandas()
+
+
+class CsvChunkWriter(ChunkWriter):
+
+    def _write(self, dataframe: pd.DataFrame) -> None:
+        dataframe.to_csv(self.path, index=self.index, header=self.rows == 0, mode="w" if self.rows == 0 else "a", compression=self.compression)
+
+
+class ParquetChunkWriter(ChunkWriter):
+    """Chaque morceau devient un row group du fichier Parquet. Le schéma est fixé par schema ou par le premier morceau."""
+
+    def __init__(self, path: str, index: bool = False, compression: Union[str, None] = None) -> None:
+        super().__init__(path, index, compression)
+        self._writer: Any = None
+
+    def _write(self, dataframe: pd.DataFrame) -> None:
+        pa = _import_pyarrow()
+        if self._writer is None:
+            table = pa.Table.from_pandas(dataframe, schema=self.schema, preserve_index=self.index)
+            self._writer = _import_pyarrow("parquet").ParquetWriter(self.path, table.schema, compression=self.compression or "snappy")
+        else:
+            table = pa.Table.from_pandas(dataframe, schema=self._writer.schema, preserve_index=self.index)
+        self._writer.write_table(table)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+class ArrowChunkWriter(ChunkWriter):
+    """Chaque morceau devient un record batch du fichier Arrow IPC. Le schéma est fixé par schema ou par le premier morceau."""
+
+    def __init__(self, path: str, index: bool = False, compression: Union[str, None] = None) -> None:
+        super().__init__(path, index, compression)
+        self._sink: Any = None
+        self._writer: Any = None
+        self._schema: Any = None
+
+    def _write(self, dataframe: pd.DataFrame) -> None:
+        pa = _import_pyarrow()
+        if self._writer is None:
+            table = pa.Table.from_pandas(dataframe, schema=self.schema, preserve_index=self.index)
+            self._schema = table.schema
+            self._sink = pa.OSFile(self.path, "wb")
+            self._writer = pa.ipc.new_file(self._sink, table.schema, options=pa.ipc.IpcWriteOptions(compression=self.compression))
+        else:
+            table = pa.Table.from_pandas(dataframe, schema=self._schema, preserve_index=self.index)
+        self._writer.write_table(table)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._sink.close()
+            self._writer, self._sink = None, None
+
+
+FORMATS: Dict[str, DataFormat] = {data_format.name: data_format for data_format in [CsvFormat(), ParquetFormat(), ArrowFormat()]}
+DEFAULT_FORMAT = "csv"
+
+
+def register_format(data_format: DataFormat) -> None:
+    """Enregistre un format supplémentaire, utilisable ensuite par son nom dans ScriptWrapper et PipelineWrapper."""
+    if not isinstance(data_format, DataFormat):
+        raise TypeError("data_format doit être une instance de DataFormat.")
+    FORMATS[data_format.name] = data_format
+
+
+def get_format(name: Union[str, DataFormat]) -> DataFormat:
+    if isinstance(name, DataFormat):
+        return name
+    if name not in FORMATS:
+        raise ValueError(f"Le format {name} n'est pas supporté. Les formats possibles sont : {list(FORMATS)}.")
+    return FORMATS[name]
+
+
+def format_from_path(path: str) -> Union[DataFormat, None]:
+    """Retourne le format correspondant à l'extension de path (compressée ou non), None si l'extension n'est pas connue."""
+    for data_format in FORMATS.values():
+        if any(path.endswith(data_format.extension + suffix) for suffix in ["", *data_format.compressions.values()]):
+            return data_format
+    return None
+
+
+def compression_from_path(path: str) -> Union[str, None]:
+    """Retourne la compression indiquée par le suffixe de path (ex: "gzip" pour data.csv.gz), None s'il n'y en a pas."""
+    data_format = format_from_path(path)
+    if data_format is None:
+        return None
+    for compression, suffix in data_format.compressions.items():
+        if suffix and path.endswith(data_format.extension + suffix):
+            return compression
+    return None
+
+
+def find_file(folder: str, name: str, preferred: Union[str, DataFormat, None] = None) -> str:
+    """Trouve le fichier name dans folder en essayant d'abord le format preferred, puis tous les formats enregistrés.
+        Les versions compressées (ex: data.csv.gz) sont aussi trouvées.
+
+    Returns:
+        str: Le chemin du fichier trouvé
+    """
+    data_format = format_from_path(name)
+    if data_format is not None:
+        for suffix in dict.fromkeys(["", *data_format.compressions.values()]):
+            if os.path.exists(os.path.join(folder, name + suffix)):
+                return os.path.join(folder, name + suffix)
+        return os.path.join(folder, name)
+    candidates: List[DataFormat] = [get_format(preferred)] if preferred is not None else []
+    candidates.extend(data_format for data_format in FORMATS.values() if data_format not in candidates)
+    for data_format in candidates:
+        for suffix in dict.fromkeys(["", *data_format.compressions.values()]):
+            path = os.path.join(folder, data_format.file_name(name) + suffix)
+            if os.path.exists(path):
+                return path
+    raise FileNotFoundError(f"Aucun fichier {name} ({[data_format.extension for data_format in candidates]}) dans {folder}.")
+
+
+def shard_bounds(rows: int, shard_index: int, shard_count: int) -> Tuple[int, int]:
+    """Les lignes [start, stop[ du shard shard_index parmi shard_count, en parts contiguës et de tailles égales à une ligne près."""
+    return rows * shard_index // shard_count, rows * (shard_index + 1) // shard_count
+
+
+def schema_path(path: str) -> str:
+    return f"{path}{SCHEMA_SUFFIX}"
+
+
+def write_schema(dataframe: pd.DataFrame, path: str) -> None:
+    """Écrit les dtypes de dataframe à côté du fichier path (<path>.schema.json), pour que l'étape suivante n'ait pas à les inférer."""
+    with open(schema_path(path), "w") as schema_file:
+        json.dump({"columns": {str(column): dtype_name(dtype) for column, dtype in dataframe.dtypes.items()}}, schema_file, indent=2)
+
+
+def dtype_name(dtype: Any) -> str:
+    """Le nom de dtype à passer à pandas pour le retrouver, ex: "string[pyarrow]" plutôt que "string" pour les strings Arrow."""
+    if str(dtype) == "string" and getattr(dtype, "storage", None):
+        return f"string[{dtype.storage}]"
+    return str(dtype)
+
+
+def read_schema(path: str) -> Union[Dict[str, str], None]:
+    """Les dtypes écrits à côté du fichier path par write_schema(), par colonne. None s'il n'y a pas de schéma."""
+    if not os.path.exists(schema_path(path)):
+        return None
+    with open(schema_path(path)) as schema_file:
+        columns: Dict[str, str] = json.load(schema_file)["columns"]
+        return columns
+
+
+def unify_schemas(schemas: List[Any]) -> Any:
+    """Un schéma pyarrow compatible avec tous les schémas (ex: ceux des fichiers des shards). Une colonne nulle dans un fichier
+        prend le type des autres et des types numériques différents sont promus (int64 et double donnent double). None si un
+        des schémas est None (format non typé).
+
+    Raises:
+        pyarrow.ArrowTypeError: Si les types d'une colonne ne peuvent pas être réconciliés (ex: int64 et string)
+    """
+    if not schemas or any(schema is None for schema in schemas):
+        return None
+    pa = _import_pyarrow()
+    try:
+        unified = pa.unify_schemas(schemas, promote_options="permissive")
+    except TypeError:  # pyarrow < 14
+        unified = pa.unify_schemas(schemas)
+    return unified.remove_metadata()
+
+
+def check_filters(filters: Union[Filters, None]) -> None:
+    for condition in filters or []:
+        if len(condition) != 3 or condition[1] not in FILTER_OPERATORS:
+            raise ValueError(f"Le filtre {condition} est invalide. Un filtre est (colonne, opérateur, valeur) avec un opérateur parmi {FILTER_OPERATORS}.")
+
+
+def apply_filters(dataframe: pd.DataFrame, filters: Union[Filters, None], columns: Union[Iterable[str], None] = None) -> pd.DataFrame:
+    """Garde les lignes de dataframe qui respectent toutes les conditions de filters, puis les colonnes columns."""
+    if filters:
+        mask = None
+        for column, operator_name, value in filters:
+            if operator_name in COMPARISONS:
+                condition = COMPARISONS[operator_name](dataframe[column], value)
+            else:
+                condition = dataframe[column].isin(list(value))
+                condition = ~condition if operator_name == "not in" else condition
+            mask = condition if mask is None else mask & condition
+        dataframe = dataframe[mask].reset_index(drop=True)
+    return dataframe[list(columns)] if columns is not None else dataframe
+
+
+def select_table(table: Any, columns: Union[List[str], None], filters: Union[Filters, None]) -> Any:
+    """Comme apply_filters(), mais sur une Table pyarrow, avant sa conversion en DataFrame."""
+    if filters:
+        dataset = _import_pyarrow("dataset")
+        expression = None
+        for column, operator_name, value in filters:
+            if operator_name in COMPARISONS:
+                condition = COMPARISONS[operator_name](dataset.field(column), value)
+            else:
+                condition = dataset.field(column).isin(list(value))
+                condition = ~condition if operator_name == "not in" else condition
+            expression = condition if expression is None else expression & condition
+        table = table.filter(expression)
+    return table.select(columns) if columns is not None else table
+
+
+def apply_dtypes(dataframe: pd.DataFrame, dtypes: Union[Dict[str, str], None]) -> pd.DataFrame:
+    if not dtypes:
+        return dataframe
+    return dataframe.astype({column: dtype for column, dtype in dtypes.items() if column in dataframe.columns})
+
+
+def _import_pyarrow(submodule: Union[str, None] = None):  # type: ignore[no-untyped-def]
+    try:
+        import pyarrow
+        if submodule == "parquet":
+            import pyarrow.parquet
+            return pyarrow.parquet
+        if submodule == "dataset":
+            import pyarrow.dataset
+            return pyarrow.dataset
+        return pyarrow
+    except ImportError as e:
+        raise ImportError("Les formats parquet et arrow nécessitent pyarrow. Vous pouvez l'installer via : pip install pyarrow") from e
@@ -0,0 +1,71 @@
+from __future__ import annotations
+from typing import Any, List, Union
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from .local_cache import LocalCache
+
+
+class DatasetCache(LocalCache):
+    DEFAULT_DIRECTORY = os.environ.get("AZUREML_WRAPPER_DATASET_CACHE", os.path.join(tempfile.gettempdir(), "azureml_wrapper", "dataset_cache"))
+    DEFAULT_MAX_SIZE = int(os.environ.get("AZUREML_WRAPPER_DATASET_CACHE_SIZE", 10 * 1024 ** 3))
+
+    def __init__(self, directory: Union[str, None] = None, max_size: int = DEFAULT_MAX_SIZE) -> None:
+        """Cache sur le disque local du noeud des Datasets tabulaires lus par les steps, par nom et version de Dataset. Le
+            dossier étant propre au noeud et non à la Run, les steps et les Runs successives qui s'exécutent sur le même noeud
+            relisent le Dataset du disque plutôt que du stockage Blob. Quand la taille totale dépasse max_size, les entrées les
+            moins récemment utilisées sont supprimées.
+
+        Args:
+            directory (str, optional): Le dossier du cache. Defaults to $AZUREML_WRAPPER_DATASET_CACHE ou <tmp>/azureml_wrapper/dataset_cache.
+            max_size (int, optional): La taille maximale du cache, en octets. Defaults to $AZUREML_WRAPPER_DATASET_CACHE_SIZE ou 10 Go.
+        """
+        super().__init__(directory, max_size)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(name: str, dataset: Any) -> str:
+        """La clé d'un Dataset : son nom et sa version, ou son id s'il n'est pas enregistré."""
+        version = getattr(dataset, "version", None)
+        identity = f"{getattr(dataset, 'name', None) or name}:{version}" if version is not None else f"{name}:{getattr(dataset, 'id', None)}"
+        return f"{name}-{hashlib.sha256(identity.encode()).hexdigest()[:16]}"
+
+    def fetch(self, name: str, dataset: Any) -> List[str]:
+        """Les fichiers Parquet du Dataset, téléchargés dans le cache s'ils n'y sont pas déjà.
+
+        Args:
+            name (str): Le nom de l'input du Dataset
+            dataset (TabularDataset): Le Dataset, tel que reçu dans run.input_datasets
+
+        Returns:
+            List[str]: Les chemins locaux des fichiers Parquet, triés
+        """
+        key = self.key(name, dataset)
+        entry = os.path.join(self.directory, key)
+        metadata = self._metadata(key)
+        if metadata is not None:
+            self.hits += 1
+            metadata["last_access"] = time.time()
+            self._write_metadata(key, metadata)
+        else:
+            self.misses += 1
+            temporary_entry = f"{entry}.{os.getpid()}.{threading.get_ident()}.tmp"
+            shutil.rmtree(temporary_entry, ignore_errors=True)
+            dataset.to_parquet_files().download(target_path=os.path.join(temporary_entry, "files"), overwrite=True)
+            now = time.time()
+            metadata = {"name": name, "created": now, "last_access": now, "size": self._folder_size(temporary_entry)}
+            with open(os.path.join(temporary_entry, "metadata.json"), "w") as metadata_file:
+                json.dump(metadata, metadata_file)
+            try:
+                os.rename(temporary_entry, entry)
+            except OSError:
+                # Un autre step du noeud a mis le même Dataset en cache entre temps
+                shutil.rmtree(temporary_entry, ignore_errors=True)
+            self._evict(keep=key)
+        files = os.path.join(entry, "files")
+        return sorted(os.path.join(root, file_name) for root, _, file_names in os.walk(files) for file_name in file_names)
@@ -0,0 +1,82 @@
+from __future__ import annotations
+from typing import Dict, Iterable, List, Tuple, Union
+import threading
+
+from azureml.core import Dataset, Workspace
+from azureml.exceptions import UserErrorException
+
+
+class DatasetResolver():
+    """Résout d'un coup tous les Datasets nécessaires à la construction d'un pipeline : les Datasets sans version sont trouvés via
+        une seule énumération du Workspace et figés à leur dernière version, ceux avec une version ("nom:version") sont mis en cache
+        pour tout le processus puisqu'une version enregistrée ne change plus. Tous les Datasets manquants sont rapportés en même temps.
+    """
+    _pinned: Dict[Tuple[str, str, str, str, str], Dataset] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, workspace: Workspace) -> None:
+        self.ws = workspace
+        self.datasets: Dict[str, Dataset] = {}
+
+    @staticmethod
+    def parse(reference: str) -> Tuple[str, Union[str, None]]:
+        """Sépare une référence "nom" ou "nom:version" en (nom, version)."""
+        name, _, version = reference.partition(":")
+        return name, version or None
+
+    def resolve(self, references: Iterable[str]) -> Dict[str, Dataset]:
+        """Résout les références qui ne l'ont pas encore été.
+
+        Args:
+            references (Iterable[str]): Les Datasets à résoudre, sous la forme "nom" ou "nom:version"
+
+        Raises:
+            NameError: Avec la liste de tous les Datasets introuvables
+
+        Returns:
+            dict: Les Datasets résolus, par référence
+        """
+        references = list(references)
+        unresolved = sorted({reference for reference in references if reference not in self.datasets})
+        missing: List[str] = []
+        latest = [reference for reference in unresolved if self.parse(reference)[1] is None]
+        if latest:
+            registered = self.ws.datasets
+            for reference in latest:
+                if reference in registered:
+                    self.datasets[reference] = registered[reference]
+                else:
+                    missing.append(reference)
+        for reference in unresolved:
+            name, version = self.parse(reference)
+            if version is not None:
+                dataset = self._get_pinned(name, version)
+                if dataset is None:
+                    missing.append(reference)
+                else:
+                    self.datasets[reference] = dataset
+        if missing:
+            raise NameError(f"""Les Datasets {sorted(missing)} ne sont pas enregistrés dans le workspace {self.ws.name}
+                                du resource groupe {self.ws.resource_group} de l'id {self.ws.subscription_id}.
+                                Vous pouvez en enregistrer via la méthode register_csv().""")
+        return {reference: self.datasets[reference] for reference in references}
+
+    def get(self, reference: str) -> Dataset:
+        if reference not in self.datasets:
+            self.resolve([reference])
+        return self.datasets[reference]
+
+    @property
+    def versions(self) -> Dict[str, Union[int, None]]:
+        """La version figée de chaque Dataset résolu, par référence."""
+        return {reference: getattr(dataset, "version", None) for reference, dataset in self.datasets.items()}
+
+    def _get_pinned(self, name: str, version: str) -> Union[Dataset, None]:
+        key = (self.ws.subscription_id, self.ws.resource_group, self.ws.name, name, version)
+        with self._lock:
+            if key not in self._pinned:
+                try:
+                    self._pinned[key] = Dataset.get_by_name(self.ws, name=name, version=version)
+                except UserErrorException:
+                    return None
+            return self._pinned[key]
@@ -0,0 +1,164 @@
+"""Traitement incrémental des fichiers d'un Datastore : un manifeste, conservé dans le Datastore, garde l'état (etag, date de
+    modification et taille) des blobs déjà traités par un step. À chaque exécution, seuls les blobs nouveaux ou modifiés depuis
+    sont téléchargés et exposés au script.
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Union
+import datetime
+import json
+import os
+import posixpath
+import shutil
+import tempfile
+import time
+
+
+class DatastoreStorage():
+    """Accès aux blobs d'un Datastore Azure Blob (SDK v1)."""
+
+    def __init__(self, datastore: Any) -> None:
+        self.datastore = datastore
+
+    def list(self, prefix: str) -> Dict[str, Dict[str, Any]]:
+        """L'état (etag, modified en timestamp, size) de chaque blob sous prefix, par chemin."""
+        blobs = self.datastore.blob_service.list_blobs(self.datastore.container_name, prefix=prefix)
+        return {blob.name: {"etag": blob.properties.etag, "modified": _timestamp(blob.properties.last_modified),
+                            "size": blob.properties.content_length} for blob in blobs}
+
+    def download(self, name: str, folder: str) -> Union[str, None]:
+        """Télécharge le blob name (et seulement lui, pas les blobs dont le nom commence par name) dans folder et retourne son
+            chemin local, None s'il n'existe pas.
+        """
+        if not self.datastore.blob_service.exists(self.datastore.container_name, name):
+            return None
+        path = os.path.join(folder, *name.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.datastore.blob_service.get_blob_to_path(self.datastore.container_name, name, path)
+        return path
+
+    def upload(self, local_path: str, name: str) -> None:
+        """Téléverse le fichier local_path vers le blob name. Le fichier local doit avoir le même nom de base que le blob."""
+        self.datastore.upload_files([local_path], relative_root=os.path.dirname(local_path), target_path=posixpath.dirname(name),
+                                    overwrite=True, show_progress=False)
+
+
+class LocalStorage():
+    """Même interface que DatastoreStorage sur un dossier local (exécutions locales et tests). L'etag est dérivé de la date
+        de modification et de la taille du fichier.
+    """
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+
+    def list(self, prefix: str) -> Dict[str, Dict[str, Any]]:
+        blobs = {}
+        for folder, _, file_names in os.walk(self.root):
+            for file_name in file_names:
+                name = os.path.relpath(os.path.join(folder, file_name), self.root).replace(os.sep, "/")
+                if name.startswith(prefix):
+                    stat = os.stat(os.path.join(folder, file_name))
+                    blobs[name] = {"etag": f"{stat.st_mtime_ns}-{stat.st_size}", "modified": stat.st_mtime, "size": stat.st_size}
+        return blobs
+
+    def download(self, name: str, folder: str) -> Union[str, None]:
+        path = os.path.join(self.root, *name.split("/"))
+        return path if os.path.isfile(path) else None
+
+    def upload(self, local_path: str, name: str) -> None:
+        path = os.path.join(self.root, *name.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        shutil.copyfile(local_path, path)
+
+
+class IncrementalManifest():
+    def __init__(self, storage: Union[DatastoreStorage, LocalStorage], path: str, manifest_path: str) -> None:
+        """Le manifeste des blobs sous path déjà traités par un step.
+
+        Args:
+            storage (DatastoreStorage | LocalStorage): L'accès au Datastore
+            path (str): Le dossier du Datastore dont les blobs sont traités
+            manifest_path (str): Le chemin du manifeste dans le Datastore. Il doit être hors de path, sinon l'écriture du
+                                 manifeste déclencherait de nouveau une schédule On_blob_change sur path.
+        """
+        if not path_segments(path):
+            raise ValueError("path doit être un dossier du Datastore, pas sa racine.")
+        if is_within(manifest_path, path):
+            raise ValueError(f"Le manifeste {manifest_path} doit être hors du dossier traité {path}.")
+        self.storage = storage
+        self.path = path
+        self.manifest_path = manifest_path
+        self.blobs: Dict[str, Dict[str, Any]] = {}
+        self.watermark: Union[float, None] = None
+        self.history: List[Dict[str, Any]] = []
+        self._listing: Dict[str, Dict[str, Any]] = {}
+        self._folder = tempfile.mkdtemp(prefix="azureml_wrapper_incremental_")
+
+    def load(self) -> IncrementalManifest:
+        """Charge le manifeste du Datastore. Un manifeste absent équivaut à aucun blob traité."""
+        local_path = self.storage.download(self.manifest_path, os.path.join(self._folder, "manifest"))
+        if local_path is not None:
+            with open(local_path) as manifest_file:
+                manifest = json.load(manifest_file)
+            self.blobs = manifest["blobs"]
+            self.watermark = manifest.get("watermark")
+            self.history = manifest.get("history", [])
+        return self
+
+    def new_blobs(self) -> List[str]:
+        """Les blobs sous path nouveaux ou modifiés (etag, date ou taille différents) depuis le dernier commit(), triés."""
+        self._listing = self.storage.list(self.path)
+        return sorted(name for name, state in self._listing.items() if self.blobs.get(name) != state)
+
+    def download(self, names: List[str]) -> List[str]:
+        """Télécharge les blobs names (et seulement eux) et retourne leurs chemins locaux, dans le même ordre."""
+        paths = []
+        for name in names:
+            path = self.storage.download(name, os.path.join(self._folder, "blobs"))
+            if path is None:
+                raise FileNotFoundError(f"Le blob {name} n'existe plus dans le Datastore.")
+            paths.append(path)
+        return paths
+
+    def commit(self, names: List[str], run_id: Union[str, None] = None, partitions: Union[List[str], None] = None) -> None:
+        """Marque les blobs names comme traités et sauvegarde le manifeste dans le Datastore. À appeler une fois les outputs
+            écrits : si le step échoue avant, les blobs seront de nouveau exposés à la prochaine exécution.
+        """
+        for name in names:
+            self.blobs[name] = self._listing[name]
+        modified = [self.blobs[name]["modified"] for name in names if self.blobs[name].get("modified") is not None]
+        if modified:
+            self.watermark = max([*modified, *([self.watermark] if self.watermark is not None else [])])
+        self.history.append({"run_id": run_id, "time": time.time(), "blobs": len(names), "partitions": partitions or []})
+        local_path = os.path.join(self._folder, "commit", posixpath.basename(self.manifest_path))
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        with open(local_path, "w") as manifest_file:
+            json.dump({"path": self.path, "watermark": self.watermark, "blobs": self.blobs, "history": self.history}, manifest_file, indent=2)
+        self.storage.upload(local_path, self.manifest_path)
+
+    def cleanup(self) -> None:
+        shutil.rmtree(self._folder, ignore_errors=True)
+
+
+def default_manifest_path(step_name: str) -> str:
+    return f"_azureml_wrapper/manifests/{step_name}.json"
+
+
+def default_output_path(step_name: str) -> str:
+    """Le dossier fixe, dans le Datastore, des outputs d'un step incremental : les partitions s'y accumulent d'une Run à l'autre."""
+    return f"_azureml_wrapper/outputs/{step_name}"
+
+
+def path_segments(path: str) -> List[str]:
+    return [segment for segment in path.split("/") if segment]
+
+
+def is_within(path: str, folder: str) -> bool:
+    """Si le blob ou dossier path est dans folder (ou est folder), en comparant segment par segment : "data_2/x" n'est pas dans "data"."""
+    folder_segments = path_segments(folder)
+    return path_segments(path)[:len(folder_segments)] == folder_segments
+
+
+def _timestamp(value: Any) -> Union[float, None]:
+    if isinstance(value, datetime.datetime):
+        return value.timestamp()
+    return float(value) if value is not None else None
@@ -0,0 +1,67 @@
+from __future__ import annotations
+from typing import Any, Dict, Union
+import json
+import os
+import shutil
+
+
+class LocalCache():
+    DEFAULT_DIRECTORY = ""
+    DEFAULT_MAX_SIZE = 10 * 1024 ** 3
+
+    def __init__(self, directory: Union[str, None] = None, max_size: Union[int, None] = None) -> None:
+        """Base des caches sur le disque local (StepCache, DatasetCache) : un dossier par clé, contenant un metadata.json
+            (avec au moins last_access et size). Quand la taille totale dépasse max_size, les entrées les moins récemment
+            utilisées sont supprimées.
+
+        Args:
+            directory (str, optional): Le dossier du cache. Defaults to DEFAULT_DIRECTORY.
+            max_size (int, optional): La taille maximale du cache, en octets. Defaults to DEFAULT_MAX_SIZE.
+        """
+        self.directory = directory if directory is not None else self.DEFAULT_DIRECTORY
+        self.max_size = max_size if max_size is not None else self.DEFAULT_MAX_SIZE
+        os.makedirs(self.directory, exist_ok=True)
+
+    def clear(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def entries(self) -> Dict[str, Dict[str, Any]]:
+        """Les métadonnées de chaque entrée du cache, par clé. Les entrées en cours d'écriture (.tmp) sont ignorées."""
+        entries = {}
+        for key in os.listdir(self.directory):
+            if key.endswith(".tmp"):
+                continue
+            metadata = self._metadata(key)
+            if metadata is not None:
+                entries[key] = metadata
+        return entries
+
+    def size(self) -> int:
+        return sum(int(metadata["size"]) for metadata in self.entries().values())
+
+    def _evict(self, keep: str) -> None:
+        entries = self.entries()
+        total = sum(int(metadata["size"]) for metadata in entries.values())
+        for key, metadata in sorted(entries.items(), key=lambda entry: entry[1]["last_access"]):
+            if total <= self.max_size:
+                break
+            if key != keep:
+                shutil.rmtree(os.path.join(self.directory, key), ignore_errors=True)
+                total -= int(metadata["size"])
+
+    def _metadata(self, key: str) -> Union[Dict[str, Any], None]:
+        path = os.path.join(self.directory, key, "metadata.json")
+        if not os.path.exists(path):
+            return None
+        with open(path) as metadata_file:
+            metadata: Dict[str, Any] = json.load(metadata_file)
+            return metadata
+
+    def _write_metadata(self, key: str, metadata: Dict[str, Any]) -> None:
+        with open(os.path.join(self.directory, key, "metadata.json"), "w") as metadata_file:
+            json.dump(metadata, metadata_file)
+
+    @staticmethod
+    def _folder_size(folder: str) -> int:
+        return sum(os.path.getsize(os.path.join(root, file_name)) for root, _, file_names in os.walk(folder) for file_name in file_names)
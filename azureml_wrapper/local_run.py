@@ -0,0 +1,85 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Union, TYPE_CHECKING
+import json
+import os
+
+from .data_formats import FORMATS, format_from_path
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class LocalDataset():
+    """Remplace un Dataset tabulaire d'AzureML lors d'une exécution locale. Les données sont lues d'un fichier local."""
+
+    def __init__(self, name: str, path: str) -> None:
+        self.name = name
+        self.path = path
+        self.version = None
+        # Change quand le fichier est modifié, pour que DatasetCache ne serve pas une version périmée
+        self.id = f"{os.path.abspath(path)}:{os.path.getmtime(path) if os.path.exists(path) else None}"
+
+    def to_pandas_dataframe(self) -> pd.DataFrame:
+        if self.path.endswith(".pkl"):
+            import pandas as pd
+            return pd.read_pickle(self.path)
+        data_format = format_from_path(self.path)
+        if data_format is None:
+            raise ValueError(f"Le format du fichier {self.path} du Dataset {self.name} n'est pas supporté.")
+        return data_format.read(self.path)
+
+    def to_parquet_files(self) -> LocalDataset:
+        return self
+
+    def download(self, target_path: str, overwrite: bool = False) -> List[str]:
+        """Comme FileDataset.download() : écrit le Dataset en Parquet dans target_path et retourne la liste des fichiers."""
+        os.makedirs(target_path, exist_ok=True)
+        path = os.path.join(target_path, f"{self.name}.parquet")
+        FORMATS["parquet"].write(self.to_pandas_dataframe(), path)
+        return [path]
+
+
+class LocalRun():
+    """Remplace Run.get_context() quand un script est exécuté par le LocalRunner. Les métriques loggées sont écrites dans
+        metrics.json du dossier de la run, à l'appel de complete() ou fail().
+    """
+    ENV_VARIABLE = "AZUREML_WRAPPER_LOCAL_RUN"
+
+    def __init__(self, step_name: str, run_directory: str, input_datasets: Union[Dict[str, str], None] = None,
+                 datastores: Union[Dict[str, str], None] = None, dataset_paths: Union[Dict[str, str], None] = None) -> None:
+        self.id = f"local_{step_name}"
+        self.step_name = step_name
+        self.run_directory = run_directory
+        self.input_datasets: Dict[str, Any] = {name: LocalDataset(name, path) for name, path in (input_datasets or {}).items()}
+        # Les Datasets montés ou téléchargés sont reçus par leur chemin local, comme sur AzureML
+        self.input_datasets.update(dataset_paths or {})
+        # Les dossiers locaux qui remplacent les Datastores, par nom
+        self.datastores = dict(datastores or {})
+        self.metrics: Dict[str, Any] = {}
+        self.status = "Running"
+
+    @classmethod
+    def from_env(cls) -> LocalRun:
+        """Instancie la LocalRun décrite par le fichier JSON pointé par la variable d'environnement AZUREML_WRAPPER_LOCAL_RUN."""
+        with open(os.environ[cls.ENV_VARIABLE]) as spec_file:
+            spec = json.load(spec_file)
+        return cls(spec["step_name"], spec["run_directory"], spec.get("input_datasets"), spec.get("datastores"), spec.get("dataset_paths"))
+
+    def log(self, name: str, value: Any, description: str = "") -> None:
+        self.metrics.setdefault(name, []).append(value)
+
+    def log_row(self, name: str, description: Union[str, None] = None, **kwargs: Any) -> None:
+        self.metrics.setdefault(name, []).append(kwargs)
+
+    def complete(self) -> None:
+        self.status = "Completed"
+        self._write_metrics()
+
+    def fail(self, error_details: Any = None) -> None:
+        self.status = "Failed"
+        self._write_metrics()
+
+    def _write_metrics(self) -> None:
+        os.makedirs(self.run_directory, exist_ok=True)
+        with open(os.path.join(self.run_directory, "metrics.json"), "w") as metrics_file:
+            json.dump({"status": self.status, "metrics": self.metrics}, metrics_file, default=str)
@@ -0,0 +1,205 @@
+from __future__ import annotations
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Set, Union, TYPE_CHECKING
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+from azureml.data import OutputFileDatasetConfig
+from azureml.data.dataset_consumption_config import DatasetConsumptionConfig
+
+from .local_run import LocalRun
+from .naming import argument_name
+from .step_cache import StepCache, file_hash
+
+if TYPE_CHECKING:
+    from .pipeline_step import PipelineStep
+    from .pipeline_wrapper import PipelineWrapper
+
+
+class LocalRunner():
+    def __init__(self, pipeline: PipelineWrapper, working_directory: Union[str, None] = None, max_workers: Union[int, None] = None,
+                 datasets: Union[Dict[str, str], None] = None, python: str = sys.executable, cache: Union[StepCache, None] = None,
+                 datastores: Union[Dict[str, str], None] = None) -> None:
+        """Exécute localement les steps d'un PipelineWrapper, chacun dans son propre processus Python. Les steps indépendants roulent
+            en parallèle. Les OutputFileDatasetConfigs deviennent des dossiers locaux et Run.get_context() est remplacé par une LocalRun.
+
+        Args:
+            pipeline (PipelineWrapper): Le pipeline à exécuter
+            working_directory (str, optional): Le dossier où créer les inputs/outputs, logs et métriques. Defaults to un dossier temporaire.
+            max_workers (int, optional): Le nombre maximal de steps roulés en même temps. Defaults to os.cpu_count().
+            datasets (dict, optional): Des fichiers locaux (csv, parquet, arrow ou pkl) à utiliser à la place des Datasets du Workspace,
+                                       par nom de Dataset. Les Datasets non fournis sont téléchargés une seule fois. Defaults to None.
+            python (str, optional): L'exécutable Python à utiliser. Defaults to sys.executable.
+            cache (StepCache, optional): Si fourni, les steps dont le script, la config et les inputs n'ont pas changé ne sont pas
+                                         réexécutés : leurs outputs sont copiés du cache. Defaults to None.
+            datastores (dict, optional): Des dossiers locaux à utiliser à la place des Datastores des steps incremental, par nom
+                                         de Datastore. Defaults to <working_directory>/datastores/<nom>.
+        """
+        self.pipeline = pipeline
+        self.working_directory = os.path.abspath(working_directory) if working_directory is not None else tempfile.mkdtemp(prefix="azureml_wrapper_")
+        self.max_workers = max_workers if max_workers is not None else (os.cpu_count() or 1)
+        self.datasets = dict(datasets) if datasets is not None else {}
+        self.python = python
+        self.cache = cache
+        self.datastores = {name: os.path.abspath(folder) for name, folder in (datastores or {}).items()}
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.keys: Dict[str, str] = {}
+        self._output_paths: Dict[int, str] = {}
+        self._output_labels: Dict[int, str] = {}
+        self._producers: Dict[int, str] = {}
+        self._step_outputs: Dict[str, Dict[str, str]] = {}
+        self._dataset_ids: Dict[str, str] = {}
+
+    def run(self) -> Dict[str, Dict[str, Any]]:
+        """Exécute le pipeline et retourne, par step, son statut (Completed, Cached, Failed ou Skipped), sa durée,
+            son code de retour et le chemin de son log.
+
+        Raises:
+            RuntimeError: Si au moins un step a échoué. Les steps qui en dépendent ne sont pas exécutés.
+        """
+        steps = {step.name: step for step in self.pipeline.steps}
+        self._prepare_outputs()
+        self._prepare_datasets()
+        upstreams = {name: self._upstreams(step) for name, step in steps.items()}
+        pending = list(steps)
+        running: Dict[Future[Dict[str, Any]], str] = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                for name in list(pending):
+                    if any(self.results.get(upstream, {}).get("status") in ("Failed", "Skipped") for upstream in upstreams[name]):
+                        self.results[name] = {"status": "Skipped", "duration": 0.0, "returncode": None, "log": None}
+                        pending.remove(name)
+                    elif all(self.results.get(upstream, {}).get("status") in ("Completed", "Cached") for upstream in upstreams[name]):
+                        pending.remove(name)
+                        if self._restore_from_cache(steps[name]):
+                            self.results[name] = {"status": "Cached", "duration": 0.0, "returncode": None, "log": None}
+                        else:
+                            running[executor.submit(self._run_step, steps[name])] = name
+                if not running:
+                    if pending:
+                        continue
+                    break
+                finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    self.results[name] = future.result()
+                    if self.cache is not None and self.results[name]["status"] == "Completed":
+                        self.cache.put(self.keys[name], name, self._step_outputs.get(name, {}))
+        failed = [name for name, result in self.results.items() if result["status"] == "Failed"]
+        if failed:
+            raise RuntimeError(f"Les steps suivants ont échoué : {failed}. Voir leurs logs dans {os.path.join(self.working_directory, 'logs')}.")
+        return self.results
+
+    def output_path(self, step_name: str, output_name: Union[str, None] = None) -> str:
+        """Retourne le dossier local d'un output d'un step (celui de --output-folder si output_name est None)."""
+        return os.path.join(self.working_directory, "outputs", argument_name(step_name), argument_name(output_name or "output"))
+
+    def _prepare_outputs(self) -> None:
+        for step in self.pipeline.steps:
+            for i, arg in enumerate(step.arguments):
+                if isinstance(arg, OutputFileDatasetConfig):
+                    flag = str(step.arguments[i - 1]) if i > 0 else ""
+                    output_name = flag[len("--output-folder-"):] if flag.startswith("--output-folder-") else None
+                    path = self.output_path(step.name, output_name)
+                    if step.incremental:
+                        # Comme sur AzureML, les outputs d'un step incremental sont dans un dossier fixe de son Datastore
+                        datastore_root = self._local_datastores(step)[step.incremental["datastore"]]
+                        path = os.path.join(datastore_root, *f"{step.incremental['output']}/{arg.name}".split("/"))
+                    os.makedirs(path, exist_ok=True)
+                    self._output_paths[id(arg)] = path
+                    self._output_labels[id(arg)] = output_name or "output"
+                    self._producers[id(arg)] = step.name
+                    self._step_outputs.setdefault(step.name, {})[output_name or "output"] = path
+
+    def _prepare_datasets(self) -> None:
+        for step in self.pipeline.steps:
+            for arg in step.arguments:
+                if isinstance(arg, DatasetConsumptionConfig) and id(arg.dataset) not in self._output_paths and arg.name not in self.datasets:
+                    if getattr(arg, "mode", "direct") != "direct":
+                        # Un Dataset monté ou téléchargé est un FileDataset (Parquet) : il est téléchargé dans un dossier
+                        path = os.path.join(self.working_directory, "datasets", arg.name)
+                        arg.dataset.download(target_path=path, overwrite=True)
+                    else:
+                        path = os.path.join(self.working_directory, "datasets", f"{arg.name}.pkl")
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                        arg.dataset.to_pandas_dataframe().to_pickle(path)
+                    self.datasets[arg.name] = path
+                    if getattr(arg.dataset, "version", None) is not None:
+                        self._dataset_ids[arg.name] = f"{arg.name}:{arg.dataset.version}"
+
+    def _upstreams(self, step: PipelineStep) -> Set[str]:
+        return {self._producers[id(arg.dataset)] for arg in step.arguments
+                if isinstance(arg, DatasetConsumptionConfig) and id(arg.dataset) in self._producers}
+
+    def _restore_from_cache(self, step: PipelineStep) -> bool:
+        if self.cache is None:
+            return False
+        arguments: List[str] = []
+        inputs: Dict[str, str] = {}
+        for arg in step.arguments:
+            if isinstance(arg, OutputFileDatasetConfig):
+                arguments.append(f"<output:{self._output_labels[id(arg)]}>")
+            elif isinstance(arg, DatasetConsumptionConfig) and id(arg.dataset) in self._producers:
+                upstream, label = self._producers[id(arg.dataset)], self._output_labels[id(arg.dataset)]
+                arguments.append(f"<input:{upstream}:{label}>")
+                inputs[f"{upstream}:{label}"] = self.keys[upstream]
+            elif isinstance(arg, DatasetConsumptionConfig):
+                arguments.append(f"<dataset:{arg.name}>")
+                if arg.name not in self._dataset_ids:
+                    self._dataset_ids[arg.name] = file_hash(self.datasets[arg.name])
+                inputs[str(arg.name)] = self._dataset_ids[arg.name]
+            else:
+                arguments.append(str(arg))
+        self.keys[step.name] = self.cache.key(step.script_directory, step.script_name, arguments, inputs, step.extra_files)
+        if not step.allow_reuse:
+            # Un step non réutilisable (ex: incremental) produit de nouveaux outputs à chaque exécution : sa clé est unique pour que
+            # les steps qui en dépendent soient aussi réexécutés
+            self.keys[step.name] = f"{self.keys[step.name]}-{uuid.uuid4().hex}"
+            return False
+        return self.cache.restore(self.keys[step.name], self._step_outputs.get(step.name, {}))
+
+    def _local_argument(self, arg: Any, input_datasets: Dict[str, str], dataset_paths: Dict[str, str]) -> str:
+        if isinstance(arg, OutputFileDatasetConfig):
+            return self._output_paths[id(arg)]
+        if isinstance(arg, DatasetConsumptionConfig):
+            if id(arg.dataset) in self._output_paths:
+                return self._output_paths[id(arg.dataset)]
+            if getattr(arg, "mode", "direct") != "direct":
+                # Comme sur AzureML, un Dataset monté ou téléchargé est reçu par son chemin local
+                dataset_paths[arg.name] = os.path.abspath(self.datasets[arg.name])
+                return dataset_paths[arg.name]
+            input_datasets[arg.name] = os.path.abspath(self.datasets[arg.name])
+            return str(arg.name)
+        return str(arg)
+
+    def _local_datastores(self, step: PipelineStep) -> Dict[str, str]:
+        if not step.incremental:
+            return {}
+        name = step.incremental["datastore"]
+        return {name: self.datastores.get(name) or os.path.join(self.working_directory, "datastores", name)}
+
+    def _run_step(self, step: PipelineStep) -> Dict[str, Any]:
+        input_datasets: Dict[str, str] = {}
+        dataset_paths: Dict[str, str] = {}
+        arguments = [self._local_argument(arg, input_datasets, dataset_paths) for arg in step.arguments]
+        run_directory = os.path.join(self.working_directory, "runs", argument_name(step.name))
+        os.makedirs(run_directory, exist_ok=True)
+        spec_path = os.path.join(run_directory, "run.json")
+        with open(spec_path, "w") as spec_file:
+            json.dump({"step_name": step.name, "run_directory": run_directory, "input_datasets": input_datasets,
+                       "dataset_paths": dataset_paths, "datastores": self._local_datastores(step)}, spec_file)
+        log_path = os.path.join(self.working_directory, "logs", f"{argument_name(step.name)}.log")
+        os.makedirs(os.path.dirname(log_path), exist_ok=True)
+        package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        python_path = os.pathsep.join(path for path in [package_root, os.environ.get("PYTHONPATH", "")] if path)
+        start = time.perf_counter()
+        with open(log_path, "w") as log_file:
+            process = subprocess.run([self.python, step.script_name, *arguments], cwd=step.script_directory, stdout=log_file, stderr=subprocess.STDOUT,
+                                     env={**os.environ, LocalRun.ENV_VARIABLE: spec_path, "PYTHONPATH": python_path})
+        return {"status": "Completed" if process.returncode == 0 else "Failed", "duration": time.perf_counter() - start,
+                "returncode": process.returncode, "log": log_path}
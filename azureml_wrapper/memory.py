@@ -0,0 +1,82 @@
+from __future__ import annotations
+from typing import Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def optimize_dataframe(dataframe: pd.DataFrame, max_category_ratio: float = 0.5, arrow_strings: bool = True,
+                       downcast_floats: bool = True) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Réduit la mémoire occupée par dataframe sans perdre d'information :
+        - les entiers sont convertis dans le plus petit type (signé ou non) qui contient toutes leurs valeurs;
+        - les float64 deviennent float32 si toutes leurs valeurs y sont représentées exactement;
+        - les colonnes de texte dont le nombre de valeurs distinctes est au plus max_category_ratio fois le nombre de lignes
+          deviennent des catégories, les autres des strings Arrow (si pyarrow est installé et arrow_strings est vrai).
+
+    Args:
+        dataframe (pd.DataFrame): Le DataFrame à optimiser (il n'est pas modifié)
+        max_category_ratio (float, optional): Le ratio valeurs distinctes / lignes en dessous duquel une colonne de texte devient
+                                              une catégorie. Defaults to 0.5.
+        arrow_strings (bool, optional): Convertir les autres colonnes de texte en strings Arrow. Defaults to True.
+        downcast_floats (bool, optional): Convertir les float64 en float32 quand c'est sans perte. Defaults to True.
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: Le DataFrame optimisé et le rapport mémoire (voir memory_report())
+    """
+    import pandas as pd
+    if not 0 <= max_category_ratio <= 1:
+        raise ValueError("max_category_ratio doit être entre 0 et 1.")
+    string_dtype = _arrow_string_dtype() if arrow_strings else None
+    columns = []
+    for _, values in dataframe.items():
+        dtype = values.dtype
+        if pd.api.types.is_bool_dtype(dtype) or isinstance(dtype, pd.CategoricalDtype):
+            columns.append(values)
+        elif pd.api.types.is_integer_dtype(dtype):
+            non_null = values.dropna()
+            signed = len(non_null) > 0 and non_null.min() < 0
+            columns.append(pd.to_numeric(values, downcast="integer" if signed else "unsigned"))
+        elif pd.api.types.is_float_dtype(dtype):
+            downcast = values.astype("float32") if downcast_floats and dtype == "float64" else values
+            columns.append(downcast if downcast.astype(dtype).equals(values) else values)
+        elif pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+            non_null = values.dropna()
+            if not non_null.map(lambda value: isinstance(value, str)).all():
+                columns.append(values)
+            elif len(values) > 0 and values.nunique() <= max_category_ratio * len(values):
+                columns.append(values.astype("category"))
+            elif string_dtype is not None and not isinstance(dtype, pd.StringDtype):
+                columns.append(values.astype(string_dtype))
+            else:
+                columns.append(values)
+        else:
+            columns.append(values)
+    # Construit par position, pour conserver les colonnes de même nom
+    optimized = pd.concat(columns, axis=1) if columns else dataframe.copy()
+    optimized.columns = dataframe.columns
+    return optimized, memory_report(dataframe, optimized)
+
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
+    """La mémoire de chaque colonne avant et après optimisation, plus une ligne "total".
+
+    Returns:
+        pd.DataFrame: Par colonne : dtype_before, dtype_after, bytes_before, bytes_after et ratio (after / before)
+    """
+    import pandas as pd
+    bytes_before = before.memory_usage(deep=True, index=False)
+    bytes_after = after.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({"dtype_before": before.dtypes.astype(str), "dtype_after": after.dtypes.astype(str),
+                           "bytes_before": bytes_before, "bytes_after": bytes_after})
+    report.loc["total"] = ["", "", int(bytes_before.sum()), int(bytes_after.sum())]
+    report["ratio"] = report["bytes_after"] / report["bytes_before"].where(report["bytes_before"] > 0)
+    return report
+
+
+def _arrow_string_dtype():  # type: ignore[no-untyped-def]
+    try:
+        import pyarrow  # noqa: F401
+        import pandas as pd
+        return pd.StringDtype("pyarrow")
+    except (ImportError, TypeError, ValueError):
+        return None
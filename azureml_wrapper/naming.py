@@ -0,0 +1,11 @@
+import re
+
+
+def argument_name(name: str) -> str:
+    """Convertit un nom libre (nom de step, d'output, etc.) en suffixe d'argument de ligne de commande. Ex: "Test Step1" -> "test-step1"."""
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+def dest_name(argument: str) -> str:
+    """Convertit un argument de ligne de commande en nom d'attribut argparse. Ex: "--input-folder-step1" -> "input_folder_step1"."""
+    return argument.replace("--", "").replace("-", "_")
@@ -2,15 +2,25 @@ from __future__ import annotations
 from typing import Any, Dict, List, Union
 import json
 
+from azureml.core import Workspace
+
 from .workspace_wrapper import WorkspaceWrapper
+from .dataset_resolver import DatasetResolver
+from .incremental import default_manifest_path, default_output_path, is_within, path_segments
 
 
 class PipelineStep(WorkspaceWrapper):
     MANDATORY_CONFIGS = ["ws_name", "resource_group", "subscription_id", "step_name", "script_name"]
+    DATASET_MODES = ["direct", "mount", "download"]
 
     def __init__(self, ws_name: str, resource_group: str, subscription_id: str, step_name: str, script_name: str,
                  step_config: Union[Dict[str, Any], None] = None, input_datasets: Union[Dict[str, str], None] = None,
-                 script_directory: Union[str, None] = None) -> None:
+                 script_directory: Union[str, None] = None, workspace: Union[Workspace, None] = None,
+                 depends_on: Union[List[str], None] = None, outputs: Union[List[str], None] = None, allow_reuse: bool = True,
+                 dataset_resolver: Union[DatasetResolver, None] = None, shards: Union[int, None] = None,
+                 extra_files: Union[List[str], None] = None, incremental: Union[Dict[str, str], None] = None,
+                 compute_name: Union[str, None] = None, env_name: Union[str, None] = None, node_count: Union[int, None] = None,
+                 process_count: Union[int, None] = None, dataset_modes: Union[Dict[str, str], None] = None) -> None:
         """Créer une étape du Pipeline, les OutputFileDatasetConfigs sont créés automatiquement.
 
         Args:
@@ -18,23 +28,112 @@ class PipelineStep(WorkspaceWrapper):
             name (str): Le nom de l'étape
             script_name (str): Le nom du script python associé à rouler
             config (dict): Les configurations à passer au script python. Ils seront passés via l'argument: --config
+            workspace (Workspace, optional): Un Workspace déjà instancié (ex: celui du pipeline) à réutiliser. Defaults to None.
+            depends_on (list, optional): Les steps dont dépend ce step, sous la forme "nom du step" ou "nom du step:nom de l'output".
+                                         Si au moins un step du pipeline déclare depends_on ou outputs, le pipeline devient un DAG. Defaults to None.
+            outputs (list, optional): Les noms des outputs de ce step. Chacun est passé via l'argument --output-folder-<nom>. Defaults to None.
+            allow_reuse (bool, optional): Permettre à AzureML de réutiliser les résultats d'une run précédente identique. Defaults to True.
+            input_datasets (dict, optional): Les Datasets à passer au script, par argument. Un Dataset peut être figé à une version
+                                             via "nom:version". Defaults to None.
+            dataset_resolver (DatasetResolver, optional): Un DatasetResolver partagé par les steps du pipeline. Defaults to None.
+            shards (int, optional): Exécute le script shards fois en parallèle (un job par shard, répartis sur les noeuds du compute),
+                                    chacun recevant --shard-index et --shard-count. Un step de reduce concatène ensuite les outputs
+                                    des shards. Defaults to None.
+            extra_files (list, optional): Les fichiers, dossiers ou patterns glob (relatifs à script_directory) à ajouter au snapshot
+                                          minimal du step, en plus du script et de ses imports locaux (voir SnapshotBuilder). Defaults to None.
+            incremental (dict, optional): Traite seulement les blobs nouveaux ou modifiés d'un dossier d'un Datastore, sous la forme
+                                          {"datastore": "nom", "path": "dossier/", "manifest": "chemin du manifeste", "output":
+                                          "dossier des outputs"} (manifest et output sont optionnels, et hors de path). Le script
+                                          les obtient via ScriptWrapper.incremental_files(). Les outputs du step sont écrits dans
+                                          <output>/<nom de l'output> du même Datastore, un dossier fixe d'une Run à l'autre où
+                                          s'accumulent les partitions de ScriptWrapper.save_partition(). Le step n'est alors jamais
+                                          réutilisé par AzureML. Defaults to None.
+            compute_name (str, optional): Le ComputeTarget du step. Defaults to None (celui du pipeline).
+            env_name (str, optional): L'Environment du step. Defaults to None (celui du pipeline).
+            node_count (int, optional): Le nombre de noeuds du compute alloués au step. Defaults to None (1).
+            process_count (int, optional): Le nombre de processus par noeud. Au-delà d'un noeud ou d'un processus, le step est
+                                           lancé via MPI. Defaults to None (1).
+            dataset_modes (dict, optional): Le mode de livraison de chaque Dataset de input_datasets, par argument : "direct" (lu
+                                            du stockage Blob par le script), "mount" (monté sur le noeud) ou "download" (copié sur
+                                            le disque du noeud avant le script). En mount et download, un Dataset tabulaire est
+                                            livré en fichiers Parquet et le script reçoit le chemin local. Defaults to None (direct).
             #TODO
         """
-        super().__init__(ws_name, resource_group, subscription_id)
+        super().__init__(ws_name, resource_group, subscription_id, workspace)
         self.name = step_name
         if not script_name.endswith(".py"):
             script_name += ".py"
         self.script_name = script_name
         self.script_directory = script_directory if script_directory is not None else "."
         self.arguments = ["--config", json.dumps(step_config)] if isinstance(step_config, dict) else []
+        if depends_on is not None and not isinstance(depends_on, list):
+            raise TypeError("depends_on doit être une liste.")
+        if outputs is not None and (not isinstance(outputs, list) or len(set(outputs)) != len(outputs)):
+            raise TypeError("outputs doit être une liste de noms uniques.")
+        self.depends_on = depends_on
+        self.outputs = outputs
+        self.allow_reuse = allow_reuse
+        if shards is not None and (not isinstance(shards, int) or shards < 1):
+            raise ValueError("shards doit être un entier plus grand ou égal à 1.")
+        self.shards = shards
+        if extra_files is not None and not isinstance(extra_files, list):
+            raise TypeError("extra_files doit être une liste.")
+        self.extra_files = extra_files
+        for argument_name, value in [("compute_name", compute_name), ("env_name", env_name)]:
+            if value is not None and not isinstance(value, str):
+                raise TypeError(f"{argument_name} doit être un str.")
+        for argument_name, count in [("node_count", node_count), ("process_count", process_count)]:
+            if count is not None and (not isinstance(count, int) or count < 1):
+                raise ValueError(f"{argument_name} doit être un entier plus grand ou égal à 1.")
+        self.compute_name = compute_name
+        self.env_name = env_name
+        self.node_count = node_count
+        self.process_count = process_count
+        if incremental is not None:
+            if not isinstance(incremental, dict):
+                raise TypeError("incremental doit être un dict.")
+            missing_keys = [key for key in ["datastore", "path"] if key not in incremental]
+            if missing_keys:
+                raise KeyError(f"incremental doit contenir la (ou les) clée(s) suivante(s) : {missing_keys}.")
+            if shards is not None and shards > 1:
+                raise ValueError("Un step incremental ne peut pas être sharded : chaque shard écrirait son propre manifeste.")
+            if not path_segments(incremental["path"]):
+                raise ValueError("incremental path doit être un dossier du Datastore, pas sa racine.")
+            incremental = {**incremental, "manifest": incremental.get("manifest") or default_manifest_path(self.name),
+                           "output": incremental.get("output") or default_output_path(self.name)}
+            for key in ["manifest", "output"]:
+                if is_within(incremental[key], incremental["path"]):
+                    raise ValueError(f"incremental {key} ({incremental[key]}) doit être hors du dossier traité {incremental['path']}.")
+            self.arguments.extend(["--incremental-datastore", incremental["datastore"], "--incremental-path", incremental["path"],
+                                   "--incremental-manifest", incremental["manifest"]])
+            self.allow_reuse = False
+        self.incremental = incremental
+        dataset_modes = dataset_modes or {}
+        if not isinstance(dataset_modes, dict):
+            raise TypeError("dataset_modes doit être un dict.")
+        unknown_arguments = [arg for arg in dataset_modes if arg not in (input_datasets or {})]
+        if unknown_arguments:
+            raise KeyError(f"dataset_modes contient des arguments absents de input_datasets : {unknown_arguments}.")
+        for arg, mode in dataset_modes.items():
+            if mode not in self.DATASET_MODES:
+                raise ValueError(f"Le mode {mode} de {arg} n'est pas supporté. Soit : {self.DATASET_MODES}.")
+        self.dataset_modes = dataset_modes
         if isinstance(input_datasets, dict):
+            resolver = dataset_resolver if dataset_resolver is not None else DatasetResolver(self.ws)
+            datasets = resolver.resolve(input_datasets.values())
             for input_arg_name, input_arg in input_datasets.items():
-                data = self.ws.datasets.get(input_arg)
-                if data is None:
-                    raise NameError(f"""Le Dataset {input_arg} n'est pas enregistré dans le workspace {self.ws.name}
-                                    du resource groupe {self.ws.resource_group} de l'id {self.ws.subscription_id}.
-                                    Vous pouvez en enregistrer un via la méthode register_new_csv().""")
-                self.arguments.extend([input_arg_name, data.as_named_input(input_arg)])
+                self.arguments.extend([input_arg_name, self._consumption_config(datasets[input_arg], DatasetResolver.parse(input_arg)[0],
+                                                                                dataset_modes.get(input_arg_name, "direct"))])
+
+    @staticmethod
+    def _consumption_config(dataset: Any, name: str, mode: str) -> Any:
+        if mode == "direct":
+            return dataset.as_named_input(name)
+        # AzureML ne monte et ne télécharge que des FileDatasets : un Dataset tabulaire est d'abord matérialisé en Parquet
+        if hasattr(dataset, "to_parquet_files"):
+            dataset = dataset.to_parquet_files()
+        consumption_config = dataset.as_named_input(name)
+        return consumption_config.as_mount() if mode == "mount" else consumption_config.as_download()
 
     @property
     def arguments(self) -> List[Any]:
@@ -46,11 +145,24 @@ class PipelineStep(WorkspaceWrapper):
             self._args = new_args
 
     @classmethod
-    def from_config(cls, config: Dict[str, Any]) -> PipelineStep:
+    def validate_config(cls, config: Dict[str, Any]) -> List[str]:
+        """Valide config sans aucun appel à AzureML et retourne la liste des clés obligatoires manquantes."""
         if not isinstance(config, Dict):
             raise TypeError("config doit être un dict.")
-        missing_keys = [key for key in cls.MANDATORY_CONFIGS if key not in config]
+        if not isinstance(config.get("input_datasets", {}) or {}, Dict):
+            raise TypeError("input_datasets doit être un dict.")
+        return [key for key in cls.MANDATORY_CONFIGS if key not in config]
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], workspace: Union[Workspace, None] = None,
+                    dataset_resolver: Union[DatasetResolver, None] = None) -> PipelineStep:
+        missing_keys = cls.validate_config(config)
         if missing_keys:
             raise KeyError(f"Votre configuration doit contenir la (ou les) clée(s) suivante(s) : {missing_keys} pour être valide.")
         return cls(str(config.get("ws_name")), str(config.get("resource_group")), str(config.get("subscription_id")), str(config.get("step_name")),
-                   str(config.get("script_name")), config.get("step_config"), config.get("input_datasets"), config.get("script_directory"))
+                   str(config.get("script_name")), step_config=config.get("step_config"), input_datasets=config.get("input_datasets"),
+                   script_directory=config.get("script_directory"), workspace=workspace, depends_on=config.get("depends_on"),
+                   outputs=config.get("outputs"), allow_reuse=bool(config.get("allow_reuse", True)), dataset_resolver=dataset_resolver,
+                   shards=config.get("shards"), extra_files=config.get("extra_files"), incremental=config.get("incremental"),
+                   compute_name=config.get("compute_name"), env_name=config.get("env_name"), node_count=config.get("node_count"),
+                   process_count=config.get("process_count"), dataset_modes=config.get("dataset_modes"))
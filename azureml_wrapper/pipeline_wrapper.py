@@ -1,71 +1,288 @@
 from __future__ import annotations
-from typing import Any, Dict, List, Union, Optional
+from typing import Any, Dict, List, Set, Tuple, Union, Optional
+import copy
+import json
+import os
+import warnings
 
-from azureml.core import Datastore, Environment, Experiment
+from azureml.core import Dataset, Datastore, Environment, Experiment, Workspace
 from azureml.data import OutputFileDatasetConfig
+from azureml.data.dataset_consumption_config import DatasetConsumptionConfig
 from azureml.pipeline.steps import PythonScriptStep
-from azureml.pipeline.core import Pipeline, Schedule, ScheduleRecurrence
+from azureml.pipeline.core import Pipeline, PipelineRun, Schedule, ScheduleRecurrence
 from azureml.core.compute import ComputeTarget
 from azureml.core.compute_target import ComputeTargetException
-from azureml.core.runconfig import RunConfiguration
+from azureml.core.runconfig import MpiConfiguration, RunConfiguration
 
 from .workspace_wrapper import WorkspaceWrapper
 from .pipeline_step import PipelineStep
+from .data_formats import get_format
+from .naming import argument_name
+from .step_cache import StepCache
+from .dataset_resolver import DatasetResolver
+from .incremental import DatastoreStorage
+from .run_history import RunHistory
+from .run_monitor import PipelineRunHandle
+from .script_wrapper import CHECKPOINT_FILE
+from .snapshot import SnapshotBuilder
 
 
 class PipelineWrapper(WorkspaceWrapper):
     MANDATORY_CONFIGS = ["ws_name", "resource_group", "subscription_id", "env_name", "compute_name", "steps"]
     POSSIBLE_SCHEDULES = ["On_blob_change", "Minute", "Hour", "Day", "Week", "Month"]
+    CHECKPOINT_ROOT = "azureml_wrapper/checkpoints"
+    CHECKPOINT_TAG = "azureml_wrapper_checkpoints"
 
     def __init__(self, ws_name: str, resource_group: str, subscription_id: str, env_name: str, compute_name: str,
-                 steps: List[PipelineStep]) -> None:
+                 steps: List[PipelineStep], workspace: Union[Workspace, None] = None, data_format: Union[str, None] = None,
+                 snapshot_builder: Union[SnapshotBuilder, None] = None, checkpoint_datastore: Union[str, bool, None] = None,
+                 history: Union[str, bool, RunHistory, None] = None) -> None:
 
         """Wrap autour des la mécanique des Pipelines du AzureML sdk afin d'éviter à avoir à refaire la poutine à toutes les fois.
             Simplement spécifier les différents nom et entrer une liste contenant votre ou vos steps. ATTENTION, un OutputFileDatasetConfig
             est automatiquement passé entre vos steps (si plus qu'un) et il est accessible via les arguments --input-folder et --output-folder.
+            Si des steps déclarent depends_on ou outputs, les steps sont plutôt reliés selon leurs dépendances (DAG) et les branches
+            indépendantes roulent en parallèle. Les steps avec shards sont exécutés en shards parallèles suivis d'un step de reduce.
             Pour plus de détails, voir la documentation.
 
         Args:
             ws_name (str): Le nom du Workspace
             resource_group (str): Le nom du Resource Group
             subscription_id (str): L'id de l'utilisateur
-            env_name (str): Le nom de l'Environment (doit être enregistré dans le Workspace ws_name)
-            compute_name (str): Le nom du ComputeTarget.
+            env_name (str): Le nom de l'Environment (doit être enregistré dans le Workspace ws_name). Un step peut en préciser un autre.
+            compute_name (str): Le nom du ComputeTarget. Un step peut en préciser un autre (ex: un petit cluster CPU pour la
+                                préparation et un cluster GPU pour l'entraînement).
             steps (list): Liste des PipelineStep du Pipeline
+            workspace (Workspace, optional): Un Workspace déjà instancié à réutiliser. Defaults to None.
+            data_format (str, optional): Le format des fichiers passés entre les steps ("csv", "parquet" ou "arrow"). Il est passé aux
+                                         scripts via l'argument --data-format et utilisé par défaut par ScriptWrapper. Defaults to None.
+            snapshot_builder (SnapshotBuilder, optional): Si fourni, chaque step est soumis avec un snapshot minimal (son script, ses
+                                                          imports locaux et ses extra_files) plutôt qu'avec tout son script_directory.
+                                                          La taille et le temps de construction de chaque snapshot sont dans
+                                                          self.snapshots. Defaults to None.
+            checkpoint_datastore (str | bool, optional): Si fourni, les outputs des steps sont conservés dans ce Datastore (True pour
+                                                         celui par défaut du Workspace), sous un chemin propre à ce pipeline,
+                                                         pour qu'une Run échouée puisse être reprise via resume(). Defaults to None.
+            history (str | bool | RunHistory, optional): Si fourni, les durées et volumes de données des steps de chaque Run
+                                                         terminée par run() sont enregistrés dans cet historique (le chemin du
+                                                         fichier SQLite, ou True pour celui par défaut). Voir RunHistory. Defaults to None.
 
         """
         if not isinstance(steps, list):
             raise TypeError("steps doit être une liste, même si elle ne contient qu'un step.")
-        super().__init__(ws_name, resource_group, subscription_id)
-        self.run_config = RunConfiguration()
-        self.run_config.environment = Environment.get(self.ws, env_name)
-        try:
-            self.compute = ComputeTarget(workspace=self.ws, name=compute_name)
-        except ComputeTargetException as e:
-            raise TypeError(f"""Le compute {compute_name} n'est pas enregistré dans le Workspace {self.ws.name}.
-                            Vous pouvez le faire via la méthode register_compute().""") from e
+        super().__init__(ws_name, resource_group, subscription_id, workspace)
+        self.env_name = env_name
+        self.compute_name = compute_name
+        self._computes: Dict[str, Any] = {}
+        self._environments: Dict[str, Environment] = {}
+        self._run_configs: Dict[Tuple[str, str, int, int], RunConfiguration] = {}
+        self.run_config = self.get_run_config(compute_name, env_name)
+        self.compute = self.get_compute(compute_name)
         self._run: Optional[Experiment] = None
-        self.run_config.target = self.compute
+        if checkpoint_datastore is True:
+            self.checkpoint_datastore = self.ws.get_default_datastore()
+        else:
+            self.checkpoint_datastore = Datastore.get(self.ws, checkpoint_datastore) if checkpoint_datastore else None
+        if history is True:
+            history = RunHistory()
+        self.history = RunHistory(history) if isinstance(history, str) else history or None
+        self._output_names: Set[str] = set()
         self.steps = steps
+        self.data_format = get_format(data_format).name if data_format is not None else None
         self.pipeline_steps: List[PythonScriptStep] = []
-        self.folder = OutputFileDatasetConfig()
         for step in self.steps:
             if not isinstance(step, PipelineStep):
                 raise TypeError("Le paramètre step doit être un instance de la classe PipelineStep.")
             if self.ws.name != step.ws.name:
                 raise ValueError(f"Le Workspace du paramètre step ({step.ws.name}) doit être le même que celui du pipeline ({self.ws.name})")
+        if any(step.depends_on is not None or step.outputs is not None for step in self.steps):
+            self._connect_dag()
+        else:
+            self._connect_linear()
+        if any(step.shards is not None and step.shards > 1 for step in self.steps):
+            self._expand_shards()
+        self.snapshots: Dict[str, Dict[str, Any]] = {}
+        self.snapshot_builder = snapshot_builder
+        for step in self.steps:
+            if self.data_format is not None:
+                step.arguments.extend(["--data-format", self.data_format])
+            self.pipeline_steps.append(self._python_script_step(step, step.arguments))
+
+    def _python_script_step(self, step: PipelineStep, arguments: List[Any]) -> PythonScriptStep:
+        source_directory = step.script_directory
+        if self.snapshot_builder is not None:
+            self.snapshots[step.name] = self.snapshot_builder.build(step.script_directory, step.script_name, step.extra_files)
+            source_directory = self.snapshots[step.name]["path"]
+        run_config = self.get_run_config(step.compute_name or self.compute_name, step.env_name or self.env_name, step.node_count or 1,
+                                         step.process_count or 1)
+        return PythonScriptStep(name=step.name,
+                                source_directory=source_directory,
+                                script_name=step.script_name,
+                                arguments=arguments,
+                                compute_target=run_config.target,
+                                runconfig=run_config,
+                                allow_reuse=step.allow_reuse)
+
+    def _new_output(self, name: str, step: Union[PipelineStep, None] = None) -> OutputFileDatasetConfig:
+        """Un OutputFileDatasetConfig nommé (unique dans le pipeline). Les outputs d'un step incremental sont écrits dans un
+            dossier fixe (<output>/<nom> de son Datastore) pour que ses partitions s'accumulent d'une Run à l'autre. Sinon, avec
+            checkpoint_datastore, il est conservé sous <CHECKPOINT_ROOT>/<id de la Run du step>/<nom> dans ce Datastore :
+            chaque Run, soumise ou planifiée, écrit dans ses propres dossiers.
+        """
+        unique_name, suffix = name, 1
+        while unique_name in self._output_names:
+            suffix += 1
+            unique_name = f"{name}_{suffix}"
+        self._output_names.add(unique_name)
+        if step is not None and step.incremental:
+            datastore = Datastore.get(self.ws, step.incremental["datastore"])
+            return OutputFileDatasetConfig(name=unique_name, destination=(datastore, f"{step.incremental['output']}/{unique_name}"))
+        if self.checkpoint_datastore is None:
+            return OutputFileDatasetConfig(name=unique_name)
+        return OutputFileDatasetConfig(name=unique_name, destination=(self.checkpoint_datastore, self._checkpoint_path("{run-id}", unique_name)))
+
+    def _checkpoint_path(self, run_id: str, output_name: str) -> str:
+        return f"{self.CHECKPOINT_ROOT}/{run_id}/{output_name}"
+
+    def get_compute(self, compute_name: str) -> ComputeTarget:
+        """Le ComputeTarget compute_name, récupéré une seule fois par pipeline."""
+        if compute_name not in self._computes:
+            try:
+                self._computes[compute_name] = ComputeTarget(workspace=self.ws, name=compute_name)
+            except ComputeTargetException as e:
+                raise TypeError(f"""Le compute {compute_name} n'est pas enregistré dans le Workspace {self.ws.name}.
+                                Vous pouvez le faire via la méthode register_compute().""") from e
+        return self._computes[compute_name]
+
+    def get_environment(self, env_name: str) -> Environment:
+        """L'Environment env_name, récupéré une seule fois par pipeline."""
+        if env_name not in self._environments:
+            self._environments[env_name] = Environment.get(self.ws, env_name)
+        return self._environments[env_name]
+
+    def get_run_config(self, compute_name: str, env_name: str, node_count: int = 1, process_count: int = 1) -> RunConfiguration:
+        """La RunConfiguration d'un step, partagée par les steps qui ont les mêmes compute, environment, node_count et process_count.
+
+        Raises:
+            ValueError: Si node_count dépasse le nombre maximal de noeuds du compute
+        """
+        key = (compute_name, env_name, node_count, process_count)
+        if key not in self._run_configs:
+            compute = self.get_compute(compute_name)
+            max_nodes = getattr(getattr(compute, "scale_settings", None), "maximum_node_count", None)
+            if max_nodes is not None and node_count > max_nodes:
+                raise ValueError(f"node_count ({node_count}) dépasse le nombre maximal de noeuds du compute {compute_name} ({max_nodes}).")
+            run_config = RunConfiguration()
+            run_config.environment = self.get_environment(env_name)
+            run_config.target = compute
+            if node_count > 1 or process_count > 1:
+                run_config.node_count = node_count
+                run_config.communicator = "IntelMpi"
+                run_config.mpi = MpiConfiguration(process_count_per_node=process_count, node_count=node_count)
+            self._run_configs[key] = run_config
+        return self._run_configs[key]
+
+    def _connect_linear(self) -> None:
+        self.folder: Optional[OutputFileDatasetConfig] = None
+        for step in self.steps:
+            if self.folder is not None:
+                step.arguments.extend(["--input-folder", self.folder.as_input()])
             if step != self.steps[-1]:
+                self.folder = self._new_output(argument_name(step.name).replace("-", "_"), step)
                 step.arguments.extend(["--output-folder", self.folder])
-            if step != self.steps[0]:
-                step.arguments.extend(["--input-folder", self.folder.as_input()])
-                self.folder = OutputFileDatasetConfig()
-            self.pipeline_steps.append(PythonScriptStep(name=step.name,
-                                                        source_directory=step.script_directory,
-                                                        script_name=step.script_name,
-                                                        arguments=step.arguments,
-                                                        compute_target=self.compute,
-                                                        runconfig=self.run_config,
-                                                        allow_reuse=True))
+
+    def _connect_dag(self) -> None:
+        """Relie les steps selon leurs depends_on. Chaque output consommé (ou déclaré) devient un OutputFileDatasetConfig nommé.
+            Un step avec une seule dépendance la reçoit via --input-folder, sinon via --input-folder-<step>[-<output>].
+        """
+        steps_by_name = {step.name: step for step in self.steps}
+        if len(steps_by_name) != len(self.steps):
+            raise ValueError("En mode DAG, chaque step doit avoir un step_name unique.")
+        upstreams = {step.name: [self._parse_dependency(dependency, step, steps_by_name) for dependency in step.depends_on or []]
+                     for step in self.steps}
+        self.steps = self._topological_order(upstreams, steps_by_name)
+        consumed = {dependency for dependencies in upstreams.values() for dependency in dependencies}
+        self.outputs: Dict[Tuple[str, Optional[str]], OutputFileDatasetConfig] = {}
+        for step in self.steps:
+            output_names: List[Optional[str]] = list(step.outputs) if step.outputs else []
+            if (step.name, None) in consumed:
+                output_names.append(None)
+            for output_name in output_names:
+                folder_name = argument_name(step.name if output_name is None else f"{step.name}_{output_name}").replace("-", "_")
+                folder = self._new_output(folder_name, step)
+                self.outputs[(step.name, output_name)] = folder
+                step.arguments.extend(["--output-folder" if output_name is None else f"--output-folder-{argument_name(output_name)}", folder])
+            dependencies = upstreams[step.name]
+            for upstream_name, output_name in dependencies:
+                if len(dependencies) == 1:
+                    input_argument = "--input-folder"
+                elif output_name is None:
+                    input_argument = f"--input-folder-{argument_name(upstream_name)}"
+                else:
+                    input_argument = f"--input-folder-{argument_name(upstream_name)}-{argument_name(output_name)}"
+                step.arguments.extend([input_argument, self.outputs[(upstream_name, output_name)].as_input()])
+
+    def _expand_shards(self) -> None:
+        """Remplace chaque step sharded par un step par shard (<step>_shard<i>), chacun avec ses propres output folders, suivi
+            d'un step de reduce (<step>_reduce) qui concatène les outputs des shards dans les output folders du step d'origine,
+            ceux que consomment les steps suivants. Les shards ne dépendant pas les uns des autres, AzureML les répartit sur les
+            noeuds disponibles du compute. Le step de reduce s'exécute sur le compute et l'environment du step d'origine.
+        """
+        expanded: List[PipelineStep] = []
+        for step in self.steps:
+            if step.shards is None or step.shards == 1:
+                expanded.append(step)
+                continue
+            outputs = [(str(step.arguments[i - 1]), arg) for i, arg in enumerate(step.arguments) if isinstance(arg, OutputFileDatasetConfig)]
+            reduce_arguments: List[Any] = [argument for flag, folder in outputs for argument in (flag, folder)]
+            # Le Workspace, les folders et les Datasets sont partagés par les shards, le reste (configs, listes) est propre à chacun
+            handles = [step.ws, *[arg for arg in step.arguments if not isinstance(arg, str)]]
+            for shard_index in range(step.shards):
+                shard_folders = {id(folder): self._new_output(f"{folder.name}_shard{shard_index}") for _, folder in outputs}
+                shard = copy.deepcopy(step, {id(handle): handle for handle in handles})
+                shard.name = f"{step.name}_shard{shard_index}"
+                shard.arguments = [shard_folders.get(id(arg), arg) for arg in step.arguments]
+                shard.arguments.extend(["--shard-index", str(shard_index), "--shard-count", str(step.shards)])
+                for flag, folder in outputs:
+                    reduce_arguments.extend([f"--shard-{shard_index}{flag[1:]}", shard_folders[id(folder)].as_input()])
+                expanded.append(shard)
+            if outputs:
+                reduce_step = PipelineStep(self.ws.name, self.ws.resource_group, self.ws.subscription_id, f"{step.name}_reduce", "reduce_shards.py",
+                                           script_directory=os.path.dirname(os.path.abspath(__file__)), workspace=self.ws,
+                                           allow_reuse=step.allow_reuse, compute_name=step.compute_name, env_name=step.env_name,
+                                           node_count=step.node_count, process_count=step.process_count)
+                reduce_step.arguments.extend(reduce_arguments)
+                expanded.append(reduce_step)
+        self.steps = expanded
+
+    @staticmethod
+    def _parse_dependency(dependency: str, step: PipelineStep, steps_by_name: Dict[str, PipelineStep]) -> Tuple[str, Optional[str]]:
+        upstream_name, _, output_name = dependency.partition(":")
+        if upstream_name not in steps_by_name or upstream_name == step.name:
+            raise ValueError(f"Le step {step.name} dépend de {upstream_name}, qui n'est pas un autre step du pipeline. Steps : {list(steps_by_name)}.")
+        upstream_outputs = steps_by_name[upstream_name].outputs or []
+        if not output_name:
+            if len(upstream_outputs) > 1:
+                raise ValueError(f"Le step {upstream_name} a plusieurs outputs ({upstream_outputs}), précisez-en un via \"{upstream_name}:<output>\".")
+            return upstream_name, upstream_outputs[0] if upstream_outputs else None
+        if output_name not in upstream_outputs:
+            raise ValueError(f"Le step {upstream_name} n'a pas d'output {output_name}. Ses outputs sont : {upstream_outputs}.")
+        return upstream_name, output_name
+
+    def _topological_order(self, upstreams: Dict[str, List[Tuple[str, Optional[str]]]],
+                           steps_by_name: Dict[str, PipelineStep]) -> List[PipelineStep]:
+        ordered: List[PipelineStep] = []
+        done: Set[str] = set()
+        remaining = [step.name for step in self.steps]
+        while remaining:
+            ready = [name for name in remaining if all(upstream in done for upstream, _ in upstreams[name])]
+            if not ready:
+                raise ValueError(f"Les dépendances des steps suivants forment un cycle : {remaining}.")
+            for name in ready:
+                ordered.append(steps_by_name[name])
+                done.add(name)
+                remaining.remove(name)
+        return ordered
 
     @property
     def pipeline(self) -> Pipeline:
@@ -84,24 +301,184 @@ class PipelineWrapper(WorkspaceWrapper):
         if missing_keys:
             raise KeyError(f"Votre configuration doit contenir la (ou les) clée(s) suivante(s) : {missing_keys} pour être valide.")
         base_config = {"ws_name": config.get("ws_name"), "resource_group": config.get("resource_group"), "subscription_id": config.get("subscription_id")}
-        steps_config = config.get("steps")
-        steps: List[PipelineStep] = []
-        if steps_config is not None:
-            for _, step_config in steps_config.items():
-                step_config = {**base_config, **step_config}
-                steps.append(PipelineStep.from_config(step_config))
+        steps_configs = cls._plan_steps(base_config, config.get("steps") or {})
+        workspace = WorkspaceWrapper.from_config(base_config).ws
+        dataset_resolver = DatasetResolver(workspace)
+        dataset_resolver.resolve({dataset for step_config in steps_configs for dataset in (step_config.get("input_datasets") or {}).values()})
+        steps = [PipelineStep.from_config(step_config, workspace, dataset_resolver) for step_config in steps_configs]
+        snapshot = config.get("snapshot")
+        snapshot_builder = SnapshotBuilder(snapshot if isinstance(snapshot, str) else None) if snapshot else None
         return cls(str(config.get("ws_name")), str(config.get("resource_group")), str(config.get("subscription_id")), str(config.get("env_name")),
-                   str(config.get("compute_name")), steps)
+                   str(config.get("compute_name")), steps, workspace, config.get("data_format"), snapshot_builder, config.get("checkpoints"),
+                   config.get("history"))
+
+    @classmethod
+    def _plan_steps(cls, base_config: Dict[str, Any], steps_config: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Phase de planification de from_config : valide la config de tous les steps, sans appel à AzureML, et rapporte toutes
+            les erreurs d'un coup.
+        """
+        if not isinstance(steps_config, Dict):
+            raise TypeError("steps doit être un dict de configs de steps.")
+        step_names = {key: step_config.get("step_name") for key, step_config in steps_config.items() if isinstance(step_config, Dict)}
+        planned: List[Dict[str, Any]] = []
+        errors: Dict[str, List[str]] = {}
+        for key, step_config in steps_config.items():
+            step_config = {**base_config, **step_config}
+            if isinstance(step_config.get("depends_on"), list):
+                step_config["depends_on"] = [cls._dependency_by_name(dependency, step_names) for dependency in step_config["depends_on"]]
+            missing_keys = PipelineStep.validate_config(step_config)
+            if missing_keys:
+                errors[key] = missing_keys
+            planned.append(step_config)
+        if errors:
+            raise KeyError(f"Les configurations de steps suivantes sont incomplètes (clées manquantes par step) : {errors}.")
+        return planned
+
+    @staticmethod
+    def _dependency_by_name(dependency: str, step_names: Dict[str, Any]) -> str:
+        """Dans from_config, depends_on peut référer aux clés du dictionnaire steps plutôt qu'aux step_names."""
+        upstream, separator, output_name = dependency.partition(":")
+        return f"{step_names.get(upstream, upstream)}{separator}{output_name}"
 
     def run(self, experiment_name: str) -> None:
         if len(self.pipeline_steps) > 0:
-            self.pipeline = Pipeline(workspace=self.ws, steps=self.pipeline_steps)
-            self.experiment = Experiment(workspace=self.ws, name=experiment_name)
-            self._run = self.experiment.submit(self.pipeline)
-            self._run.wait_for_completion()
+            run = self.submit(experiment_name).run
+            run.wait_for_completion()
+            if self.history is not None:
+                self.history.collect(run, experiment_name)
+
+    def submit(self, experiment_name: str, tags: Union[Dict[str, str], None] = None, name: Union[str, None] = None) -> PipelineRunHandle:
+        """Soumet le pipeline sans attendre la fin de la Run. Plusieurs pipelines peuvent ainsi rouler en parallèle et être
+            suivis par un RunMonitor (voir RunMonitor.submit_all()).
+
+        Args:
+            experiment_name (str): Le nom de l'Experiment
+            tags (dict, optional): Des tags à ajouter à la Run (ex: les hyperparamètres de la variante). Defaults to None.
+            name (str, optional): Le nom du handle. Defaults to l'id de la Run.
+
+        Returns:
+            PipelineRunHandle: Le handle de la Run soumise
+        """
+        if len(self.pipeline_steps) == 0:
+            raise ValueError("Le pipeline ne contient aucun step.")
+        return self._submit(self.pipeline_steps, experiment_name, tags, name, {})
+
+    def _submit(self, pipeline_steps: List[PythonScriptStep], experiment_name: str, tags: Union[Dict[str, str], None],
+                name: Union[str, None], checkpoints: Dict[str, str]) -> PipelineRunHandle:
+        tags = dict(tags or {})
+        if self.checkpoint_datastore is not None:
+            tags[self.CHECKPOINT_TAG] = json.dumps(checkpoints)
+        self.pipeline = Pipeline(workspace=self.ws, steps=pipeline_steps)
+        self.experiment = Experiment(workspace=self.ws, name=experiment_name)
+        self._run = self.experiment.submit(self.pipeline, tags=tags)
+        return PipelineRunHandle(self._run, name)
+
+    @staticmethod
+    def _step_outputs(step: PipelineStep) -> List[OutputFileDatasetConfig]:
+        return [arg for arg in step.arguments if isinstance(arg, OutputFileDatasetConfig)]
+
+    def checkpoint_manifest(self, run_id: str, experiment_name: str) -> Dict[str, Dict[str, Any]]:
+        """Le manifeste de complétion d'une Run soumise avec checkpoint_datastore : pour chaque step, si tous ses outputs ont
+            été complétés (ScriptWrapper.complete() écrit un fichier _checkpoint.json dans chacun) et le chemin de chaque
+            output dans le Datastore. Un step sans output n'est jamais considéré complété. Un avertissement est émis pour chaque
+            step terminé dont un output n'est pas marqué (ex: un script qui termine par run.complete() plutôt que par
+            ScriptWrapper.complete()) : il sera réexécuté par resume().
+
+        Returns:
+            dict: Par step, {"complete": bool, "outputs": {nom de l'output: chemin dans le Datastore}}
+        """
+        if self.checkpoint_datastore is None:
+            raise ValueError("Ce pipeline n'a pas de checkpoint_datastore : ses outputs ne sont pas conservés.")
+        run = PipelineRun(Experiment(workspace=self.ws, name=experiment_name), run_id)
+        if self.CHECKPOINT_TAG not in (run.tags or {}):
+            raise ValueError(f"La Run {run_id} n'a pas été soumise avec des checkpoints.")
+        # Les outputs des steps repris d'une Run précédente (voir resume()), par nom d'output
+        reused_outputs: Dict[str, str] = json.loads(run.tags[self.CHECKPOINT_TAG])
+        step_runs = {step_run.name: step_run for step_run in run.get_steps()}
+        manifest: Dict[str, Dict[str, Any]] = {}
+        for step in self.steps:
+            outputs: Dict[str, str] = {}
+            for output in self._step_outputs(step):
+                if step.name in step_runs:
+                    outputs[output.name] = self._checkpoint_path(step_runs[step.name].id, output.name)
+                elif output.name in reused_outputs:
+                    outputs[output.name] = reused_outputs[output.name]
+            manifest[step.name] = {"complete": False, "outputs": outputs}
+        storage = DatastoreStorage(self.checkpoint_datastore)
+        blobs: Set[str] = set()
+        for folder in {path.rsplit("/", 1)[0] for step in manifest.values() for path in step["outputs"].values()}:
+            blobs.update(storage.list(f"{folder}/"))
+        for step in self.steps:
+            outputs = manifest[step.name]["outputs"]
+            manifest[step.name]["complete"] = bool(outputs) and len(outputs) == len(self._step_outputs(step)) and \
+                all(f"{path}/{CHECKPOINT_FILE}" in blobs for path in outputs.values())
+            if outputs and not manifest[step.name]["complete"] and step.name in step_runs and \
+                    step_runs[step.name].get_status() in ["Completed", "Finished"]:
+                warnings.warn(f"Le step {step.name} de la Run {run_id} est terminé, mais ses outputs ne sont pas marqués comme complets "
+                              f"({CHECKPOINT_FILE}) : le script doit se terminer par ScriptWrapper.complete(). Il sera réexécuté par resume().")
+        return manifest
+
+    def resume(self, run_id: str, experiment_name: str, tags: Union[Dict[str, str], None] = None,
+               name: Union[str, None] = None) -> PipelineRunHandle:
+        """Reprend une Run échouée (ou annulée) de ce pipeline : les steps complétés (voir checkpoint_manifest()) dont les
+            dépendances sont aussi complétées ne sont pas réexécutés. Leurs outputs conservés sont passés en inputs aux steps restants.
+            Le pipeline doit être construit à partir de la même config que celui de la Run.
+
+        Raises:
+            ValueError: Si tous les steps de la Run sont déjà complétés
+
+        Returns:
+            PipelineRunHandle: Le handle de la nouvelle Run, qui ne contient que les steps restants
+        """
+        manifest = self.checkpoint_manifest(run_id, experiment_name)
+        producers = {id(output): step.name for step in self.steps for output in self._step_outputs(step)}
+        skipped: Set[str] = set()
+        for step in self.steps:
+            upstreams = {producers[id(arg.dataset)] for arg in step.arguments
+                         if isinstance(arg, DatasetConsumptionConfig) and id(arg.dataset) in producers}
+            if manifest[step.name]["complete"] and upstreams <= skipped:
+                skipped.add(step.name)
+        if len(skipped) == len(self.steps):
+            raise ValueError(f"Tous les steps de la Run {run_id} sont déjà complétés.")
+        checkpoints: Dict[str, str] = {}
+        pipeline_steps = []
+        for step in self.steps:
+            if step.name in skipped:
+                checkpoints.update(manifest[step.name]["outputs"])
+                continue
+            arguments = []
+            for arg in step.arguments:
+                if isinstance(arg, DatasetConsumptionConfig) and producers.get(id(arg.dataset)) in skipped:
+                    path = manifest[producers[id(arg.dataset)]]["outputs"][arg.dataset.name]
+                    arg = Dataset.File.from_files(path=[(self.checkpoint_datastore, path)], validate=False).as_named_input(arg.dataset.name).as_mount()
+                arguments.append(arg)
+            pipeline_steps.append(self._python_script_step(step, arguments))
+        return self._submit(pipeline_steps, experiment_name, tags, name, checkpoints)
+
+    def run_local(self, working_directory: Union[str, None] = None, max_workers: Union[int, None] = None,
+                  datasets: Union[Dict[str, str], None] = None, cache: Union[StepCache, None] = None,
+                  datastores: Union[Dict[str, str], None] = None) -> Dict[str, Dict[str, Any]]:
+        """Exécute le pipeline localement, sans soumission à AzureML, via un LocalRunner. Voir LocalRunner pour les arguments.
+
+        Returns:
+            dict: Par step, son statut, sa durée, son code de retour et le chemin de son log
+        """
+        from .local_runner import LocalRunner
+        return LocalRunner(self, working_directory, max_workers, datasets, cache=cache, datastores=datastores).run()
 
     def register(self, name: str, description: str, schedule: Union[str, None] = None, interval: Union[int, None] = None,
-                 datastore_name: Union[str, None] = None) -> None:
+                 datastore_name: Union[str, None] = None, path_on_datastore: Union[str, None] = None) -> None:
+        """Publie le pipeline de la dernière Run et, au besoin, le planifie.
+
+        Args:
+            name (str): Le nom du pipeline publié
+            description (str): Sa description
+            schedule (str, optional): La schédule, parmi POSSIBLE_SCHEDULES. Defaults to None.
+            interval (int, optional): L'intervalle de la schédule, sauf pour On_blob_change. Defaults to None.
+            datastore_name (str, optional): Le Datastore surveillé par On_blob_change. Defaults to None.
+            path_on_datastore (str, optional): Le dossier surveillé par On_blob_change. Si None et que les steps incremental sur
+                                               ce Datastore traitent tous le même dossier, ce dossier. Defaults to None (tout le Datastore).
+        """
         if self._run is None:
             raise ValueError("Vous devez voir lancer un expérience pour pouvoir la publiée. Vous pouvez le faire via .run().")
         self.pipeline = self._run.publish_pipeline(name=name, description=description, version="0")
@@ -112,8 +489,11 @@ class PipelineWrapper(WorkspaceWrapper):
                 if not datastore_name:
                     raise ValueError(f"Avec la schédule {schedule}, vous devez préciser un datastore_name vers le blob en question.")
                 datastore = Datastore.get(workspace=self.ws, name=datastore_name)
+                if path_on_datastore is None:
+                    paths = {step.incremental["path"] for step in self.steps if step.incremental and step.incremental["datastore"] == datastore_name}
+                    path_on_datastore = paths.pop() if len(paths) == 1 else None
                 schedule = Schedule.create(self.ws, name=f"{name}Schedule", pipeline_id=self.pipeline.id,
-                                           experiment_name=self.experiment.name, datastore=datastore)
+                                           experiment_name=self.experiment.name, datastore=datastore, path_on_datastore=path_on_datastore)
             else:
                 if not interval:
                     raise ValueError(f"Avec la schédule {schedule}, un interval de {schedule}.")
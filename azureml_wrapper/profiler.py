@@ -0,0 +1,172 @@
+from __future__ import annotations
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Union, TYPE_CHECKING
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import time
+
+from .data_formats import ChunkWriter
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+try:
+    import resource
+    HAS_RESOURCE = True
+except ImportError:  # Windows
+    HAS_RESOURCE = False
+
+
+def peak_rss() -> Union[int, None]:
+    """Le pic de mémoire résidente du processus, en octets. None si la plateforme ne le permet pas."""
+    if not HAS_RESOURCE:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return int(peak) if sys.platform == "darwin" else int(peak) * 1024
+
+
+class StepProfiler():
+    TRACE_FILE = "_step_trace.json"
+    # Les colonnes de la table step_operations (run.log_row) et leur valeur quand une mesure n'en a pas : AzureML retourne la
+    # table colonne par colonne, chaque ligne doit donc avoir toutes les colonnes pour que les colonnes restent alignées
+    OPERATION_COLUMNS = {"operation": "", "kind": "", "source": "", "rows": -1, "bytes": -1, "seconds": -1, "rows_per_second": -1,
+                         "bytes_per_second": -1, "blobs": -1, "memory_bytes_before": -1, "memory_bytes_after": -1}
+
+    def __init__(self, step_name: Union[str, None] = None) -> None:
+        """Chronomètre les lectures, écritures et sections de calcul d'un step et calcule leurs débits (lignes/s, octets/s).
+            Les résultats sont loggés dans la Run et écrits dans un fichier de trace JSON par flush().
+
+        Args:
+            step_name (str, optional): Le nom du step, inscrit dans la trace. Defaults to None.
+        """
+        self.step_name = step_name
+        self.records: List[Dict[str, Any]] = []
+        self.start = time.perf_counter()
+        self._profile_stats: Union[str, None] = None
+        self._profile: Union[cProfile.Profile, None] = None
+
+    @contextmanager
+    def measure(self, operation: str, kind: str = "compute", rows: Union[int, None] = None,
+                nbytes: Union[int, None] = None) -> Iterator[Dict[str, Any]]:
+        """Chronomètre le bloc. Le dict retourné peut être complété dans le bloc (ex: record["rows"] = len(dataframe)).
+
+        Args:
+            operation (str): Le nom de l'opération (ex: "read:features")
+            kind (str, optional): "read", "write" ou "compute". Defaults to "compute".
+            rows (int, optional): Le nombre de lignes traitées. Defaults to None.
+            nbytes (int, optional): Le nombre d'octets traités. Defaults to None.
+        """
+        record: Dict[str, Any] = {"operation": operation, "kind": kind, "rows": rows, "bytes": nbytes}
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            self.add(record, time.perf_counter() - start)
+
+    def track_iter(self, operation: str, chunks: Iterator[pd.DataFrame], nbytes: Union[int, None] = None) -> Iterator[pd.DataFrame]:
+        """Chronomètre une lecture par morceaux. Seul le temps passé à produire les morceaux est compté, pas celui du traitement."""
+        record: Dict[str, Any] = {"operation": operation, "kind": "read", "rows": 0, "bytes": nbytes}
+        elapsed = 0.0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    chunk = next(chunks)
+                except StopIteration:
+                    break
+                finally:
+                    elapsed += time.perf_counter() - start
+                record["rows"] += len(chunk)
+                yield chunk
+        finally:
+            self.add(record, elapsed)
+
+    def track_writer(self, operation: str, writer: ChunkWriter) -> ChunkWriter:
+        return ProfiledChunkWriter(self, operation, writer)
+
+    @contextmanager
+    def profile(self) -> Iterator[None]:
+        """Capture un profil cProfile du bloc. Il est écrit à côté de la trace par flush()."""
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+        try:
+            yield
+        finally:
+            self._profile.disable()
+            stream = io.StringIO()
+            pstats.Stats(self._profile, stream=stream).sort_stats("cumulative").print_stats(40)
+            self._profile_stats = stream.getvalue()
+
+    def summary(self) -> Dict[str, Any]:
+        totals = {kind: sum(record["seconds"] for record in self.records if record["kind"] == kind) for kind in ("read", "write", "compute")}
+        return {"step_name": self.step_name, "wall_seconds": time.perf_counter() - self.start, "peak_rss_bytes": peak_rss(),
+                **{f"{kind}_seconds": seconds for kind, seconds in totals.items()}, "operations": self.records}
+
+    def flush(self, run: Any, folder: Union[str, None]) -> Union[str, None]:
+        """Logge les mesures dans run (run.log et run.log_row) et écrit la trace JSON (et le profil cProfile s'il y a lieu) dans folder.
+            Chaque mesure est loggée avec toutes les OPERATION_COLUMNS (une valeur absente devient -1 ou ""), les autres clés
+            n'étant que dans la trace.
+
+        Returns:
+            str: Le chemin de la trace, None si folder est None
+        """
+        summary = self.summary()
+        for key in ["wall_seconds", "read_seconds", "write_seconds", "compute_seconds"]:
+            run.log(f"step_{key}", summary[key])
+        if summary["peak_rss_bytes"] is not None:
+            run.log("step_peak_rss_mb", summary["peak_rss_bytes"] / 1024 ** 2)
+        for record in self.records:
+            run.log_row("step_operations", **{column: record[column] if record.get(column) is not None else missing
+                                              for column, missing in self.OPERATION_COLUMNS.items()})
+        if folder is None:
+            return None
+        os.makedirs(folder, exist_ok=True)
+        trace_path = os.path.join(folder, self.TRACE_FILE)
+        with open(trace_path, "w") as trace_file:
+            json.dump(summary, trace_file, indent=2)
+        if self._profile is not None:
+            self._profile.dump_stats(os.path.join(folder, "_step_profile.prof"))
+            with open(os.path.join(folder, "_step_profile.txt"), "w") as profile_file:
+                profile_file.write(self._profile_stats or "")
+        return trace_path
+
+    def add(self, record: Dict[str, Any], seconds: float) -> None:
+        """Ajoute une mesure (operation, kind, rows, bytes) qui a pris seconds secondes."""
+        record["seconds"] = seconds
+        if seconds > 0:
+            if record["rows"] is not None:
+                record["rows_per_second"] = record["rows"] / seconds
+            if record["bytes"] is not None:
+                record["bytes_per_second"] = record["bytes"] / seconds
+        self.records.append(record)
+
+
+class ProfiledChunkWriter(ChunkWriter):
+    """Enveloppe un ChunkWriter pour chronométrer ses écritures. La mesure est enregistrée à la fermeture."""
+
+    def __init__(self, profiler: StepProfiler, operation: str, writer: ChunkWriter) -> None:
+        super().__init__(writer.path, writer.index, writer.compression)
+        self.profiler = profiler
+        self.operation = operation
+        self.writer = writer
+        self.seconds = 0.0
+        self._closed = False
+
+    def _write(self, dataframe: pd.DataFrame) -> None:
+        start = time.perf_counter()
+        self.writer.write(dataframe)
+        self.seconds += time.perf_counter() - start
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        start = time.perf_counter()
+        self.writer.close()
+        self.seconds += time.perf_counter() - start
+        nbytes = os.path.getsize(self.path) if os.path.exists(self.path) else None
+        self.profiler.add({"operation": self.operation, "kind": "write", "rows": self.rows, "bytes": nbytes}, self.seconds)
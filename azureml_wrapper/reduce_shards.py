@@ -0,0 +1,83 @@
+"""Script du step de reduce ajouté par PipelineWrapper après un step sharded. Pour chaque output du step, les fichiers de même nom
+    produits par les shards sont concaténés dans l'ordre des shards (par morceaux, sans tout charger en mémoire), selon un schéma
+    compatible avec celui de chaque shard (voir unify_schemas()). Les schémas écrits à côté des fichiers CSV sont fusionnés : une
+    colonne dont les dtypes diffèrent d'un shard à l'autre y est omise et sera inférée à la lecture. Les autres fichiers d'un
+    format non tabulaire sont copiés du premier shard qui les contient, avec un avertissement si leur contenu diffère d'un shard
+    à l'autre. Les sous-dossiers (ex: les partitions de ScriptWrapper.save_partition()) sont fusionnés de la même façon. Les
+    fichiers débutant par "_" (marqueurs, voir CHECKPOINT_FILE) sont ignorés.
+
+Arguments : --output-folder[-<output>] <dossier final> et --shard-<i>-output-folder[-<output>] <dossier du shard i>, pour chaque output.
+"""
+from typing import Dict, List
+import filecmp
+import json
+import os
+import shutil
+import warnings
+
+from azureml_wrapper import ScriptWrapper
+from azureml_wrapper.data_formats import SCHEMA_SUFFIX, compression_from_path, format_from_path, read_schema, unify_schemas
+
+
+def reduce_output(script: ScriptWrapper, shard_folders: List[str], output_folder: str) -> None:
+    os.makedirs(output_folder, exist_ok=True)
+    names = sorted({name for folder in shard_folders if os.path.isdir(folder) for name in os.listdir(folder) if not name.startswith("_")})
+    for name in names:
+        paths = [os.path.join(folder, name) for folder in shard_folders if os.path.exists(os.path.join(folder, name))]
+        target = os.path.join(output_folder, name)
+        data_format = format_from_path(name)
+        if os.path.isdir(paths[0]):
+            shutil.rmtree(target, ignore_errors=True)
+            reduce_output(script, [path for path in paths if os.path.isdir(path)], target)
+        elif name.endswith(SCHEMA_SUFFIX) and format_from_path(name[:-len(SCHEMA_SUFFIX)]) is not None:
+            reduce_schema(paths, target)
+        elif data_format is None:
+            shutil.copyfile(paths[0], target)
+            different = [path for path in paths[1:] if not filecmp.cmp(paths[0], path, shallow=False)]
+            if different:
+                warnings.warn(f"Le fichier {name} diffère d'un shard à l'autre ({different}) : seul celui de {paths[0]} est conservé.")
+        else:
+            output_writer = data_format.open_writer(target, compression=compression_from_path(name))
+            output_writer.schema = unify_schemas([data_format.arrow_schema(path) for path in paths])
+            with script.profiler.track_writer(f"write:{name}", output_writer) as writer:
+                for path in paths:
+                    for chunk in data_format.iter_read(path):
+                        writer.write(chunk)
+            if writer.rows == 0:
+                shutil.copyfile(paths[0], target)
+
+
+def reduce_schema(schema_paths: List[str], target: str) -> None:
+    """Fusionne les schémas (voir write_schema()) des shards : seules les colonnes de même dtype dans tous les shards sont gardées."""
+    schemas = [read_schema(path[:-len(SCHEMA_SUFFIX)]) or {} for path in schema_paths]
+    columns: Dict[str, str] = {}
+    for column, dtype in schemas[0].items():
+        if all(schema.get(column, dtype) == dtype for schema in schemas[1:]):
+            columns[column] = dtype
+    with open(target, "w") as schema_file:
+        json.dump({"columns": columns}, schema_file, indent=2)
+
+
+def _rank() -> int:
+    """Le rang du processus quand le step est lancé via MPI (node_count ou process_count du step sharded), 0 sinon."""
+    for variable in ["OMPI_COMM_WORLD_RANK", "PMI_RANK"]:
+        if os.environ.get(variable):
+            return int(os.environ[variable])
+    return 0
+
+
+def main() -> None:
+    if _rank() != 0:
+        # Un seul processus écrit les outputs
+        return
+    script = ScriptWrapper()
+    for output_arg, output_folder in script.output_folders.items():
+        shard_folders: List[str] = []
+        while f"shard_{len(shard_folders)}_{output_arg}" in script.args_list:
+            shard_folders.append(getattr(script.args, f"shard_{len(shard_folders)}_{output_arg}"))
+        reduce_output(script, shard_folders, output_folder)
+    script.complete()
+
+
+if __name__ == "__main__":
+    main()
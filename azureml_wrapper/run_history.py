@@ -0,0 +1,236 @@
+"""Historique des performances des Runs de pipelines : les durées (attente, démarrage, exécution) et les volumes de données de
+    chaque step des Runs terminées sont conservés dans une base SQLite locale, pour comparer une Run à celles qui l'ont précédée
+    et repérer les steps qui ont ralenti.
+"""
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from typing import Any, Dict, List, Union, TYPE_CHECKING
+import datetime
+import os
+import sqlite3
+import time
+import warnings
+
+from .run_monitor import parse_time
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+_RUN_COLUMNS = ["run_id", "experiment", "status", "start", "end", "duration_seconds", "recorded"]
+_STEP_COLUMNS = ["run_id", "step_run_id", "experiment", "step_name", "status", "start", "end", "queue_seconds", "startup_seconds",
+                 "execution_seconds", "wall_seconds", "read_seconds", "write_seconds", "compute_seconds", "peak_rss_mb", "rows_read", "bytes_read",
+                 "rows_written", "bytes_written"]
+# Une latence plus grande ou un débit plus petit que ceux de la baseline est une régression
+LATENCY_METRICS = ["queue_seconds", "startup_seconds", "execution_seconds"]
+THROUGHPUT_METRICS = ["rows_per_second", "bytes_per_second"]
+
+
+class RunHistory():
+    DEFAULT_PATH = os.environ.get("AZUREML_WRAPPER_RUN_HISTORY", os.path.join(os.path.expanduser("~"), ".azureml_wrapper", "run_history.sqlite"))
+
+    def __init__(self, path: Union[str, None] = None, max_workers: int = 8) -> None:
+        """Base SQLite des performances des Runs de pipelines, une ligne par Run et une par step de Run (identifié par l'id de
+            sa Run, plusieurs steps pouvant porter le même nom).
+
+        Args:
+            path (str, optional): Le fichier SQLite. Defaults to $AZUREML_WRAPPER_RUN_HISTORY ou ~/.azureml_wrapper/run_history.sqlite.
+            max_workers (int, optional): Le nombre maximal de steps dont les détails sont récupérés en même temps. Defaults to 8.
+        """
+        self.path = path if path is not None else self.DEFAULT_PATH
+        self.max_workers = max_workers
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with closing(sqlite3.connect(self.path)) as connection, connection:
+            connection.execute(f"CREATE TABLE IF NOT EXISTS runs ({', '.join(_RUN_COLUMNS)}, PRIMARY KEY (run_id))")
+            connection.execute(f"CREATE TABLE IF NOT EXISTS steps ({', '.join(_STEP_COLUMNS)}, PRIMARY KEY (run_id, step_run_id))")
+            connection.execute("CREATE INDEX IF NOT EXISTS steps_by_experiment ON steps (experiment, step_name, start)")
+
+    def collect(self, run: Any, experiment_name: Union[str, None] = None) -> List[Dict[str, Any]]:
+        """Récupère les durées et les métriques (voir StepProfiler) de chaque step d'une Run de pipeline terminée et les
+            enregistre. Une Run déjà enregistrée est remplacée.
+
+        Args:
+            run (PipelineRun): La Run, ex: PipelineRunHandle.run
+            experiment_name (str, optional): L'Experiment de la Run, auquel les Runs sont comparées. Defaults to celui de run.
+
+        Returns:
+            List[Dict[str, Any]]: La ligne enregistrée de chaque step
+        """
+        experiment = experiment_name if experiment_name is not None else getattr(getattr(run, "experiment", None), "name", None)
+        details = run.get_details()
+        start, end = _timestamp(details.get("startTimeUtc")), _timestamp(details.get("endTimeUtc"))
+        step_runs = run.get_steps()
+        with ThreadPoolExecutor(max_workers=max(min(self.max_workers, len(step_runs)), 1)) as executor:
+            steps = list(executor.map(step_record, step_runs))
+        run_record = {"run_id": str(run.id), "experiment": experiment, "status": details.get("status"), "start": start, "end": end,
+                      "duration_seconds": end - start if start is not None and end is not None else None, "recorded": time.time()}
+        for step in steps:
+            step.update({"run_id": run_record["run_id"], "experiment": experiment})
+        with closing(sqlite3.connect(self.path)) as connection, connection:
+            connection.execute("DELETE FROM steps WHERE run_id = ?", (run_record["run_id"],))
+            connection.execute(f"INSERT OR REPLACE INTO runs VALUES ({', '.join('?' * len(_RUN_COLUMNS))})",
+                               [run_record[column] for column in _RUN_COLUMNS])
+            connection.executemany(f"INSERT INTO steps VALUES ({', '.join('?' * len(_STEP_COLUMNS))})",
+                                   [[step.get(column) for column in _STEP_COLUMNS] for step in steps])
+        return steps
+
+    def runs(self, experiment_name: Union[str, None] = None, limit: Union[int, None] = None) -> pd.DataFrame:
+        """Les Runs enregistrées (de l'Experiment experiment_name), de la plus récente à la plus ancienne."""
+        return self._query("runs", experiment_name, None, limit)
+
+    def steps(self, experiment_name: Union[str, None] = None, step_name: Union[str, None] = None,
+              limit: Union[int, None] = None) -> pd.DataFrame:
+        """Les steps enregistrés, de la Run la plus récente à la plus ancienne, avec leurs débits (rows_per_second et
+            bytes_per_second, lectures et écritures confondues, sur le temps d'exécution).
+        """
+        steps = self._query("steps", experiment_name, step_name, limit)
+        execution = steps["execution_seconds"].astype("float64").where(steps["execution_seconds"] > 0)
+        steps["rows_per_second"] = (steps["rows_read"].fillna(0) + steps["rows_written"].fillna(0)).astype("float64") / execution
+        steps["bytes_per_second"] = (steps["bytes_read"].fillna(0) + steps["bytes_written"].fillna(0)).astype("float64") / execution
+        return steps
+
+    def baseline(self, experiment_name: str, before: Union[float, None] = None, window: int = 10) -> pd.DataFrame:
+        """La médiane de chaque métrique, par step, sur les window dernières Runs complétées de experiment_name qui ont
+            commencé avant before.
+
+        Returns:
+            pd.DataFrame: Par step_name, les médianes de LATENCY_METRICS et THROUGHPUT_METRICS et le nombre de Runs (runs)
+        """
+        runs = self.runs(experiment_name)
+        runs = runs[runs["status"].isin(["Completed", "Finished"])]
+        if before is not None:
+            runs = runs[runs["start"] < before]
+        steps = self.steps(experiment_name)
+        steps = steps[steps["run_id"].isin(runs["run_id"].head(window))]
+        grouped = steps.groupby("step_name")
+        baseline = grouped[LATENCY_METRICS + THROUGHPUT_METRICS].median()
+        baseline["runs"] = grouped["run_id"].nunique()
+        return baseline
+
+    def compare(self, run_id: str, window: int = 10, threshold: float = 0.2, min_seconds: float = 1.0) -> pd.DataFrame:
+        """Compare chaque step d'une Run enregistrée à la baseline (voir baseline()) des Runs qui l'ont précédée dans son Experiment.
+            Une latence est en régression si elle dépasse la baseline de plus de threshold (en proportion) et de plus de
+            min_seconds secondes, un débit s'il est sous la baseline de plus de threshold.
+
+        Args:
+            run_id (str): L'id de la Run, enregistrée par collect()
+            window (int, optional): Le nombre de Runs précédentes de la baseline. Defaults to 10.
+            threshold (float, optional): L'écart relatif toléré. Defaults to 0.2.
+            min_seconds (float, optional): L'écart absolu toléré sur les latences, pour ignorer le bruit des steps courts. Defaults to 1.0.
+
+        Returns:
+            pd.DataFrame: Une ligne par step et par métrique : step_name, metric, value, baseline, change (value / baseline - 1) et regressed
+        """
+        import pandas as pd
+        if threshold < 0:
+            raise ValueError("threshold doit être positif.")
+        runs = self.runs()
+        run = runs[runs["run_id"] == run_id]
+        if run.empty:
+            raise KeyError(f"La Run {run_id} n'est pas dans l'historique. Utilisez collect() pour l'ajouter.")
+        experiment, start = run["experiment"].iloc[0], run["start"].iloc[0]
+        steps = self.steps(experiment)
+        steps = steps[steps["run_id"] == run_id]
+        baseline = self.baseline(experiment, start, window)
+        rows = []
+        for step_name, step in zip(steps["step_name"], steps.to_dict("records")):
+            for metric in LATENCY_METRICS + THROUGHPUT_METRICS:
+                value = step[metric]
+                reference = baseline.at[step_name, metric] if step_name in baseline.index else None
+                if pd.isna(value) or reference is None or pd.isna(reference):
+                    rows.append({"step_name": step_name, "metric": metric, "value": value, "baseline": reference, "change": None, "regressed": False})
+                    continue
+                change = value / reference - 1 if reference > 0 else None
+                if metric in LATENCY_METRICS:
+                    regressed = value > reference * (1 + threshold) and value - reference > min_seconds
+                else:
+                    regressed = value < reference * (1 - threshold)
+                rows.append({"step_name": step_name, "metric": metric, "value": value, "baseline": reference, "change": change,
+                             "regressed": bool(regressed)})
+        return pd.DataFrame(rows, columns=["step_name", "metric", "value", "baseline", "change", "regressed"])
+
+    def regressions(self, run_id: str, window: int = 10, threshold: float = 0.2, min_seconds: float = 1.0) -> pd.DataFrame:
+        """Seulement les lignes de compare() en régression."""
+        comparison = self.compare(run_id, window, threshold, min_seconds)
+        return comparison[comparison["regressed"]].reset_index(drop=True)
+
+    def _query(self, table: str, experiment_name: Union[str, None], step_name: Union[str, None], limit: Union[int, None]) -> pd.DataFrame:
+        import pandas as pd
+        conditions, parameters = [], []
+        for column, value in [("experiment", experiment_name), ("step_name", step_name)]:
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                parameters.append(value)
+        query = f"SELECT * FROM {table}{' WHERE ' + ' AND '.join(conditions) if conditions else ''} ORDER BY start DESC"
+        if limit is not None:
+            query += f" LIMIT {int(limit)}"
+        with closing(sqlite3.connect(self.path)) as connection:
+            return pd.read_sql_query(query, connection, params=parameters)
+
+
+def step_record(step_run: Any) -> Dict[str, Any]:
+    """Les durées et les volumes de données d'un step terminé :
+        - queue_seconds : de la création du step à son démarrage (attente des steps en amont et d'un noeud du compute);
+        - execution_seconds : du démarrage à la fin du step, selon AzureML;
+        - startup_seconds : la part de execution_seconds hors du script (image, montages, environnement), si le script a
+          été mesuré par ScriptWrapper (métrique step_wall_seconds);
+        - les temps et volumes de lecture et d'écriture loggés par le StepProfiler du script.
+    """
+    details = step_run.get_details()
+    metrics = step_run.get_metrics()
+    start, end = _timestamp(details.get("startTimeUtc")), _timestamp(details.get("endTimeUtc"))
+    created = _timestamp((getattr(step_run, "_run_dto", None) or {}).get("created_utc") or details.get("createdTimeUtc"))
+    execution = end - start if start is not None and end is not None else None
+    wall = _last(metrics.get("step_wall_seconds"))
+    record: Dict[str, Any] = {"step_run_id": str(step_run.id), "step_name": step_run.name, "status": details.get("status"), "start": start,
+                              "end": end, "queue_seconds": max(start - created, 0.0) if start is not None and created is not None else None,
+                              "execution_seconds": execution,
+                              "startup_seconds": max(execution - wall, 0.0) if execution is not None and wall is not None else None,
+                              "wall_seconds": wall, "peak_rss_mb": _last(metrics.get("step_peak_rss_mb"))}
+    for kind in ["read", "write", "compute"]:
+        record[f"{kind}_seconds"] = _last(metrics.get(f"step_{kind}_seconds"))
+    operations = _table_rows(metrics.get("step_operations"))
+    for kind, suffix in [("read", "read"), ("write", "written")]:
+        kind_operations = [operation for operation in operations if operation.get("kind") == kind]
+        for quantity in ["rows", "bytes"]:
+            values = [operation[quantity] for operation in kind_operations if operation.get(quantity) is not None]
+            record[f"{quantity}_{suffix}"] = int(sum(values)) if values else None
+    return record
+
+
+def _timestamp(value: Any) -> Union[float, None]:
+    """Convertit une date UTC d'AzureML (voir parse_time()) en timestamp."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    return parse_time(value).replace(tzinfo=datetime.timezone.utc).timestamp()
+
+
+def _last(value: Any) -> Union[float, None]:
+    """La dernière valeur d'une métrique loggée une ou plusieurs fois."""
+    if isinstance(value, list):
+        value = value[-1] if value else None
+    return float(value) if value is not None else None
+
+
+def _table_rows(value: Any) -> List[Dict[str, Any]]:
+    """Les lignes d'une métrique loggée via log_row : AzureML la retourne en dict de colonnes (une liste par colonne), ou en
+        dict ou en liste de dicts. Les valeurs absentes loggées par StepProfiler (-1 ou "") redeviennent None. Des colonnes de
+        longueurs différentes (lignes loggées avec des clés différentes) ne peuvent pas être réalignées : la table est ignorée.
+    """
+    if isinstance(value, list):
+        rows = [row for row in value if isinstance(row, dict)]
+    elif isinstance(value, dict):
+        if value and all(isinstance(column, list) for column in value.values()):
+            lengths = {len(column) for column in value.values()}
+            if len(lengths) > 1:
+                warnings.warn(f"Les colonnes de la table {sorted(value)} n'ont pas toutes le même nombre de lignes ({sorted(lengths)}) : elle est ignorée.")
+                return []
+            rows = [{key: column[i] for key, column in value.items()} for i in range(lengths.pop())]
+        else:
+            rows = [value]
+    else:
+        return []
+    return [{key: None if cell in (-1, "") else cell for key, cell in row.items()} for row in rows]
@@ -0,0 +1,177 @@
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Union, TYPE_CHECKING
+import datetime
+import time
+
+if TYPE_CHECKING:
+    from .pipeline_wrapper import PipelineWrapper
+
+TERMINAL_STATUSES = {"Completed", "Finished", "Failed", "Canceled"}
+
+
+class PipelineRunHandle():
+    def __init__(self, run: Any, name: Union[str, None] = None) -> None:
+        """Référence vers une Run de pipeline soumise sans attendre sa fin (voir PipelineWrapper.submit()).
+
+        Args:
+            run (PipelineRun): La Run retournée par Experiment.submit()
+            name (str, optional): Un nom pour reconnaître la Run (ex: la variante d'hyperparamètres). Defaults to l'id de la Run.
+        """
+        self.run = run
+        self.name = name if name is not None else run.id
+        self.status = "NotStarted"
+        self.submitted = time.monotonic()
+        self.finished: Union[float, None] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+    def poll(self) -> str:
+        """Récupère le statut de la Run auprès d'AzureML (un appel réseau) et le retourne."""
+        if self.done:
+            return self.status
+        status: str = self.run.get_status()
+        if status in TERMINAL_STATUSES:
+            self.finished = time.monotonic()
+        self.status = status
+        return status
+
+    def wait(self, timeout: Union[float, None] = None) -> str:
+        """Attend la fin de cette Run seulement. Pour plusieurs Runs, utilisez plutôt un RunMonitor."""
+        return RunMonitor([self]).wait_all(timeout)[0].status
+
+    def step_durations(self) -> Dict[str, float]:
+        """La durée, en secondes, de chaque step terminé ou en cours de la Run, par nom de step."""
+        durations = {}
+        for step_run in self.run.get_steps():
+            details = step_run.get_details()
+            if details.get("startTimeUtc") and details.get("endTimeUtc"):
+                durations[step_run.name] = (parse_time(details["endTimeUtc"]) - parse_time(details["startTimeUtc"])).total_seconds()
+        return durations
+
+
+class RunMonitor():
+    VARIANT_TAG = "azureml_wrapper_variant"
+
+    def __init__(self, handles: Iterable[PipelineRunHandle], min_interval: float = 5.0, max_interval: float = 60.0,
+                 backoff: float = 1.5, max_workers: int = 8) -> None:
+        """Surveille plusieurs Runs de pipelines dans une seule boucle. À chaque tour, le statut de toutes les Runs non terminées
+            est récupéré en parallèle. Le délai entre deux tours est multiplié par backoff tant qu'aucun statut ne change
+            (jusqu'à max_interval) et revient à min_interval dès qu'un statut change.
+
+        Args:
+            handles (Iterable[PipelineRunHandle]): Les Runs à surveiller
+            min_interval (float, optional): Le délai minimal entre deux tours, en secondes. Defaults to 5.0.
+            max_interval (float, optional): Le délai maximal entre deux tours, en secondes. Defaults to 60.0.
+            backoff (float, optional): Le facteur d'augmentation du délai. Defaults to 1.5.
+            max_workers (int, optional): Le nombre maximal de statuts récupérés en même temps. Defaults to 8.
+        """
+        if min_interval < 0 or max_interval < min_interval or backoff < 1:
+            raise ValueError("Il faut 0 <= min_interval <= max_interval et backoff >= 1.")
+        self.handles = list(handles)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.max_workers = max_workers
+        self.polls = 0
+
+    @classmethod
+    def submit_all(cls, pipelines: Iterable[PipelineWrapper], experiment_name: str,
+                   tags: Union[Dict[str, str], List[Dict[str, str]], None] = None, names: Union[List[str], None] = None,
+                   max_workers: int = 8, **kwargs: Any) -> RunMonitor:
+        """Soumet tous les pipelines en parallèle, sans attendre leur fin, et retourne un RunMonitor pour les suivre. Chaque Run
+            reçoit aussi le tag VARIANT_TAG, la position de son pipeline dans pipelines.
+
+        Args:
+            pipelines (Iterable[PipelineWrapper]): Les pipelines à soumettre (ex: une variante d'hyperparamètres chacun)
+            experiment_name (str): Le nom de l'Experiment
+            tags (dict ou list, optional): Les tags de toutes les Runs, ou une liste de tags par pipeline. Defaults to None.
+            names (List[str], optional): Le nom du handle de chaque pipeline. Defaults to l'id de chaque Run.
+            max_workers (int, optional): Le nombre maximal de pipelines soumis en même temps. Defaults to 8.
+
+        Returns:
+            RunMonitor: Le RunMonitor des Runs soumises, dans l'ordre de pipelines
+        """
+        pipelines = list(pipelines)
+        for values, argument in [(tags, "tags"), (names, "names")]:
+            if isinstance(values, list) and len(values) != len(pipelines):
+                raise ValueError(f"{argument} contient {len(values)} éléments pour {len(pipelines)} pipelines.")
+
+        def submit(index: int) -> PipelineRunHandle:
+            run_tags = dict((tags[index] if isinstance(tags, list) else tags) or {})
+            run_tags[cls.VARIANT_TAG] = str(index)
+            return pipelines[index].submit(experiment_name, run_tags, names[index] if names is not None else None)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            handles = list(executor.map(submit, range(len(pipelines))))
+        return cls(handles, max_workers=max_workers, **kwargs)
+
+    @property
+    def pending(self) -> List[PipelineRunHandle]:
+        return [handle for handle in self.handles if not handle.done]
+
+    def poll(self) -> List[PipelineRunHandle]:
+        """Fait un tour de surveillance et retourne les Runs dont le statut a changé."""
+        pending = self.pending
+        if not pending:
+            return []
+        previous = {id(handle): handle.status for handle in pending}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(pending))) as executor:
+            list(executor.map(lambda handle: handle.poll(), pending))
+        self.polls += 1
+        return [handle for handle in pending if handle.status != previous[id(handle)]]
+
+    def wait_any(self, timeout: Union[float, None] = None) -> List[PipelineRunHandle]:
+        """Attend qu'au moins une des Runs non terminées se termine et retourne les Runs terminées pendant l'attente.
+
+        Raises:
+            TimeoutError: Si aucune Run ne s'est terminée après timeout secondes
+        """
+        return self._wait(lambda finished, pending: bool(finished) or not pending, timeout)
+
+    def wait_all(self, timeout: Union[float, None] = None) -> List[PipelineRunHandle]:
+        """Attend la fin de toutes les Runs et les retourne.
+
+        Raises:
+            TimeoutError: Si des Runs ne sont pas terminées après timeout secondes
+        """
+        self._wait(lambda finished, pending: not pending, timeout)
+        return self.handles
+
+    def step_durations(self) -> Dict[str, Dict[str, float]]:
+        """La durée de chaque step, par nom de Run puis par nom de step."""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return dict(zip([handle.name for handle in self.handles], executor.map(lambda handle: handle.step_durations(), self.handles)))
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Pour chaque Run : son nom, son statut et sa durée (du point de vue du processus qui la surveille)."""
+        return [{"name": handle.name, "status": handle.status,
+                 "duration": (handle.finished if handle.finished is not None else time.monotonic()) - handle.submitted}
+                for handle in self.handles]
+
+    def _wait(self, condition: Any, timeout: Union[float, None]) -> List[PipelineRunHandle]:
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        finished: List[PipelineRunHandle] = []
+        interval = self.min_interval
+        while True:
+            changed = self.poll()
+            finished.extend(handle for handle in changed if handle.done)
+            if condition(finished, self.pending):
+                return finished
+            interval = self.min_interval if changed else min(interval * self.backoff, self.max_interval)
+            if deadline is not None:
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"Les Runs {[handle.name for handle in self.pending]} ne sont pas terminées après {timeout} secondes.")
+                interval = min(interval, max(deadline - time.monotonic(), 0.0))
+            time.sleep(interval)
+
+
+def parse_time(value: Any) -> datetime.datetime:
+    """Convertit une date d'AzureML (ex: "2022-03-01T12:00:00.1234567Z") ou un timestamp en datetime."""
+    if isinstance(value, (int, float)):
+        return datetime.datetime.fromtimestamp(value)
+    seconds, _, fraction = str(value).rstrip("Z").partition(".")
+    parsed = datetime.datetime.strptime(seconds[:19], "%Y-%m-%dT%H:%M:%S")
+    return parsed + datetime.timedelta(seconds=float(f"0.{fraction}") if fraction.isdigit() else 0.0)
@@ -1,14 +1,46 @@
-from azureml.core import Run
+from __future__ import annotations
+from contextlib import contextmanager, ExitStack
+from typing import Any, Dict, Iterator, List, Union, TYPE_CHECKING
 import argparse
+import datetime
 import json
-import pandas as pd
 import os
 import sys
+import tempfile
+import time
+
+from .data_formats import (DataFormat, CsvFormat, ChunkWriter, Filters, get_format, format_from_path, find_file, shard_bounds, write_schema,
+                           DEFAULT_FORMAT, DEFAULT_CHUNKSIZE, FORMATS)
+from .dataset_cache import DatasetCache
+from .naming import argument_name, dest_name
+from .incremental import IncrementalManifest, DatastoreStorage, LocalStorage
+from .local_run import LocalRun
+from .memory import optimize_dataframe
+from .profiler import StepProfiler
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from azureml.core import Run
+
+# Écrit par complete() dans chaque output folder : l'output est complet (voir PipelineWrapper.resume()). Comme les autres
+# fichiers débutant par "_", il n'est pas une donnée : les lecteurs d'un output (ou d'un Dataset enregistré sur son dossier)
+# doivent l'ignorer
+CHECKPOINT_FILE = "_checkpoint.json"
 
 
 class ScriptWrapper():
-    def __init__(self) -> None:
-        self.run = Run.get_context()
+    def __init__(self, data_format: Union[str, DataFormat, None] = None) -> None:
+        """Donne accès aux arguments, Datasets et folders passés au script par le PipelineWrapper.
+
+        Args:
+            data_format (str, optional): Le format par défaut des fichiers passés entre les étapes ("csv", "parquet" ou "arrow").
+                                         Si None, le format reçu via --data-format est utilisé, sinon csv. Defaults to None.
+        """
+        if os.environ.get(LocalRun.ENV_VARIABLE):
+            self.run = LocalRun.from_env()
+        else:
+            from azureml.core import Run
+            self.run = Run.get_context()
         self.parser = argparse.ArgumentParser()
         self.args_list = []
         for arg in sys.argv[1:]:
@@ -17,48 +49,409 @@ class ScriptWrapper():
                     self.parser.add_argument("--config", type=json.loads, dest="config")
                     self.args_list.append("config")
                 else:
-                    arg_name = str(arg).replace("--", "").replace("-", "_")
+                    arg_name = dest_name(str(arg))
                     self.parser.add_argument(str(arg), type=str, dest=arg_name)
                     self.args_list.append(arg_name)
         self.args = self.parser.parse_args()
+        if data_format is None:
+            data_format = self.args.data_format if "data_format" in self.args_list else DEFAULT_FORMAT
+        self.data_format = get_format(data_format)
+        self.profiler = StepProfiler(getattr(self.run, "step_name", None) or os.path.splitext(os.path.basename(sys.argv[0]))[0])
+        self.memory_reports: Dict[str, pd.DataFrame] = {}
+        self._incremental: Union[IncrementalManifest, None] = None
+        self._incremental_blobs: List[str] = []
+        self._incremental_paths: List[str] = []
+        self._partitions: List[str] = []
+        self._dataset_cache: Union[DatasetCache, None] = None
 
     @property
     def run(self):
         return self._run
 
     @run.setter
-    def run(self, new_run: Run):
+    def run(self, new_run: Union[Run, LocalRun]):
+        if isinstance(new_run, LocalRun):
+            self._run = new_run
+            return
+        from azureml.core import Run
         if isinstance(new_run, Run):
             self._run = new_run
 
+    @property
+    def input_folders(self) -> Dict[str, str]:
+        """Les input folders reçus, par nom d'argument (ex: {"input_folder_step1": "/mnt/..."})."""
+        return {arg: getattr(self.args, arg) for arg in self.args_list if arg.startswith("input_folder")}
+
+    @property
+    def output_folders(self) -> Dict[str, str]:
+        """Les output folders reçus, par nom d'argument (ex: {"output_folder_features": "/mnt/..."})."""
+        return {arg: getattr(self.args, arg) for arg in self.args_list if arg.startswith("output_folder")}
+
+    @property
+    def shard_index(self) -> int:
+        """L'index du shard exécuté par ce script quand son step est sharded (voir PipelineStep shards), 0 sinon."""
+        return int(self.args.shard_index) if "shard_index" in self.args_list else 0
+
+    @property
+    def shard_count(self) -> int:
+        """Le nombre de shards du step, 1 s'il n'est pas sharded."""
+        return int(self.args.shard_count) if "shard_count" in self.args_list else 1
+
+    @property
+    def dataset_cache(self) -> DatasetCache:
+        """Le cache local du noeud utilisé par les lectures de Datasets avec cache=True (voir DatasetCache)."""
+        if self._dataset_cache is None:
+            self._dataset_cache = DatasetCache()
+        return self._dataset_cache
+
+    @dataset_cache.setter
+    def dataset_cache(self, dataset_cache: DatasetCache) -> None:
+        self._dataset_cache = dataset_cache
+
     def get_config(self):
         if "config" not in self.args_list:
             raise ValueError(f"config n'est pas dans la liste d'arguments reçus. Soit : {self.args_list}.")
         return self.args.config
 
-    def get_csv_from_input_folder(self, csv_name: str) -> pd.DataFrame:
-        if "input_folder" not in self.args_list:
+    def get_csv_from_input_folder(self, csv_name: str, columns: Union[List[str], None] = None, filters: Union[Filters, None] = None,
+                                  dtypes: Union[Dict[str, str], None] = None, optimize: bool = False) -> pd.DataFrame:
+        return self.get_from_input_folder(csv_name, "csv", columns=columns, filters=filters, dtypes=dtypes, optimize=optimize)
+
+    def save_csv_in_output_folder(self, dataframe: pd.DataFrame, saving_name: str, index: bool = False, header: bool = True,
+                                  compression: Union[str, None] = None, persist_schema: bool = True):
+        csv_format = CsvFormat()
+        path = self._output_path(saving_name, csv_format, compression=compression)
+        with self.profiler.measure(f"write:{os.path.basename(path)}", "write", rows=len(dataframe)) as record:
+            csv_format.write(dataframe, path, index=index, header=header, compression=compression)
+            if persist_schema and header:
+                write_schema(dataframe, path)
+        record["bytes"] = os.path.getsize(path)
+
+    def get_from_input_folder(self, name: str, data_format: Union[str, DataFormat, None] = None,
+                              input_name: Union[str, None] = None, columns: Union[List[str], None] = None,
+                              filters: Union[Filters, None] = None, dtypes: Union[Dict[str, str], None] = None,
+                              optimize: bool = False) -> pd.DataFrame:
+        """Charge un DataFrame sauvegardé par l'étape précédente. Si data_format est None, le format est déduit de
+            l'extension de name ou du fichier présent dans l'input folder (en essayant d'abord le format par défaut).
+            Avec parquet et arrow, seules les colonnes demandées sont lues et les filtres sont appliqués avant la conversion en DataFrame.
+
+        Args:
+            name (str): Le nom du fichier (avec ou sans extension)
+            data_format (str, optional): Le format du fichier. Defaults to None.
+            input_name (str, optional): Quand le step a plusieurs dépendances, le step (et l'output) d'où provient le fichier,
+                                        ex: "step1" ou "step1-features" pour --input-folder-step1-features. Defaults to None.
+            columns (List[str], optional): Les colonnes à charger. Defaults to None (toutes).
+            filters (List[Tuple[str, str, Any]], optional): Les conditions (colonne, opérateur, valeur) que les lignes chargées
+                                                            doivent toutes respecter, ex: [("annee", ">=", 2020)]. Defaults to None.
+            dtypes (Dict[str, str], optional): Les dtypes à imposer, par colonne. Pour un csv, ceux du schéma sauvegardé par
+                                               l'étape précédente sont utilisés par défaut. Defaults to None.
+            optimize (bool, optional): Réduire la mémoire du DataFrame (voir optimize_dataframe()). Le rapport mémoire est
+                                       conservé dans memory_reports[name]. Defaults to False.
+
+        Returns:
+            pd.DataFrame: Le DataFrame chargé
+        """
+        path = self._input_path(name, data_format, input_name)
+        with self.profiler.measure(f"read:{os.path.basename(path)}", "read", nbytes=os.path.getsize(path)) as record:
+            dataframe = (format_from_path(path) or self.data_format).read(path, columns=columns, filters=filters, dtypes=dtypes)
+            record["rows"] = len(dataframe)
+            if optimize:
+                dataframe = self._optimize(name, dataframe, record)
+        return dataframe
+
+    def iter_from_input_folder(self, name: str, chunksize: int = DEFAULT_CHUNKSIZE,
+                               data_format: Union[str, DataFormat, None] = None, input_name: Union[str, None] = None,
+                               columns: Union[List[str], None] = None, filters: Union[Filters, None] = None,
+                               dtypes: Union[Dict[str, str], None] = None) -> Iterator[pd.DataFrame]:
+        """Comme get_from_input_folder(), mais retourne un générateur de DataFrames d'au plus chunksize lignes.
+            Le fichier n'est jamais chargé au complet en mémoire.
+        """
+        path = self._input_path(name, data_format, input_name)
+        chunks = (format_from_path(path) or self.data_format).iter_read(path, chunksize, columns=columns, filters=filters, dtypes=dtypes)
+        return self.profiler.track_iter(f"read:{os.path.basename(path)}", chunks, os.path.getsize(path))
+
+    def get_shard_from_input_folder(self, name: str, data_format: Union[str, DataFormat, None] = None,
+                                    input_name: Union[str, None] = None) -> pd.DataFrame:
+        """Comme get_from_input_folder(), mais ne charge que les lignes du shard de ce script (tout le fichier si le step n'est
+            pas sharded). Les shards sont des parts contiguës du fichier, dans l'ordre.
+        """
+        path = self._input_path(name, data_format, input_name)
+        selected_format = format_from_path(path) or self.data_format
+        with self.profiler.measure(f"read:{os.path.basename(path)}[{self.shard_index}/{self.shard_count}]", "read") as record:
+            start, stop = shard_bounds(selected_format.count_rows(path), self.shard_index, self.shard_count)
+            dataframe = selected_format.read_rows(path, start, stop)
+            record["rows"] = len(dataframe)
+        return dataframe
+
+    def save_in_output_folder(self, dataframe: pd.DataFrame, saving_name: str, data_format: Union[str, DataFormat, None] = None,
+                              index: bool = False, output_name: Union[str, None] = None, compression: Union[str, None] = None,
+                              persist_schema: bool = True) -> None:
+        """Sauvegarde un DataFrame dans l'output folder pour l'étape suivante.
+
+        Args:
+            dataframe (pd.DataFrame): Le DataFrame à sauvegarder
+            saving_name (str): Le nom du fichier (l'extension du format est ajoutée au besoin)
+            data_format (str, optional): Le format du fichier. Si None, le format par défaut du ScriptWrapper. Defaults to None.
+            index (bool, optional): Sauvegarder l'index du DataFrame. Defaults to False.
+            output_name (str, optional): L'output nommé (voir PipelineStep outputs) dans lequel sauvegarder. Defaults to None.
+            compression (str, optional): La compression du fichier, parmi celles du format (ex: "gzip" ou "zstd" pour csv,
+                                         "zstd" pour parquet et arrow). Defaults to None (celle par défaut du format).
+            persist_schema (bool, optional): Pour un format qui ne conserve pas les dtypes (csv), les sauvegarder à côté du fichier
+                                             pour que l'étape suivante n'ait pas à les inférer. Defaults to True.
+        """
+        selected_format = get_format(data_format) if data_format is not None else self.data_format
+        path = self._output_path(saving_name, selected_format, output_name, compression)
+        with self.profiler.measure(f"write:{os.path.basename(path)}", "write", rows=len(dataframe)) as record:
+            selected_format.write(dataframe, path, index=index, compression=compression)
+            if persist_schema and not selected_format.typed:
+                write_schema(dataframe, path)
+        record["bytes"] = os.path.getsize(path)
+
+    def open_output_writer(self, saving_name: str, data_format: Union[str, DataFormat, None] = None, index: bool = False,
+                           output_name: Union[str, None] = None, compression: Union[str, None] = None,
+                           persist_schema: bool = True) -> ChunkWriter:
+        """Ouvre un fichier de l'output folder dans lequel ajouter des DataFrames morceau par morceau. Exemple :
+            with script.open_output_writer("features") as writer:
+                for chunk in script.iter_from_input_folder("raw"):
+                    writer.write(transform(chunk))
+        """
+        selected_format = get_format(data_format) if data_format is not None else self.data_format
+        path = self._output_path(saving_name, selected_format, output_name, compression)
+        writer = selected_format.open_writer(path, index=index, compression=compression)
+        writer.persist_schema = persist_schema and not selected_format.typed
+        return self.profiler.track_writer(f"write:{os.path.basename(path)}", writer)
+
+    def _input_path(self, name: str, data_format: Union[str, DataFormat, None] = None, input_name: Union[str, None] = None) -> str:
+        folder = self._input_folder(input_name)
+        if data_format is not None:
+            return find_file(folder, get_format(data_format).file_name(name), data_format)
+        return find_file(folder, name, self.data_format)
+
+    def _input_folder(self, input_name: Union[str, None] = None) -> str:
+        arg_name = "input_folder" if input_name is None else dest_name(f"input-folder-{argument_name(input_name)}")
+        if arg_name not in self.args_list:
+            if input_name is not None:
+                raise ValueError(f"Aucun input folder {input_name} de reçu en argument. Input folders reçus : {list(self.input_folders)}.")
             raise ValueError("""Aucun input folder de reçu en argument.
                              Ce script est probablement la première étape du pipeline.
                              Utilisez get_csv_from_config() si vous souhaitez charger un Dataset
                              qui ne provient pas d'une étape précédente du pipeline.""")
-        if not csv_name.endswith(".csv"):
-            csv_name += ".csv"
-        return pd.read_csv(os.path.join(self.args.input_folder, csv_name))
+        return str(getattr(self.args, arg_name))
+
+    def _output_path(self, saving_name: str, data_format: DataFormat, output_name: Union[str, None] = None,
+                     compression: Union[str, None] = None) -> str:
+        return os.path.join(self._output_folder(output_name), data_format.file_name(saving_name, compression))
 
-    def save_csv_in_output_folder(self, dataframe: pd.DataFrame, saving_name: str, index: bool = False, header: bool = True):
-        if "output_folder" not in self.args_list:
+    def _output_folder(self, output_name: Union[str, None] = None) -> str:
+        arg_name = "output_folder" if output_name is None else dest_name(f"output-folder-{argument_name(output_name)}")
+        if arg_name not in self.args_list:
+            if output_name is not None:
+                raise ValueError(f"Aucun output folder {output_name} de reçu en argument. Output folders reçus : {list(self.output_folders)}.")
             raise ValueError("""Aucun output folder de reçu en argument. Ce script est probablement la dernière étape du pipeline.""")
-        if not saving_name.endswith(".csv"):
-            saving_name += ".csv"
-        folder = self.args.output_folder
+        folder = str(getattr(self.args, arg_name))
+        os.makedirs(folder, exist_ok=True)
+        return folder
+
+    def incremental_files(self) -> List[str]:
+        """Les chemins locaux des blobs nouveaux ou modifiés du dossier incremental du step (voir PipelineStep incremental) depuis
+            sa dernière exécution réussie. Seuls ces blobs sont téléchargés. Ils sont marqués comme traités par complete(), une fois
+            les outputs écrits : si le script échoue avant, ils seront de nouveau exposés à la prochaine exécution.
+        """
+        if "incremental_datastore" not in self.args_list:
+            raise ValueError("Ce step n'est pas incremental. Déclarez incremental dans la config du step.")
+        if self._incremental is None:
+            manifest = IncrementalManifest(self._incremental_storage(), self.args.incremental_path, self.args.incremental_manifest)
+            with self.profiler.measure("incremental:list", "read") as record:
+                self._incremental_blobs = manifest.load().new_blobs()
+                record["blobs"] = len(self._incremental_blobs)
+            with self.profiler.measure("incremental:download", "read") as record:
+                self._incremental_paths = manifest.download(self._incremental_blobs)
+                record["bytes"] = sum(os.path.getsize(path) for path in self._incremental_paths)
+            self._incremental = manifest
+        return list(self._incremental_paths)
+
+    def save_partition(self, dataframe: pd.DataFrame, saving_name: str, data_format: Union[str, DataFormat, None] = None,
+                       output_name: Union[str, None] = None, compression: Union[str, None] = None, persist_schema: bool = True) -> str:
+        """Ajoute dataframe comme une nouvelle partition (<saving_name>/part-<date>-<run>-<n>) de l'output folder, sans réécrire
+            les partitions existantes. Les outputs d'un step incremental ayant une destination fixe (voir PipelineStep incremental),
+            chaque exécution n'y ajoute que ses nouvelles données. Les partitions se relisent via iter_partitions_from_input_folder().
+            Voir save_in_output_folder() pour les arguments.
+
+        Returns:
+            str: Le chemin de la partition
+        """
+        selected_format = get_format(data_format) if data_format is not None else self.data_format
+        folder = os.path.join(self._output_folder(output_name), saving_name)
         os.makedirs(folder, exist_ok=True)
-        save_path = os.path.join(folder, saving_name)
-        dataframe.to_csv(save_path, index=index, header=header)
+        stamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        partition_name = f"part-{stamp}-{argument_name(str(self.run.id))}-{len(self._partitions):05d}"
+        path = os.path.join(folder, selected_format.file_name(partition_name, compression))
+        with self.profiler.measure(f"write:{saving_name}/{os.path.basename(path)}", "write", rows=len(dataframe)) as record:
+            selected_format.write(dataframe, path, compression=compression)
+            if persist_schema and not selected_format.typed:
+                write_schema(dataframe, path)
+        record["bytes"] = os.path.getsize(path)
+        self._partitions.append(f"{saving_name}/{os.path.basename(path)}")
+        return path
 
-    def get_csv_from_config(self, csv_name: str) -> pd.DataFrame:
+    def iter_partitions_from_input_folder(self, name: str, chunksize: int = DEFAULT_CHUNKSIZE, input_name: Union[str, None] = None,
+                                          columns: Union[List[str], None] = None, filters: Union[Filters, None] = None,
+                                          dtypes: Union[Dict[str, str], None] = None) -> Iterator[pd.DataFrame]:
+        """Lit par morceaux toutes les partitions name écrites par save_partition(), dans l'ordre où elles ont été écrites."""
+        folder = os.path.join(self._input_folder(input_name), name)
+        if not os.path.isdir(folder):
+            raise FileNotFoundError(f"Aucune partition {name} dans {self._input_folder(input_name)}.")
+        for file_name in sorted(os.listdir(folder)):
+            data_format = format_from_path(file_name)
+            if data_format is None or file_name.startswith("_"):
+                continue
+            path = os.path.join(folder, file_name)
+            yield from self.profiler.track_iter(f"read:{name}/{file_name}",
+                                                data_format.iter_read(path, chunksize, columns=columns, filters=filters, dtypes=dtypes),
+                                                os.path.getsize(path))
+
+    def _incremental_storage(self) -> Union[DatastoreStorage, LocalStorage]:
+        datastore_name = self.args.incremental_datastore
+        if isinstance(self.run, LocalRun):
+            if datastore_name not in self.run.datastores:
+                raise NameError(f"Aucun dossier local ne remplace le Datastore {datastore_name}. Voir LocalRunner datastores.")
+            return LocalStorage(self.run.datastores[datastore_name])
+        from azureml.core import Datastore
+        return DatastoreStorage(Datastore.get(self.run.experiment.workspace, datastore_name))
+
+    def get_csv_from_config(self, csv_name: str, optimize: bool = False, cache: bool = False) -> pd.DataFrame:
+        """Charge un Dataset tabulaire passé via input_datasets. Un Dataset monté ou téléchargé (voir PipelineStep dataset_modes)
+            est lu du disque local. Avec cache=True, un Dataset lu directement est conservé dans le cache local du noeud
+            (voir dataset_cache) et relu de là par les steps et les Runs suivantes qui s'exécutent sur le même noeud.
+        """
+        import pandas as pd
         if csv_name.endswith(".csv"):
             csv_name.replace(".csv", "")
         if csv_name not in self.get_config().values():
             raise NameError(f"{csv_name} n'est pas dans config. Voici le contenu de config : {self.get_config()}.")
-        return self.run.input_datasets[csv_name].to_pandas_dataframe()
+        with self.profiler.measure(f"read:{csv_name}", "read") as record:
+            if cache or isinstance(self.run.input_datasets[csv_name], str):
+                with self._dataset_files(csv_name, cache, record) as paths:
+                    dataframe = pd.concat([_file_format(path).read(path) for path in paths], ignore_index=True)
+            else:
+                record["source"] = "blob"
+                dataframe = self.run.input_datasets[csv_name].to_pandas_dataframe()
+            record["rows"] = len(dataframe)
+            if optimize:
+                dataframe = self._optimize(csv_name, dataframe, record)
+        record["bytes"] = int(dataframe.memory_usage(deep=True).sum())
+        return dataframe
+
+    def _optimize(self, name: str, dataframe: pd.DataFrame, record: Dict[str, Any]) -> pd.DataFrame:
+        """Optimise la mémoire de dataframe, conserve son rapport mémoire et en inscrit les totaux dans la mesure record.
+            Les dtypes choisis suivent le DataFrame s'il est sauvegardé (nativement en parquet et arrow, via le schéma en csv).
+        """
+        dataframe, report = optimize_dataframe(dataframe)
+        self.memory_reports[name] = report
+        record["memory_bytes_before"] = int(report.loc["total", "bytes_before"])
+        record["memory_bytes_after"] = int(report.loc["total", "bytes_after"])
+        return dataframe
+
+    def iter_from_config(self, dataset_name: str, chunksize: int = DEFAULT_CHUNKSIZE, columns: Union[List[str], None] = None,
+                         filters: Union[Filters, None] = None, cache: bool = False) -> Iterator[pd.DataFrame]:
+        """Lit un Dataset tabulaire passé via input_datasets par morceaux d'au plus chunksize lignes. Le Dataset est matérialisé
+            en fichiers Parquet sur le disque local (et non en mémoire), puis lu row group par row group (seulement les colonnes
+            columns et les lignes qui respectent filters, voir get_from_input_folder()). Voir get_csv_from_config() pour cache.
+        """
+        if dataset_name not in self.get_config().values():
+            raise NameError(f"{dataset_name} n'est pas dans config. Voici le contenu de config : {self.get_config()}.")
+        with ExitStack() as stack:
+            with self.profiler.measure(f"download:{dataset_name}", "read") as record:
+                paths = stack.enter_context(self._dataset_files(dataset_name, cache, record))
+                record["bytes"] = sum(os.path.getsize(path) for path in paths)
+            for path in paths:
+                yield from self.profiler.track_iter(f"read:{dataset_name}", _file_format(path).iter_read(path, chunksize, columns, filters),
+                                                    os.path.getsize(path))
+
+    def get_shard_from_config(self, dataset_name: str, cache: bool = False) -> pd.DataFrame:
+        """Charge les lignes du shard de ce script d'un Dataset tabulaire passé via input_datasets. Le Dataset est matérialisé en
+            fichiers Parquet sur le disque local et seuls les row groups du shard sont lus. Voir get_csv_from_config() pour cache.
+        """
+        import pandas as pd
+        if dataset_name not in self.get_config().values():
+            raise NameError(f"{dataset_name} n'est pas dans config. Voici le contenu de config : {self.get_config()}.")
+        with self.profiler.measure(f"read:{dataset_name}[{self.shard_index}/{self.shard_count}]", "read") as record:
+            with self._dataset_files(dataset_name, cache, record) as paths:
+                rows = [_file_format(path).count_rows(path) for path in paths]
+                start, stop = shard_bounds(sum(rows), self.shard_index, self.shard_count)
+                chunks, offset = [], 0
+                for path, file_rows in zip(paths, rows):
+                    if offset < stop and offset + file_rows > start:
+                        chunks.append(_file_format(path).read_rows(path, max(start - offset, 0), min(stop, offset + file_rows) - offset))
+                    offset += file_rows
+                dataframe = pd.concat(chunks, ignore_index=True) if chunks else _file_format(paths[0]).read_rows(paths[0], 0, 0)
+            record["rows"] = len(dataframe)
+        return dataframe
+
+    @contextmanager
+    def _dataset_files(self, dataset_name: str, cache: bool, record: Dict[str, Any]) -> Iterator[List[str]]:
+        """Les fichiers locaux d'un Dataset de input_datasets, triés : ceux du dossier monté ou téléchargé par AzureML, ceux du
+            cache local du noeud si cache est vrai, sinon ceux d'un téléchargement temporaire. La provenance ("local", "cache"
+            ou "blob") est inscrite dans la mesure record.
+        """
+        dataset = self.run.input_datasets[dataset_name]
+        if isinstance(dataset, str):
+            record["source"] = "local"
+            yield _data_files(dataset)
+        elif cache:
+            hits = self.dataset_cache.hits
+            paths = self.dataset_cache.fetch(dataset_name, dataset)
+            record["source"] = "cache" if self.dataset_cache.hits > hits else "blob"
+            yield paths
+        else:
+            record["source"] = "blob"
+            with tempfile.TemporaryDirectory() as folder:
+                yield sorted(dataset.to_parquet_files().download(target_path=folder, overwrite=True))
+
+    def measure(self, operation: str) -> Any:
+        """Chronomètre une section de calcul du step. Exemple :
+            with script.measure("entrainement") as record:
+                model.fit(features)
+                record["rows"] = len(features)
+        """
+        return self.profiler.measure(operation, "compute")
+
+    @contextmanager
+    def profile_step(self) -> Iterator[None]:
+        """Capture un profil cProfile du bloc, écrit par complete() à côté de la trace du step."""
+        with self.profiler.profile():
+            yield
+
+    def complete(self) -> Union[str, None]:
+        """Logge les mesures du step dans la Run (run.log/run.log_row), écrit la trace JSON dans ./outputs (téléversé par AzureML
+            avec la Run, <run_directory>/outputs en local) plutôt que dans les output folders, qui ne contiennent que des données
+            et le marqueur CHECKPOINT_FILE, marque chaque output folder comme complet, marque les blobs retournés par
+            incremental_files() comme traités, puis complète la Run.
+
+        Returns:
+            str: Le chemin de la trace JSON
+        """
+        output_folders = self.output_folders
+        folder = os.path.join(self.run.run_directory, "outputs") if isinstance(self.run, LocalRun) else "outputs"
+        trace_path = self.profiler.flush(self.run, folder)
+        for output_folder in output_folders.values():
+            os.makedirs(output_folder, exist_ok=True)
+            with open(os.path.join(output_folder, CHECKPOINT_FILE), "w") as checkpoint_file:
+                json.dump({"step_name": self.profiler.step_name, "run_id": str(self.run.id), "time": time.time()}, checkpoint_file)
+        if self._incremental is not None:
+            self._incremental.commit(self._incremental_blobs, str(self.run.id), self._partitions)
+            self._incremental.cleanup()
+        self.run.complete()
+        return trace_path
+
+
+def _data_files(path: str) -> List[str]:
+    """Les fichiers de données (d'un format connu) de path, un fichier ou un dossier, triés."""
+    if os.path.isfile(path):
+        return [path]
+    return sorted(os.path.join(folder, file_name) for folder, _, file_names in os.walk(path) for file_name in file_names
+                  if format_from_path(file_name) is not None)
+
+
+def _file_format(path: str) -> DataFormat:
+    return format_from_path(path) or FORMATS["parquet"]
@@ -0,0 +1,156 @@
+from __future__ import annotations
+from typing import Any, Dict, Iterable, List, Set, Union
+import ast
+import glob
+import hashlib
+import os
+import shutil
+import threading
+import time
+
+
+class SnapshotBuilder():
+    DEFAULT_DIRECTORY = os.path.join(os.path.expanduser("~"), ".azureml_wrapper", "snapshots")
+
+    def __init__(self, directory: Union[str, None] = None) -> None:
+        """Construit le snapshot minimal d'un step : son script, les modules locaux qu'il importe (découverts statiquement, de
+            façon récursive) et les fichiers supplémentaires déclarés. Chaque snapshot est copié dans un dossier nommé selon le
+            hash de son contenu : les steps au contenu identique partagent le même dossier et un snapshot inchangé n'est pas
+            reconstruit d'une soumission à l'autre (AzureML ne le téléverse alors pas de nouveau).
+
+        Args:
+            directory (str, optional): Le dossier où conserver les snapshots. Defaults to ~/.azureml_wrapper/snapshots.
+        """
+        self.directory = directory if directory is not None else self.DEFAULT_DIRECTORY
+        # Les snapshots construits par ce builder, par hash de contenu : un script modifié entre temps a un autre hash
+        self._built: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def build(self, script_directory: str, script_name: str, extra_files: Union[Iterable[str], None] = None) -> Dict[str, Any]:
+        """Construit (ou réutilise) le snapshot d'un step.
+
+        Args:
+            script_directory (str): Le dossier source du step
+            script_name (str): Le script du step, relatif à script_directory
+            extra_files (Iterable[str], optional): Des fichiers, dossiers ou patterns glob supplémentaires, relatifs à
+                                                   script_directory (ex: fichiers de config, modules importés dynamiquement). Defaults to None.
+
+        Raises:
+            FileNotFoundError: Si le script ou un fichier supplémentaire n'existe pas
+
+        Returns:
+            dict: Le chemin du snapshot, son hash, ses fichiers, sa taille (octets), son temps de construction (secondes) et
+                  s'il a été réutilisé
+        """
+        script_directory = os.path.abspath(script_directory)
+        start = time.perf_counter()
+        files = sorted(self.files(script_directory, script_name, extra_files))
+        digest = hashlib.sha256()
+        for relative_path in files:
+            digest.update(relative_path.replace(os.sep, "/").encode())
+            with open(os.path.join(script_directory, relative_path), "rb") as source_file:
+                digest.update(hashlib.sha256(source_file.read()).digest())
+        snapshot_hash = digest.hexdigest()
+        with self._lock:
+            if snapshot_hash in self._built:
+                return {**self._built[snapshot_hash], "seconds": time.perf_counter() - start, "reused": True}
+        path = os.path.join(self.directory, snapshot_hash)
+        reused = os.path.isdir(path)
+        if not reused:
+            temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            for relative_path in files:
+                os.makedirs(os.path.dirname(os.path.join(temporary_path, relative_path)), exist_ok=True)
+                shutil.copy2(os.path.join(script_directory, relative_path), os.path.join(temporary_path, relative_path))
+            try:
+                os.rename(temporary_path, path)
+            except OSError:
+                shutil.rmtree(temporary_path, ignore_errors=True)
+        snapshot = {"path": path, "hash": snapshot_hash, "files": files, "reused": reused,
+                    "size": sum(os.path.getsize(os.path.join(path, relative_path)) for relative_path in files),
+                    "seconds": time.perf_counter() - start}
+        with self._lock:
+            self._built[snapshot_hash] = snapshot
+        return snapshot
+
+    @classmethod
+    def files(cls, script_directory: str, script_name: str, extra_files: Union[Iterable[str], None] = None) -> Set[str]:
+        """Les fichiers du snapshot d'un step (voir discover() et build()), relatifs à script_directory."""
+        return cls.discover(script_directory, script_name) | cls._extra_files(script_directory, extra_files or [])
+
+    @classmethod
+    def discover(cls, script_directory: str, script_name: str) -> Set[str]:
+        """Le script et les fichiers des modules locaux qu'il importe, directement ou non, relatifs à script_directory.
+            Les imports dynamiques (importlib, __import__) ne peuvent pas être découverts : déclarez-les via extra_files.
+        """
+        if not os.path.isfile(os.path.join(script_directory, script_name)):
+            raise FileNotFoundError(f"Le script {script_name} n'existe pas dans {script_directory}.")
+        found: Set[str] = set()
+        pending = [os.path.normpath(script_name)]
+        while pending:
+            relative_path = pending.pop()
+            if relative_path in found:
+                continue
+            found.add(relative_path)
+            pending.extend(cls._local_imports(script_directory, relative_path, os.path.dirname(os.path.normpath(script_name))))
+        return found
+
+    def clear(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            self._built.clear()
+
+    @classmethod
+    def _local_imports(cls, root: str, relative_path: str, script_folder: str) -> List[str]:
+        with open(os.path.join(root, relative_path), "rb") as source_file:
+            tree = ast.parse(source_file.read(), filename=relative_path)
+        package = [part for part in os.path.dirname(relative_path).split(os.sep) if part]
+        modules: List[List[str]] = []
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                modules.extend(alias.name.split(".") for alias in node.names)
+            elif isinstance(node, ast.ImportFrom):
+                if node.level:
+                    base = package[:len(package) - node.level + 1] if node.level <= len(package) + 1 else []
+                else:
+                    base = []
+                module = base + (node.module.split(".") if node.module else [])
+                modules.append(module)
+                modules.extend(module + [alias.name] for alias in node.names if alias.name != "*")
+        files: List[str] = []
+        for search_root in {"", script_folder}:
+            search_parts = [part for part in search_root.split(os.sep) if part]
+            for module in modules:
+                files.extend(cls._module_files(root, search_parts + module))
+        return files
+
+    @staticmethod
+    def _module_files(root: str, parts: List[str]) -> List[str]:
+        """Les fichiers (__init__.py des packages parents et module) d'un module local, vide si le module n'est pas local."""
+        files = []
+        for i in range(1, len(parts)):
+            init = os.path.join(*parts[:i], "__init__.py")
+            if os.path.isfile(os.path.join(root, init)):
+                files.append(init)
+        if not parts:
+            return files
+        for candidate in [os.path.join(*parts[:-1], f"{parts[-1]}.py"), os.path.join(*parts, "__init__.py")]:
+            if os.path.isfile(os.path.join(root, candidate)):
+                return files + [candidate]
+        return []
+
+    @staticmethod
+    def _extra_files(root: str, patterns: Iterable[str]) -> Set[str]:
+        files: Set[str] = set()
+        for pattern in patterns:
+            matches = glob.glob(os.path.join(root, pattern), recursive=True)
+            if not matches:
+                raise FileNotFoundError(f"Le fichier supplémentaire {pattern} n'existe pas dans {root}.")
+            for match in matches:
+                if os.path.isdir(match):
+                    files.update(os.path.relpath(os.path.join(folder, file_name), root)
+                                 for folder, _, file_names in os.walk(match) for file_name in file_names if "__pycache__" not in folder)
+                else:
+                    files.add(os.path.relpath(match, root))
+        return files
@@ -0,0 +1,105 @@
+from __future__ import annotations
+from typing import Dict, Iterable, List, Union
+import hashlib
+import json
+import os
+import shutil
+import time
+
+from .local_cache import LocalCache
+from .snapshot import SnapshotBuilder
+
+
+class StepCache(LocalCache):
+    DEFAULT_DIRECTORY = os.path.join(os.path.expanduser("~"), ".azureml_wrapper", "step_cache")
+    DEFAULT_MAX_SIZE = 10 * 1024 ** 3
+
+    def __init__(self, directory: Union[str, None] = None, max_size: int = DEFAULT_MAX_SIZE) -> None:
+        """Cache local des outputs de steps, adressé par le contenu : la clé d'un step est le hash de son script (et des modules
+            locaux qu'il importe, voir SnapshotBuilder.discover(), et de ses extra_files), de ses arguments (dont --config), des
+            versions de ses Datasets et des clés de ses steps parents. Quand la taille totale dépasse max_size, les entrées les
+            moins récemment utilisées sont supprimées.
+
+        Args:
+            directory (str, optional): Le dossier du cache. Defaults to ~/.azureml_wrapper/step_cache.
+            max_size (int, optional): La taille maximale du cache, en octets. Defaults to 10 Go.
+        """
+        super().__init__(directory, max_size)
+
+    def key(self, script_directory: str, script_name: str, arguments: Iterable[str], inputs: Dict[str, str],
+            extra_files: Union[Iterable[str], None] = None) -> str:
+        """Calcule la clé d'un step. Seuls le script et les fichiers qu'il utilise en font partie : modifier le script d'un autre
+            step du même script_directory ne change pas la clé.
+
+        Args:
+            script_directory (str): Le dossier source du step
+            script_name (str): Le script du step
+            arguments (Iterable[str]): Les arguments du step, les folders remplacés par un nom stable (ex: "<output:features>")
+            inputs (dict): L'identité de chaque input : version des Datasets ou clé (et output) des steps parents
+            extra_files (Iterable[str], optional): Les fichiers supplémentaires du step (voir SnapshotBuilder.build()). Defaults to None.
+
+        Returns:
+            str: La clé (sha256) du step
+        """
+        digest = hashlib.sha256()
+        digest.update(script_name.encode())
+        for path in self._source_files(script_directory, script_name, extra_files):
+            digest.update(os.path.relpath(path, script_directory).encode())
+            with open(path, "rb") as source_file:
+                digest.update(hashlib.sha256(source_file.read()).digest())
+        digest.update(json.dumps(list(arguments)).encode())
+        digest.update(json.dumps(inputs, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def restore(self, key: str, outputs: Dict[str, str]) -> bool:
+        """Copie les outputs en cache de la clé key dans les dossiers outputs (par nom d'output). Retourne False si la clé n'est pas en cache."""
+        entry = os.path.join(self.directory, key)
+        metadata = self._metadata(key)
+        if metadata is None or set(metadata["outputs"]) != set(outputs):
+            return False
+        for output_name, folder in outputs.items():
+            shutil.rmtree(folder, ignore_errors=True)
+            shutil.copytree(os.path.join(entry, "outputs", output_name), folder)
+        metadata["last_access"] = time.time()
+        self._write_metadata(key, metadata)
+        return True
+
+    def put(self, key: str, step_name: str, outputs: Dict[str, str]) -> None:
+        """Ajoute au cache les outputs (par nom d'output) d'un step qui a réussi, puis applique la limite de taille."""
+        entry = os.path.join(self.directory, key)
+        shutil.rmtree(entry, ignore_errors=True)
+        for output_name, folder in outputs.items():
+            shutil.copytree(folder, os.path.join(entry, "outputs", output_name))
+        os.makedirs(entry, exist_ok=True)
+        now = time.time()
+        self._write_metadata(key, {"step_name": step_name, "outputs": list(outputs), "created": now, "last_access": now,
+                                   "size": self._folder_size(entry)})
+        self._evict(keep=key)
+
+    def invalidate(self, key: Union[str, None] = None, step_name: Union[str, None] = None) -> None:
+        """Supprime l'entrée key, ou toutes les entrées du step step_name."""
+        if key is None and step_name is None:
+            raise ValueError("Spécifiez une key ou un step_name à invalider. Utilisez clear() pour vider le cache.")
+        for entry_key, metadata in self.entries().items():
+            if entry_key == key or (step_name is not None and metadata["step_name"] == step_name):
+                shutil.rmtree(os.path.join(self.directory, entry_key), ignore_errors=True)
+
+    @staticmethod
+    def _source_files(script_directory: str, script_name: str, extra_files: Union[Iterable[str], None]) -> List[str]:
+        return sorted(os.path.join(script_directory, relative_path) for relative_path in SnapshotBuilder.files(script_directory, script_name, extra_files))
+
+
+def file_hash(path: str) -> str:
+    """Hash sha256 d'un fichier, lu par blocs, ou des fichiers d'un dossier (et de leurs chemins relatifs)."""
+    digest = hashlib.sha256()
+    if os.path.isdir(path):
+        paths = sorted(os.path.join(root, file_name) for root, _, file_names in os.walk(path) for file_name in file_names)
+    else:
+        paths = [path]
+    for file_path in paths:
+        if file_path != path:
+            digest.update(os.path.relpath(file_path, path).encode())
+        with open(file_path, "rb") as hashed_file:
+            for block in iter(lambda: hashed_file.read(1024 * 1024), b""):
+                digest.update(block)
+    return digest.hexdigest()
@@ -1,5 +1,8 @@
 from __future__ import annotations
-from typing import Any, Dict, List
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Tuple, Union
+import threading
+import time
 
 from azureml.core import Workspace, Datastore, Environment, Dataset
 from azureml.core.conda_dependencies import CondaDependencies
@@ -7,38 +10,99 @@ from azureml.core.compute import ComputeTarget, AmlCompute
 from azureml.exceptions import ProjectSystemException, WorkspaceException
 
 
-class WorkspaceWrapper():
-    MANDATORY_CONFIGS = ["ws_name", "resource_group", "subscription_id"]
+class WorkspaceRegistry():
+    """Registre de Workspaces partagé par tout le processus. Chaque Workspace est identifié par (subscription_id, resource_group, ws_name)
+        et n'est récupéré qu'une fois auprès d'AzureML, puis réutilisé par tous les wrappers jusqu'à l'expiration de son TTL.
+    """
+    DEFAULT_TTL = 3600.0
+    _workspaces: Dict[Tuple[str, str, str], Tuple[Workspace, float]] = {}
+    _lock = threading.Lock()
+    ttl = DEFAULT_TTL
 
-    def __init__(self, ws_name: str, resource_group: str, subscription_id: str) -> None:
-        """Instancie un WorkspaceWrapper qui permet d'accéder à un Workspace, un Environment et un ComputeTarget.
+    @classmethod
+    def get(cls, ws_name: str, resource_group: str, subscription_id: str) -> Workspace:
+        """Retourne le Workspace en cache s'il n'est pas expiré, sinon le récupère (ou le crée) et le met en cache.
 
         Args:
             ws_name (str): Le nom du Workspace
             resource_group (str): Le nom du Resource Group
             subscription_id (str): L'id de l'utilisateur
-            env_name (str): Le nom de l'Environment (doit être enregistré dans le Workspace ws_name)
-            compute_name (str): Le nom du ComputeTarget.
-            compute_size (str, optional): La taille du ComputeTarget. Defaults to "Standard_NC6".
-            compute_min_nodes (int, optional): Le nombre de workers minimum du ComputeTarget. Defaults to 0.
-            compute_max_nodes (int, optional): Le nombre de workers maximum du ComputeTarget. Defaults to 1.
+
+        Returns:
+            Workspace: Le Workspace partagé
         """
+        key = (subscription_id, resource_group, ws_name)
+        with cls._lock:
+            cached = cls._workspaces.get(key)
+            if cached is not None and time.monotonic() - cached[1] < cls.ttl:
+                return cached[0]
+            ws = cls._fetch(ws_name, resource_group, subscription_id)
+            cls._workspaces[key] = (ws, time.monotonic())
+            return ws
+
+    @classmethod
+    def put(cls, ws: Workspace) -> None:
+        """Ajoute au registre un Workspace déjà instancié (ex: Workspace.from_config())."""
+        with cls._lock:
+            cls._workspaces[(ws.subscription_id, ws.resource_group, ws.name)] = (ws, time.monotonic())
+
+    @classmethod
+    def invalidate(cls, ws_name: str, resource_group: str, subscription_id: str) -> None:
+        with cls._lock:
+            cls._workspaces.pop((subscription_id, resource_group, ws_name), None)
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._workspaces.clear()
+
+    @classmethod
+    def set_ttl(cls, ttl: float) -> None:
+        """Change la durée de vie (en secondes) des Workspaces en cache. Un TTL de 0 désactive le cache."""
+        if ttl < 0:
+            raise ValueError("ttl doit être positif.")
+        cls.ttl = ttl
+
+    @staticmethod
+    def _fetch(ws_name: str, resource_group: str, subscription_id: str) -> Workspace:
         try:
-            self.ws = Workspace.get(subscription_id=subscription_id,
-                                    resource_group=resource_group,
-                                    name=ws_name)
+            return Workspace.get(subscription_id=subscription_id,
+                                 resource_group=resource_group,
+                                 name=ws_name)
         except ProjectSystemException:
             try:
-                self.ws = Workspace.create(name=ws_name,
-                                           subscription_id=subscription_id,
-                                           resource_group=resource_group,
-                                           create_resource_group=False)
+                return Workspace.create(name=ws_name,
+                                        subscription_id=subscription_id,
+                                        resource_group=resource_group,
+                                        create_resource_group=False)
             except WorkspaceException:
-                self.ws = Workspace.create(name=ws_name,
-                                           subscription_id=subscription_id,
-                                           resource_group=resource_group,
-                                           create_resource_group=True,
-                                           location="eastus")
+                return Workspace.create(name=ws_name,
+                                        subscription_id=subscription_id,
+                                        resource_group=resource_group,
+                                        create_resource_group=True,
+                                        location="eastus")
+
+
+class WorkspaceWrapper():
+    MANDATORY_CONFIGS = ["ws_name", "resource_group", "subscription_id"]
+    PROVISION_TYPES = ["environments", "datastores", "computes", "datasets"]
+
+    def __init__(self, ws_name: str, resource_group: str, subscription_id: str, workspace: Union[Workspace, None] = None) -> None:
+        """Instancie un WorkspaceWrapper qui permet d'accéder à un Workspace, un Environment et un ComputeTarget.
+            Le Workspace provient du WorkspaceRegistry, il n'est donc récupéré qu'une seule fois par processus.
+
+        Args:
+            ws_name (str): Le nom du Workspace
+            resource_group (str): Le nom du Resource Group
+            subscription_id (str): L'id de l'utilisateur
+            workspace (Workspace, optional): Un Workspace déjà instancié à utiliser plutôt que celui du registre. Defaults to None.
+        """
+        if workspace is not None:
+            if not isinstance(workspace, Workspace):
+                raise TypeError("workspace doit être une instance de Workspace.")
+            self.ws = workspace
+        else:
+            self.ws = WorkspaceRegistry.get(ws_name, resource_group, subscription_id)
 
     @classmethod
     def from_config(cls, config: Dict[str, Any]) -> WorkspaceWrapper:
@@ -49,6 +113,11 @@ class WorkspaceWrapper():
             raise KeyError(f"Votre configuration doit contenir la (ou les) clée(s) suivante(s) : {missing_keys} pour être valide.")
         return cls(str(config.get("ws_name")), str(config.get("resource_group")), str(config.get("subscription_id")))
 
+    @classmethod
+    def from_workspace(cls, workspace: Workspace) -> WorkspaceWrapper:
+        """Instancie un WorkspaceWrapper autour d'un Workspace existant, sans appel supplémentaire à AzureML."""
+        return cls(workspace.name, workspace.resource_group, workspace.subscription_id, workspace=workspace)
+
     @property
     def ws(self) -> Workspace:
         return self._ws
@@ -64,19 +133,25 @@ class WorkspaceWrapper():
         if name in self.ws.environments:
             print(f"L'Environnement {name} est déjà enregistré dans le Workspace {self.ws.name}.")
         else:
-            environment = Environment(name)
-            environment.python.conda_dependencies = CondaDependencies.create(pip_packages=dependencies)
-            environment.register(self.ws)
+            self._create_env(name, dependencies)
+
+    def _create_env(self, name: str, dependencies: List[str]) -> None:
+        environment = Environment(name)
+        environment.python.conda_dependencies = CondaDependencies.create(pip_packages=dependencies)
+        environment.register(self.ws)
 
     def register_blob_datastore(self, name: str, container_name: str, storage_name: str, storage_key: str) -> None:
         if name in self.ws.datastores:
             print(f"Le Datastore {name} EST enregistré dans le Workspace {self.ws.name}.")
         else:
-            Datastore.register_azure_blob_container(workspace=self.ws,
-                                                    datastore_name=name,
-                                                    account_name=storage_name,
-                                                    container_name=container_name,
-                                                    account_key=storage_key)
+            self._create_blob_datastore(name, container_name, storage_name, storage_key)
+
+    def _create_blob_datastore(self, name: str, container_name: str, storage_name: str, storage_key: str) -> None:
+        Datastore.register_azure_blob_container(workspace=self.ws,
+                                                datastore_name=name,
+                                                account_name=storage_name,
+                                                container_name=container_name,
+                                                account_key=storage_key)
 
     def unregister_blob_datastore(self, name: str) -> None:
         if name not in self.ws.datastores:
@@ -85,22 +160,24 @@ class WorkspaceWrapper():
             Datastore.get(self.ws, name).unregister()
 
     def register_csv(self, datastore_name: str, dataset_name: str) -> None:
-        if dataset_name in self.ws.compute_targets:
+        if dataset_name.endswith(".csv"):
+            dataset_name = dataset_name[:-4]
+        if dataset_name in self.ws.datasets:
             print(f"Le Dataset {dataset_name} est déjà enregistré dans le Workspace {self.ws.name}.")
+        elif datastore_name not in self.ws.datastores:
+            raise NameError(f"""Le Datastore {datastore_name} n'est pas enregistré dans le workspace {self.ws.name}
+                                du resource groupe {self.ws.resource_group} de l'id {self.ws.subscription_id}.
+                                Vous pouvez en enregistrer un via le browser web d'AzureML.""")
         else:
-            if datastore_name in self.ws.datastores:
-                datastore = Datastore.get(self.ws, datastore_name)
-            else:
-                raise NameError(f"""Le Datastore {datastore_name} n'est pas enregistré dans le workspace {self.ws.name}
-                                    du resource groupe {self.ws.resource_group} de l'id {self.ws.subscription_id}.
-                                    Vous pouvez en enregistrer un via le browser web d'AzureML.""")
-            if dataset_name.endswith(".csv"):
-                dataset_name = dataset_name[:-4]
-            path = [(datastore, f"{dataset_name}.csv")]
-            data = Dataset.Tabular.from_delimited_files(path=path)
-            data.register(workspace=self.ws, name=dataset_name, create_new_version=True)
-
-    def register_compute(self, name: str, compute_size: str = "Standard_NC6", compute_min_nodes: int = 0, compute_max_nodes: int = 1) -> None:
+            self._create_csv_dataset(datastore_name, dataset_name)
+
+    def _create_csv_dataset(self, datastore_name: str, dataset_name: str) -> None:
+        datastore = Datastore.get(self.ws, datastore_name)
+        data = Dataset.Tabular.from_delimited_files(path=[(datastore, f"{dataset_name}.csv")])
+        data.register(workspace=self.ws, name=dataset_name, create_new_version=True)
+
+    def register_compute(self, name: str, compute_size: str = "Standard_NC6", compute_min_nodes: int = 0, compute_max_nodes: int = 1,
+                         show_output: bool = True) -> None:
         """Enregistre un compute cluster dans ws.
 
         Args:
@@ -108,12 +185,80 @@ class WorkspaceWrapper():
             compute_size (str, optional): La taille du cluster. Defaults to "Standard_NC6".
             compute_min_nodes (int, optional): Le nombre minimal de workers. Defaults to 0.
             compute_max_nodes (int, optional): Le nombre maximal de workers. Defaults to 1.
+            show_output (bool, optional): Afficher la progression du provisionnement. Defaults to True.
         """
         if name in self.ws.compute_targets:
             print(f"Le Compute {name} est déjà enregistré dans le Workspace {self.ws.name}.")
         else:
-            compute_config = AmlCompute.provisioning_configuration(vm_size=compute_size,
-                                                                   min_nodes=compute_min_nodes,
-                                                                   max_nodes=compute_max_nodes)
-            compute = ComputeTarget.create(self.ws, name, compute_config)
-            compute.wait_for_completion(show_output=True)
+            self._create_compute(name, compute_size, compute_min_nodes, compute_max_nodes, show_output)
+
+    def _create_compute(self, name: str, compute_size: str = "Standard_NC6", compute_min_nodes: int = 0, compute_max_nodes: int = 1,
+                        show_output: bool = True) -> None:
+        compute_config = AmlCompute.provisioning_configuration(vm_size=compute_size,
+                                                               min_nodes=compute_min_nodes,
+                                                               max_nodes=compute_max_nodes)
+        compute = ComputeTarget.create(self.ws, name, compute_config)
+        compute.wait_for_completion(show_output=show_output)
+
+    def provision(self, spec: Dict[str, Dict[str, Any]], max_workers: int = 8) -> List[Dict[str, Any]]:
+        """Enregistre en parallèle tous les Environments, Datastores, Computes et Datasets décrits par spec. Les ressources déjà
+            présentes dans le Workspace sont ignorées (une seule énumération par type de ressource). Les Datasets sont enregistrés
+            dès que les Datastores sont prêts, pendant que les Computes continuent leur provisionnement. Exemple de spec :
+            {"environments": {"env": ["pandas"]},
+             "datastores": {"ds": {"container_name": "...", "storage_name": "...", "storage_key": "..."}},
+             "computes": {"cpu-cluster": {"compute_size": "Standard_DS3_v2", "compute_max_nodes": 4}},
+             "datasets": {"ventes": "ds"}}
+
+        Args:
+            spec (dict): Les ressources à enregistrer, par type puis par nom (voir l'exemple)
+            max_workers (int, optional): Le nombre maximal d'enregistrements simultanés. Defaults to 8.
+
+        Returns:
+            list: Pour chaque ressource, un dict avec son type, son nom, son statut (Created, Exists ou Failed), sa durée et l'erreur s'il y a lieu
+        """
+        if not isinstance(spec, Dict):
+            raise TypeError("spec doit être un dictionnaire.")
+        unknown_types = [resource_type for resource_type in spec if resource_type not in self.PROVISION_TYPES]
+        if unknown_types:
+            raise KeyError(f"Les types de ressources {unknown_types} ne sont pas supportés. Les types possibles sont : {self.PROVISION_TYPES}.")
+        if not all(isinstance(dependencies, List) for dependencies in (spec.get("environments") or {}).values()):
+            raise TypeError("Les dependencies de chaque Environment doivent être une liste.")
+        datasets = {name[:-4] if name.endswith(".csv") else name: datastore for name, datastore in (spec.get("datasets") or {}).items()}
+        existing = {"environments": set(self.ws.environments) if spec.get("environments") else set(),
+                    "datastores": set(self.ws.datastores) if spec.get("datastores") or spec.get("datasets") else set(),
+                    "computes": set(self.ws.compute_targets) if spec.get("computes") else set(),
+                    "datasets": set(self.ws.datasets) if spec.get("datasets") else set()}
+        missing_datastores = {datastore for datastore in datasets.values()
+                              if datastore not in existing["datastores"] and datastore not in (spec.get("datastores") or {})}
+        if missing_datastores:
+            raise NameError(f"""Les Datastores {sorted(missing_datastores)} ne sont ni enregistrés dans le workspace {self.ws.name},
+                                ni décrits dans spec["datastores"].""")
+        tasks: Dict[str, Dict[str, Callable[[], None]]] = {
+            "environments": {name: self._task(self._create_env, name, dependencies) for name, dependencies in (spec.get("environments") or {}).items()},
+            "datastores": {name: self._task(self._create_blob_datastore, name, **config) for name, config in (spec.get("datastores") or {}).items()},
+            "computes": {name: self._task(self._create_compute, name, show_output=False, **config) for name, config in (spec.get("computes") or {}).items()},
+            "datasets": {name: self._task(self._create_csv_dataset, datastore, name) for name, datastore in datasets.items()}}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures: Dict[Future[Dict[str, Any]], str] = {}
+            for resource_type in ["environments", "datastores", "computes"]:
+                for name, task in tasks[resource_type].items():
+                    futures[executor.submit(self._provision_one, resource_type, name, task, name in existing[resource_type])] = resource_type
+            wait([future for future, resource_type in futures.items() if resource_type == "datastores"])
+            for name, task in tasks["datasets"].items():
+                futures[executor.submit(self._provision_one, "datasets", name, task, name in existing["datasets"])] = "datasets"
+            return [future.result() for future in futures]
+
+    @staticmethod
+    def _task(method: Callable[..., None], *args: Any, **kwargs: Any) -> Callable[[], None]:
+        return lambda: method(*args, **kwargs)
+
+    @staticmethod
+    def _provision_one(resource_type: str, name: str, task: Callable[[], None], exists: bool) -> Dict[str, Any]:
+        start = time.perf_counter()
+        if exists:
+            return {"type": resource_type, "name": name, "status": "Exists", "duration": 0.0, "error": None}
+        try:
+            task()
+        except Exception as e:
+            return {"type": resource_type, "name": name, "status": "Failed", "duration": time.perf_counter() - start, "error": repr(e)}
+        return {"type": resource_type, "name": name, "status": "Created", "duration": time.perf_counter() - start, "error": None}
@@ -0,0 +1,53 @@
+"""Mesure le temps d'import d'azureml_wrapper dans un interpréteur neuf, tel que payé au démarrage de chaque step.
+
+Usage : python benchmarks/bench_import.py [--repeat 10] [--max-seconds 0.5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+STATEMENTS = {"package": "import azureml_wrapper",
+              "ScriptWrapper": "from azureml_wrapper import ScriptWrapper",
+              "PipelineWrapper": "from azureml_wrapper import PipelineWrapper"}
+HEAVY_MODULES = ["azureml.core", "azureml.pipeline", "azureml.data", "pandas", "pyarrow"]
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "modules": [m for m in {heavy} if m in sys.modules]}}))
+"""
+
+
+def measure(statement: str, repeat: int) -> dict:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(path for path in [root, os.environ.get("PYTHONPATH", "")] if path)}
+    timings, modules = [], []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", PROBE.format(statement=statement, heavy=HEAVY_MODULES)],
+                                env=env, capture_output=True, text=True)
+        if output.returncode != 0:
+            return {"error": output.stderr.strip().splitlines()[-1]}
+        result = json.loads(output.stdout)
+        timings.append(result["seconds"])
+        modules = result["modules"]
+    return {"median_seconds": statistics.median(timings), "min_seconds": min(timings), "heavy_modules": modules}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--max-seconds", type=float, default=None, help="Échoue si l'import de ScriptWrapper dépasse ce temps (médiane).")
+    args = parser.parse_args()
+    results = {name: measure(statement, args.repeat) for name, statement in STATEMENTS.items()}
+    print(json.dumps(results, indent=2))
+    script_wrapper = results["ScriptWrapper"]
+    if args.max_seconds is not None and script_wrapper.get("median_seconds", float("inf")) > args.max_seconds:
+        sys.exit(f"L'import de ScriptWrapper prend {script_wrapper.get('median_seconds')} s (> {args.max_seconds} s).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Mesure, sans Azure, le coût de construction d'un pipeline et le débit des lectures/écritures des steps, via le FakeAzureML.
+
+Mesures :
+    build      : temps de PipelineWrapper.from_config() et appels réseau selon le nombre de steps
+    operations : appels réseau de chaque opération des wrappers (WorkspaceWrapper, PipelineStep, provision, run)
+    io         : débit (lignes/s, Mo/s) des lectures/écritures de ScriptWrapper par format et par taille
+
+Usage : python benchmarks/bench_pipeline.py [--latency 0.02] [--steps 1 10 30 100] [--rows 10000 100000] [--formats csv parquet arrow]
+                                            [--output benchmarks/results/<date>.json] [--compare ancien.json] [--tolerance 0.2]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from test.fake_azureml import FakeAzureML  # noqa: E402
+
+BASE_CONFIG = {"ws_name": "ws", "resource_group": "rg", "subscription_id": "sub", "env_name": "env", "compute_name": "cpu"}
+
+
+def fake_backend(latency: float) -> FakeAzureML:
+    backend = FakeAzureML(latency=latency)
+    backend.add_environment("env")
+    backend.add_compute("cpu")
+    for i in range(5):
+        backend.add_dataset(f"dataset{i}", pd.DataFrame({"a": [i]}))
+    backend.add_datastore("ds", {"clients.csv": pd.DataFrame({"a": [1]})})
+    return backend
+
+
+def steps_config(count: int) -> dict:
+    return {f"step{i}": {"step_name": f"step{i}", "script_name": "step.py", "step_config": {"i": i},
+                         "input_datasets": {"--data": f"dataset{i % 5}"}} for i in range(count)}
+
+
+def bench_build(latency: float, step_counts: list) -> dict:
+    results = {}
+    for count in step_counts:
+        with fake_backend(latency) as backend:
+            from azureml_wrapper import PipelineWrapper
+            start = time.perf_counter()
+            PipelineWrapper.from_config({**BASE_CONFIG, "steps": steps_config(count)})
+            seconds = time.perf_counter() - start
+            results[str(count)] = {"seconds": seconds, "remote_calls": sum(backend.calls.values()), "calls": dict(backend.calls)}
+    return results
+
+
+def bench_operations(latency: float) -> dict:
+    results = {}
+    with fake_backend(latency) as backend:
+        from azureml_wrapper import PipelineStep, PipelineWrapper, WorkspaceWrapper
+        operations = {"WorkspaceWrapper": lambda: WorkspaceWrapper("ws", "rg", "sub"),
+                      "PipelineStep": lambda: PipelineStep("ws", "rg", "sub", "step", "step.py", input_datasets={"--data": "dataset0"}),
+                      "provision": lambda: WorkspaceWrapper("ws", "rg", "sub").provision(
+                          {"environments": {"env": [], "env2": ["pandas"]}, "computes": {"gpu": {}}, "datasets": {"clients": "ds"}}),
+                      "run": lambda: PipelineWrapper.from_config({**BASE_CONFIG, "steps": steps_config(3)}).run("bench")}
+        for name, operation in operations.items():
+            backend.reset_calls()
+            start = time.perf_counter()
+            operation()
+            results[name] = {"seconds": time.perf_counter() - start, "calls": dict(backend.calls)}
+    return results
+
+
+def bench_io(row_counts: list, formats: list) -> dict:
+    results = {}
+    with FakeAzureML(), tempfile.TemporaryDirectory() as folder:
+        argv = sys.argv
+        sys.argv = ["step.py", "--input-folder", folder, "--output-folder", folder]
+        try:
+            from azureml_wrapper import ScriptWrapper
+            script = ScriptWrapper()
+        finally:
+            sys.argv = argv
+        for rows in row_counts:
+            generator = np.random.default_rng(0)
+            dataframe = pd.DataFrame({"id": np.arange(rows), "value": generator.random(rows),
+                                      "category": generator.choice(["a", "b", "c", "d"], rows), "text": [f"texte {i}" for i in range(rows)]})
+            for data_format in formats:
+                start = time.perf_counter()
+                script.save_in_output_folder(dataframe, f"bench_{rows}", data_format)
+                write_seconds = time.perf_counter() - start
+                nbytes = sum(os.path.getsize(os.path.join(folder, name)) for name in os.listdir(folder) if name.startswith(f"bench_{rows}."))
+                start = time.perf_counter()
+                script.get_from_input_folder(f"bench_{rows}", data_format)
+                read_seconds = time.perf_counter() - start
+                results[f"{data_format}:{rows}"] = {"bytes": nbytes, "write_seconds": write_seconds, "read_seconds": read_seconds,
+                                                    "write_rows_per_second": rows / write_seconds, "read_rows_per_second": rows / read_seconds,
+                                                    "write_mb_per_second": nbytes / 1024 ** 2 / write_seconds,
+                                                    "read_mb_per_second": nbytes / 1024 ** 2 / read_seconds}
+                for name in os.listdir(folder):
+                    if name.startswith(f"bench_{rows}."):
+                        os.remove(os.path.join(folder, name))
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Retourne les mesures en régression : durées plus longues ou appels réseau plus nombreux que baseline, au-delà de tolerance."""
+    regressions = []
+    for section in ["build", "operations"]:
+        for name, measure in results.get(section, {}).items():
+            previous = baseline.get(section, {}).get(name)
+            if previous is None:
+                continue
+            if sum(measure["calls"].values()) > sum(previous["calls"].values()):
+                regressions.append(f"{section}:{name} : {sum(previous['calls'].values())} -> {sum(measure['calls'].values())} appels réseau")
+            if measure["seconds"] > previous["seconds"] * (1 + tolerance):
+                regressions.append(f"{section}:{name} : {previous['seconds']:.3f} s -> {measure['seconds']:.3f} s")
+    for name, measure in results.get("io", {}).items():
+        previous = baseline.get("io", {}).get(name)
+        if previous is None:
+            continue
+        for key in ["write_seconds", "read_seconds"]:
+            if measure[key] > previous[key] * (1 + tolerance):
+                regressions.append(f"io:{name} {key} : {previous[key]:.3f} s -> {measure[key]:.3f} s")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.02, help="Latence simulée de chaque appel réseau, en secondes.")
+    parser.add_argument("--steps", type=int, nargs="+", default=[1, 10, 30, 100])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--formats", nargs="+", default=["csv", "parquet", "arrow"])
+    parser.add_argument("--output", default=None, help="Fichier JSON des résultats. Defaults to benchmarks/results/<date>.json.")
+    parser.add_argument("--compare", default=None, help="Fichier JSON de résultats précédents. Échoue en cas de régression.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Ralentissement toléré par --compare (0.2 = 20%%).")
+    args = parser.parse_args()
+    results = {"created": datetime.datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+               "pandas": pd.__version__, "latency": args.latency,
+               "build": bench_build(args.latency, args.steps),
+               "operations": bench_operations(args.latency),
+               "io": bench_io(args.rows, args.formats)}
+    output = args.output or os.path.join(ROOT, "benchmarks", "results", f"{datetime.datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as output_file:
+        json.dump(results, output_file, indent=2)
+    print(json.dumps({section: results[section] for section in ["build", "operations", "io"]}, indent=2))
+    print(f"Résultats écrits dans {output}")
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.tolerance)
+        if regressions:
+            sys.exit("Régressions :\n" + "\n".join(regressions))
+
+
+if __name__ == "__main__":
+    main()
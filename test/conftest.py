@@ -0,0 +1,20 @@
+import pandas as pd
+import pytest
+
+from .fake_azureml import FakeAzureML
+
+
+@pytest.fixture
+def backend():
+
+    with FakeAzureML() as fake_backend:
+        fake_backend.add_environment("env")
+        fake_backend.add_compute("cpu")
+        fake_backend.add_dataset("ventes", pd.DataFrame({"a": [1, 2, 3]}))
+        yield fake_backend
+
+
+def pipeline_config(steps, **configs):
+
+    return {"ws_name": "ws", "resource_group": "rg", "subscription_id": "sub", "env_name": "env", "compute_name": "cpu", "steps": steps,
+            **configs}
@@ -0,0 +1,580 @@
+"""Remplaçant en mémoire des parties du SDK AzureML utilisées par les wrappers, avec une latence simulée configurable.
+
+Permet de tester et de mesurer les wrappers sans Workspace Azure. Fait partie des tests (et des benchmarks), et non du package
+installé. Exemple :
+    with FakeAzureML(latency=0.05) as backend:
+        backend.add_dataset("ventes", dataframe)
+        from azureml_wrapper import PipelineWrapper
+        pipeline = PipelineWrapper.from_config(config)
+        print(backend.calls)
+"""
+from __future__ import annotations
+from collections import Counter
+from typing import Any, Dict, List, Tuple, Union, TYPE_CHECKING
+import datetime
+import itertools
+import os
+import sys
+import threading
+import time
+import types
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+_MODULES = ["azureml", "azureml.core", "azureml.core.compute", "azureml.core.compute_target", "azureml.core.runconfig",
+            "azureml.core.conda_dependencies", "azureml.exceptions", "azureml.data", "azureml.data.dataset_consumption_config",
+            "azureml.data.output_dataset_config", "azureml.pipeline", "azureml.pipeline.core", "azureml.pipeline.steps"]
+
+
+class FakeAzureML():
+    def __init__(self, latency: float = 0.0, ws_name: str = "ws", resource_group: str = "rg", subscription_id: str = "sub",
+                 run_duration: float = 0.0) -> None:
+        """Installe (dans un bloc with) de faux modules azureml dans sys.modules et recharge azureml_wrapper par-dessus.
+
+        Args:
+            latency (float, optional): Le délai, en secondes, simulé à chaque appel réseau. Defaults to 0.0.
+            ws_name (str, optional): Le nom du Workspace créé d'office. Defaults to "ws".
+            resource_group (str, optional): Son Resource Group. Defaults to "rg".
+            subscription_id (str, optional): Son id d'utilisateur. Defaults to "sub".
+            run_duration (float, optional): La durée, en secondes, des Runs de pipelines soumises (réparties également entre
+                                            les steps). Defaults to 0.0.
+        """
+        self.latency = latency
+        self.run_duration = run_duration
+        self.run_status = "Completed"
+        self.calls: Counter[str] = Counter()
+        self.workspaces: Dict[Tuple[str, str, str], Any] = {}
+        self.submitted: List[Any] = []
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._saved_modules: Dict[str, Any] = {}
+        self.modules = self._build_modules()
+        self.default_workspace = self.add_workspace(ws_name, resource_group, subscription_id)
+
+    def __enter__(self) -> FakeAzureML:
+        self._saved_modules = {name: module for name, module in sys.modules.items() if name in _MODULES or name.startswith("azureml.")}
+        for name in self._saved_modules:
+            del sys.modules[name]
+        sys.modules.update(self.modules)
+        _reset_wrappers()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        for name in _MODULES:
+            sys.modules.pop(name, None)
+        sys.modules.update(self._saved_modules)
+        _reset_wrappers()
+
+    def remote(self, operation: str) -> None:
+        """Simule un appel réseau : le compte et attend la latence configurée."""
+        with self._lock:
+            self.calls[operation] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def reset_calls(self) -> None:
+        self.calls.clear()
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    def add_workspace(self, name: str, resource_group: str, subscription_id: str) -> Any:
+        workspace = self.modules["azureml.core"].Workspace(name, resource_group, subscription_id, _backend=self)
+        self.workspaces[(subscription_id, resource_group, name)] = workspace
+        return workspace
+
+    def add_dataset(self, name: str, dataframe: pd.DataFrame, workspace: Any = None) -> Any:
+        """Enregistre une nouvelle version d'un Dataset tabulaire contenant dataframe."""
+        dataset = self.modules["azureml.core"].Dataset(dataframe=dataframe)
+        return dataset.register(workspace or self.default_workspace, name, create_new_version=True)
+
+    def add_environment(self, name: str, workspace: Any = None) -> None:
+        (workspace or self.default_workspace).state["environments"][name] = self.modules["azureml.core"].Environment(name)
+
+    def add_compute(self, name: str, max_nodes: int = 1, workspace: Any = None) -> None:
+        compute_module = self.modules["azureml.core.compute"]
+        (workspace or self.default_workspace).state["compute_targets"][name] = compute_module._FakeCompute(name, max_nodes)
+
+    def add_datastore(self, name: str, files: Union[Dict[str, Any], None] = None, workspace: Any = None) -> Any:
+        """Enregistre un Datastore, avec au besoin des fichiers (DataFrames ou octets) par chemin."""
+        datastore = self.modules["azureml.core"].Datastore(workspace or self.default_workspace, name)
+        for path, content in (files or {}).items():
+            datastore.put(path, content)
+        (workspace or self.default_workspace).state["datastores"][name] = datastore
+        return datastore
+
+    def _build_modules(self) -> Dict[str, types.ModuleType]:
+        backend = self
+        modules = {name: types.ModuleType(name) for name in _MODULES}
+        for name, module in modules.items():
+            module.__path__ = []  # type: ignore[attr-defined]
+            module.__fake_backend__ = backend  # type: ignore[attr-defined]
+            if "." in name:
+                parent, _, child = name.rpartition(".")
+                setattr(modules[parent], child, module)
+
+        class ProjectSystemException(Exception):
+            pass
+
+        class WorkspaceException(Exception):
+            pass
+
+        class UserErrorException(Exception):
+            pass
+
+        class ComputeTargetException(Exception):
+            pass
+
+        class Workspace():
+            def __init__(self, name: str, resource_group: str, subscription_id: str, _backend: Any = None) -> None:
+                self.name = name
+                self.resource_group = resource_group
+                self.subscription_id = subscription_id
+                self.state: Dict[str, Dict[str, Any]] = {"datasets": {}, "datastores": {}, "compute_targets": {}, "environments": {}}
+
+            @classmethod
+            def get(cls, name: str, subscription_id: str, resource_group: str, **kwargs: Any) -> Workspace:
+                backend.remote("Workspace.get")
+                key = (subscription_id, resource_group, name)
+                if key not in backend.workspaces:
+                    raise ProjectSystemException(f"Workspace {name} introuvable.")
+                workspace: Workspace = backend.workspaces[key]
+                return workspace
+
+            @classmethod
+            def create(cls, name: str, subscription_id: str, resource_group: str, **kwargs: Any) -> Workspace:
+                backend.remote("Workspace.create")
+                workspace: Workspace = backend.add_workspace(name, resource_group, subscription_id)
+                return workspace
+
+            def _listing(self, kind: str) -> Dict[str, Any]:
+                backend.remote(f"Workspace.{kind}")
+                if kind == "datasets":
+                    return {name: versions[-1] for name, versions in self.state["datasets"].items()}
+                return dict(self.state[kind])
+
+            datasets = property(lambda self: self._listing("datasets"))
+            datastores = property(lambda self: self._listing("datastores"))
+            compute_targets = property(lambda self: self._listing("compute_targets"))
+            environments = property(lambda self: self._listing("environments"))
+
+            def get_default_datastore(self) -> Any:
+                backend.remote("Workspace.get_default_datastore")
+                if "workspaceblobstore" not in self.state["datastores"]:
+                    backend.add_datastore("workspaceblobstore", workspace=self)
+                return self.state["datastores"]["workspaceblobstore"]
+
+        class DatasetConsumptionConfig():
+            def __init__(self, name: Union[str, None], dataset: Any, mode: str = "direct", path_on_compute: Union[str, None] = None) -> None:
+                self.name = name
+                self.dataset = dataset
+                self.mode = mode
+                self.path_on_compute = path_on_compute
+
+            def as_mount(self, path_on_compute: Union[str, None] = None) -> DatasetConsumptionConfig:
+                return DatasetConsumptionConfig(self.name, self.dataset, "mount", path_on_compute)
+
+            def as_download(self, path_on_compute: Union[str, None] = None) -> DatasetConsumptionConfig:
+                return DatasetConsumptionConfig(self.name, self.dataset, "download", path_on_compute)
+
+        class Dataset():
+            def __init__(self, dataframe: Any = None, path: Any = None) -> None:
+                self.name: Union[str, None] = None
+                self.version: Union[int, None] = None
+                self.id = f"dataset-{backend.next_id()}"
+                self._dataframe = dataframe
+                self._path = path
+
+            class Tabular():
+                @staticmethod
+                def from_delimited_files(path: List[Tuple[Any, str]], **kwargs: Any) -> Dataset:
+                    return Dataset(path=path)
+
+            class File():
+                @staticmethod
+                def from_files(path: Any, **kwargs: Any) -> Dataset:
+                    return Dataset(path=path)
+
+            @staticmethod
+            def get_by_name(workspace: Workspace, name: str, version: Union[str, int] = "latest") -> Dataset:
+                backend.remote("Dataset.get_by_name")
+                versions = workspace.state["datasets"].get(name)
+                if not versions:
+                    raise UserErrorException(f"Dataset {name} introuvable.")
+                if version == "latest":
+                    dataset: Dataset = versions[-1]
+                    return dataset
+                if not 1 <= int(version) <= len(versions):
+                    raise UserErrorException(f"Version {version} du Dataset {name} introuvable.")
+                dataset = versions[int(version) - 1]
+                return dataset
+
+            def register(self, workspace: Workspace, name: str, create_new_version: bool = False, **kwargs: Any) -> Dataset:
+                backend.remote("Dataset.register")
+                versions = workspace.state["datasets"].setdefault(name, [])
+                registered = Dataset(self._dataframe, self._path)
+                registered.name, registered.version = name, len(versions) + 1
+                versions.append(registered)
+                return registered
+
+            def as_named_input(self, name: str) -> DatasetConsumptionConfig:
+                return DatasetConsumptionConfig(name, self)
+
+            def to_pandas_dataframe(self) -> pd.DataFrame:
+                backend.remote("Dataset.to_pandas_dataframe")
+                if self._dataframe is None and self._path:
+                    datastore, relative_path = self._path[0]
+                    self._dataframe = datastore.files[relative_path]
+                return self._dataframe.copy()
+
+            def to_parquet_files(self) -> Dataset:
+                return self
+
+            def download(self, target_path: str, overwrite: bool = False) -> List[str]:
+                os.makedirs(target_path, exist_ok=True)
+                path = os.path.join(target_path, f"{self.name or self.id}.parquet")
+                self.to_pandas_dataframe().to_parquet(path, index=False)
+                return [path]
+
+        class _BlobProperties():
+            def __init__(self, etag: str, last_modified: datetime.datetime, content_length: int) -> None:
+                self.etag = etag
+                self.last_modified = last_modified
+                self.content_length = content_length
+
+        class _Blob():
+            def __init__(self, name: str, properties: _BlobProperties) -> None:
+                self.name = name
+                self.properties = properties
+
+        class _BlobService():
+            def __init__(self, datastore: Datastore) -> None:
+                self.datastore = datastore
+
+            def list_blobs(self, container_name: str, prefix: Union[str, None] = None) -> List[_Blob]:
+                backend.remote("BlobService.list_blobs")
+                return [_Blob(path, properties) for path, properties in sorted(self.datastore.properties.items()) if path.startswith(prefix or "")]
+
+            def exists(self, container_name: str, blob_name: Union[str, None] = None) -> bool:
+                backend.remote("BlobService.exists")
+                return blob_name in self.datastore.files
+
+            def get_blob_to_path(self, container_name: str, blob_name: str, file_path: str, **kwargs: Any) -> None:
+                backend.remote("BlobService.get_blob_to_path")
+                self.datastore._write(blob_name, file_path)
+
+        class Datastore():
+            def __init__(self, workspace: Workspace, name: str) -> None:
+                self.workspace = workspace
+                self.name = name
+                self.container_name = name
+                self.files: Dict[str, Any] = {}
+                self.properties: Dict[str, _BlobProperties] = {}
+                self.blob_service = _BlobService(self)
+
+            def put(self, path: str, content: Any) -> None:
+                """Crée ou remplace un blob (DataFrame ou octets), avec un nouvel etag."""
+                self.files[path] = content
+                size = len(content) if isinstance(content, bytes) else int(content.memory_usage(deep=True).sum())
+                self.properties[path] = _BlobProperties(f'"0x{backend.next_id():x}"', datetime.datetime.now(datetime.timezone.utc), size)
+
+            def download(self, target_path: str, prefix: Union[str, None] = None, overwrite: bool = False, **kwargs: Any) -> int:
+                backend.remote("Datastore.download")
+                paths = [path for path in self.files if path.startswith(prefix or "")]
+                for path in paths:
+                    self._write(path, os.path.join(target_path, *path.split("/")))
+                return len(paths)
+
+            def _write(self, path: str, local_path: str) -> None:
+                os.makedirs(os.path.dirname(local_path), exist_ok=True)
+                content = self.files[path]
+                if isinstance(content, bytes):
+                    with open(local_path, "wb") as local_file:
+                        local_file.write(content)
+                elif path.endswith(".csv"):
+                    content.to_csv(local_path, index=False)
+                else:
+                    content.to_parquet(local_path, index=False)
+
+            def upload_files(self, files: List[str], relative_root: Union[str, None] = None, target_path: Union[str, None] = None,
+                             overwrite: bool = False, **kwargs: Any) -> None:
+                backend.remote("Datastore.upload_files")
+                for local_path in files:
+                    relative_path = os.path.relpath(local_path, relative_root or os.path.dirname(local_path)).replace(os.sep, "/")
+                    path = "/".join(part for part in [target_path, relative_path] if part)
+                    if path in self.files and not overwrite:
+                        continue
+                    with open(local_path, "rb") as local_file:
+                        self.put(path, local_file.read())
+
+            @staticmethod
+            def register_azure_blob_container(workspace: Workspace, datastore_name: str, **kwargs: Any) -> Datastore:
+                backend.remote("Datastore.register_azure_blob_container")
+                datastore: Datastore = backend.add_datastore(datastore_name, workspace=workspace)
+                return datastore
+
+            @staticmethod
+            def get(workspace: Workspace, datastore_name: str = "", name: str = "") -> Datastore:
+                backend.remote("Datastore.get")
+                datastore: Datastore = workspace.state["datastores"][datastore_name or name]
+                return datastore
+
+            def unregister(self) -> None:
+                backend.remote("Datastore.unregister")
+                self.workspace.state["datastores"].pop(self.name, None)
+
+        class _Python():
+            conda_dependencies: Any = None
+
+        class Environment():
+            def __init__(self, name: str) -> None:
+                self.name = name
+                self.python = _Python()
+
+            @staticmethod
+            def get(workspace: Workspace, name: str, **kwargs: Any) -> Environment:
+                backend.remote("Environment.get")
+                if name not in workspace.state["environments"]:
+                    raise UserErrorException(f"Environment {name} introuvable.")
+                environment: Environment = workspace.state["environments"][name]
+                return environment
+
+            def register(self, workspace: Workspace) -> Environment:
+                backend.remote("Environment.register")
+                workspace.state["environments"][self.name] = self
+                return self
+
+        class CondaDependencies():
+            @staticmethod
+            def create(pip_packages: Union[List[str], None] = None, **kwargs: Any) -> Dict[str, Any]:
+                return {"pip_packages": pip_packages or []}
+
+        class _FakeCompute():
+            def __init__(self, name: str, max_nodes: int = 1) -> None:
+                self.name = name
+                self.max_nodes = max_nodes
+                self.scale_settings = types.SimpleNamespace(minimum_node_count=0, maximum_node_count=max_nodes)
+
+            def wait_for_completion(self, show_output: bool = False, **kwargs: Any) -> None:
+                backend.remote("ComputeTarget.wait_for_completion")
+
+        class ComputeTarget(_FakeCompute):
+            def __new__(cls, workspace: Workspace, name: str) -> Any:  # type: ignore[misc]
+                backend.remote("ComputeTarget.get")
+                if name not in workspace.state["compute_targets"]:
+                    raise ComputeTargetException(f"Compute {name} introuvable.")
+                return workspace.state["compute_targets"][name]
+
+            @staticmethod
+            def create(workspace: Workspace, name: str, provisioning_configuration: Dict[str, Any]) -> _FakeCompute:
+                backend.remote("ComputeTarget.create")
+                compute = _FakeCompute(name, int(provisioning_configuration.get("max_nodes", 1)))
+                workspace.state["compute_targets"][name] = compute
+                return compute
+
+        class AmlCompute():
+            @staticmethod
+            def provisioning_configuration(vm_size: str = "", min_nodes: int = 0, max_nodes: int = 1, **kwargs: Any) -> Dict[str, Any]:
+                return {"vm_size": vm_size, "min_nodes": min_nodes, "max_nodes": max_nodes}
+
+        class MpiConfiguration():
+            def __init__(self, process_count_per_node: int = 1, node_count: int = 1) -> None:
+                self.process_count_per_node = process_count_per_node
+                self.node_count = node_count
+
+        class RunConfiguration():
+            def __init__(self) -> None:
+                self.environment: Any = None
+                self.target: Any = None
+                self.node_count = 1
+                self.mpi: Any = None
+                self.communicator = "None"
+
+        class OutputFileDatasetConfig():
+            def __init__(self, name: Union[str, None] = None, destination: Any = None, **kwargs: Any) -> None:
+                self.name = name
+                self.destination = destination
+
+            def as_input(self, name: Union[str, None] = None) -> DatasetConsumptionConfig:
+                return DatasetConsumptionConfig(name or self.name, self, "mount")
+
+            def as_mount(self) -> OutputFileDatasetConfig:
+                return self
+
+        class PythonScriptStep():
+            def __init__(self, script_name: str, name: Union[str, None] = None, arguments: Union[List[Any], None] = None, **kwargs: Any) -> None:
+                self.script_name = script_name
+                self.name = name
+                self.arguments = arguments or []
+                self.kwargs = kwargs
+
+        class Pipeline():
+            def __init__(self, workspace: Union[Workspace, None], steps: List[PythonScriptStep], **kwargs: Any) -> None:
+                self.workspace = workspace
+                self.steps = steps
+                self.id = f"pipeline-{backend.next_id()}"
+
+        class Run():
+            def __init__(self, experiment: Any = None, run_id: Union[str, None] = None, pipeline: Union[Pipeline, None] = None,
+                         tags: Union[Dict[str, str], None] = None, name: Union[str, None] = None) -> None:
+                self.experiment = experiment
+                self.id = run_id or f"run-{backend.next_id()}"
+                self.pipeline = pipeline
+                self.tags = dict(tags or {})
+                self.name = name
+                self.status = "Running"
+                self.input_datasets: Dict[str, Any] = {}
+                self.metrics: Dict[str, List[Any]] = {}
+                self._start = time.time()
+                self._end: Union[float, None] = None
+                self._run_dto = {"created_utc": _utc(self._start)}
+                self._final_status = backend.run_status
+                self._step_runs: List[Run] = []
+                if pipeline is not None:
+                    self._end = self._start + backend.run_duration
+                    step_duration = backend.run_duration / max(len(pipeline.steps), 1)
+                    for i, step in enumerate(pipeline.steps):
+                        step_run = Run(experiment, name=step.name)
+                        step_run._start = self._start + i * step_duration
+                        step_run._end = step_run._start + step_duration
+                        self._step_runs.append(step_run)
+
+            def _refresh(self) -> None:
+                if self.status == "Running" and self._end is not None and time.time() >= self._end:
+                    self.status = self._final_status
+
+            @property
+            def details(self) -> Dict[str, Any]:
+                self._refresh()
+                end = self._end if self._end is not None and time.time() >= self._end else None
+                return {"startTimeUtc": _utc(self._start), "endTimeUtc": _utc(end) if end is not None else None}
+
+            @classmethod
+            def get_context(cls, **kwargs: Any) -> Run:
+                return cls()
+
+            def get_status(self) -> str:
+                backend.remote("Run.get_status")
+                self._refresh()
+                return self.status
+
+            def wait_for_completion(self, **kwargs: Any) -> Dict[str, Any]:
+                backend.remote("Run.wait_for_completion")
+                if self._end is not None:
+                    time.sleep(max(self._end - time.time(), 0.0))
+                self._refresh()
+                return {"status": self.status}
+
+            def get_details(self) -> Dict[str, Any]:
+                backend.remote("Run.get_details")
+                return {"status": self.status, "runId": self.id, **self.details}
+
+            def get_steps(self) -> List[Run]:
+                backend.remote("Run.get_steps")
+                return list(self._step_runs)
+
+            def find_step_run(self, name: str) -> List[Run]:
+                backend.remote("Run.find_step_run")
+                return [step_run for step_run in self._step_runs if step_run.name == name]
+
+            def get_metrics(self, **kwargs: Any) -> Dict[str, Any]:
+                backend.remote("Run.get_metrics")
+                return {name: values[0] if len(values) == 1 else values for name, values in self.metrics.items()}
+
+            def get_tags(self) -> Dict[str, str]:
+                return dict(self.tags)
+
+            def log(self, name: str, value: Any, **kwargs: Any) -> None:
+                self.metrics.setdefault(name, []).append(value)
+
+            def log_row(self, name: str, **kwargs: Any) -> None:
+                # Comme AzureML, une table est retournée colonne par colonne
+                table = self.metrics.setdefault(name, {})
+                for key, value in kwargs.items():
+                    table.setdefault(key, []).append(value)
+
+            def complete(self) -> None:
+                self.status = "Completed"
+
+            def fail(self, **kwargs: Any) -> None:
+                self.status = "Failed"
+
+            def cancel(self) -> None:
+                self.status = "Canceled"
+
+            def publish_pipeline(self, name: str, description: str, version: str) -> Pipeline:
+                backend.remote("Run.publish_pipeline")
+                return Pipeline(self.experiment.workspace if self.experiment else None, self.pipeline.steps if self.pipeline else [])
+
+        class Experiment():
+            def __init__(self, workspace: Workspace, name: str) -> None:
+                self.workspace = workspace
+                self.name = name
+
+            def submit(self, config: Pipeline, tags: Union[Dict[str, str], None] = None, **kwargs: Any) -> Run:
+                backend.remote("Experiment.submit")
+                run = Run(self, pipeline=config, tags=tags)
+                backend.submitted.append(run)
+                return run
+
+        class PipelineRun(Run):
+            def __new__(cls, experiment: Experiment, run_id: str) -> Any:  # type: ignore[misc]
+                backend.remote("PipelineRun.get")
+                for run in backend.submitted:
+                    if run.id == run_id:
+                        return run
+                raise UserErrorException(f"Run {run_id} introuvable.")
+
+        class ScheduleRecurrence():
+            def __init__(self, frequency: str, interval: int, **kwargs: Any) -> None:
+                self.frequency = frequency
+                self.interval = interval
+
+        class Schedule():
+            def __init__(self, **kwargs: Any) -> None:
+                self.__dict__.update(kwargs)
+
+            @staticmethod
+            def create(workspace: Workspace, name: str, pipeline_id: str, experiment_name: str, **kwargs: Any) -> Schedule:
+                backend.remote("Schedule.create")
+                return Schedule(workspace=workspace, name=name, pipeline_id=pipeline_id, experiment_name=experiment_name, **kwargs)
+
+        core = modules["azureml.core"]
+        for cls in [Workspace, Dataset, Datastore, Environment, Experiment, Run]:
+            setattr(core, cls.__name__, cls)
+        modules["azureml.exceptions"].ProjectSystemException = ProjectSystemException  # type: ignore[attr-defined]
+        modules["azureml.exceptions"].WorkspaceException = WorkspaceException  # type: ignore[attr-defined]
+        modules["azureml.exceptions"].UserErrorException = UserErrorException  # type: ignore[attr-defined]
+        modules["azureml.core.compute"].ComputeTarget = ComputeTarget  # type: ignore[attr-defined]
+        modules["azureml.core.compute"].AmlCompute = AmlCompute  # type: ignore[attr-defined]
+        modules["azureml.core.compute"]._FakeCompute = _FakeCompute  # type: ignore[attr-defined]
+        modules["azureml.core.compute_target"].ComputeTargetException = ComputeTargetException  # type: ignore[attr-defined]
+        modules["azureml.core.runconfig"].RunConfiguration = RunConfiguration  # type: ignore[attr-defined]
+        modules["azureml.core.runconfig"].MpiConfiguration = MpiConfiguration  # type: ignore[attr-defined]
+        modules["azureml.core.conda_dependencies"].CondaDependencies = CondaDependencies  # type: ignore[attr-defined]
+        for module_name in ["azureml.data", "azureml.data.output_dataset_config"]:
+            modules[module_name].OutputFileDatasetConfig = OutputFileDatasetConfig  # type: ignore[attr-defined]
+        for module_name in ["azureml.data", "azureml.data.dataset_consumption_config"]:
+            modules[module_name].DatasetConsumptionConfig = DatasetConsumptionConfig  # type: ignore[attr-defined]
+        modules["azureml.pipeline.steps"].PythonScriptStep = PythonScriptStep  # type: ignore[attr-defined]
+        for cls in [Pipeline, PipelineRun, Schedule, ScheduleRecurrence]:
+            setattr(modules["azureml.pipeline.core"], cls.__name__, cls)
+        return modules
+
+
+def _utc(timestamp: float) -> str:
+    """Formate un timestamp comme les dates des détails d'une Run d'AzureML (ex: "2022-03-01T12:00:00.123456Z")."""
+    return datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def _reset_wrappers() -> None:
+    """Oublie les modules d'azureml_wrapper déjà importés pour qu'ils soient réimportés avec les modules azureml courants."""
+    package = sys.modules.get("azureml_wrapper")
+    for name in [name for name in sys.modules if name.startswith("azureml_wrapper.") and name != __name__]:
+        del sys.modules[name]
+        if package is not None:
+            package.__dict__.pop(name.rpartition(".")[2], None)
+    if package is not None:
+        for name in package.__all__:
+            package.__dict__.pop(name, None)
@@ -2,8 +2,9 @@ from azureml.core import Workspace
 from typing import Dict
 import pytest
 import json
+import os
 
-from azureml_wrapper import PipelineStep, PipelineWrapper, WorkspaceWrapper
+from azureml_wrapper import PipelineStep, PipelineWrapper, WorkspaceWrapper, WorkspaceRegistry
 
 
 @pytest.fixture(scope="session")
@@ -54,6 +55,18 @@ def test_init_WorkspaceWrapper(config: Dict[str, str], ws_wrapper: WorkspaceWrap
     assert(subscription_id == ws_wrapper.ws.subscription_id)
 
 
+def test_WorkspaceRegistry(config: Dict[str, str], ws_wrapper: WorkspaceWrapper):
+
+    ws_name, resource_group, subscription_id = str(config.get("ws_name")), str(config.get("resource_group")), str(config.get("subscription_id"))
+    assert(WorkspaceRegistry.get(ws_name, resource_group, subscription_id) is ws_wrapper.ws)
+    assert(WorkspaceWrapper.from_config(config).ws is ws_wrapper.ws)
+    assert(WorkspaceWrapper.from_workspace(ws_wrapper.ws).ws is ws_wrapper.ws)
+    WorkspaceRegistry.invalidate(ws_name, resource_group, subscription_id)
+    assert(WorkspaceRegistry.get(ws_name, resource_group, subscription_id) is not ws_wrapper.ws)
+    with pytest.raises(ValueError):
+        WorkspaceRegistry.set_ttl(-1)
+
+
 def test_register_blob_datastore_WorkspaceWrapper(config: Dict[str, str], ws_wrapper: WorkspaceWrapper):
 
     ws_wrapper.unregister_blob_datastore("test_ds")
@@ -67,6 +80,21 @@ def test_register_blob_datastore_WorkspaceWrapper(config: Dict[str, str], ws_wra
     assert("test_ds" not in ws_wrapper.ws.datastores)
 
 
+def test_provision_WorkspaceWrapper(config: Dict[str, str], ws_wrapper: WorkspaceWrapper):
+
+    spec = {"datastores": {"test_ds": {"container_name": str(config.get("test_container")), "storage_name": str(config.get("storage_acc_name")),
+                                       "storage_key": str(config.get("storage_key"))}},
+            "datasets": {"test": "test_ds"}}
+    report = ws_wrapper.provision(spec)
+    assert({(resource["type"], resource["name"]) for resource in report} == {("datastores", "test_ds"), ("datasets", "test")})
+    assert(all(resource["status"] in ("Created", "Exists") for resource in report))
+    assert("test_ds" in ws_wrapper.ws.datastores)
+    with pytest.raises(KeyError):
+        ws_wrapper.provision({"pipelines": {}})
+    with pytest.raises(NameError):
+        ws_wrapper.provision({"datasets": {"test": "bad_datastore"}})
+
+
 def test_init_PipelineStep(config: Dict[str, str]):
 
     step_config = {**config, "step_name": "test step1",
@@ -109,6 +137,42 @@ def test_init_PipelineWrapper(pipeline_wrapper: PipelineWrapper):
             assert("--input-folder" in step_args and "--output-folder" not in step_args)
 
 
+def test_planning_PipelineWrapper(config: Dict[str, str]):
+
+    pipeline_config = {**config,
+                       "env_name": "test-env",
+                       "compute_name": "test-compute00001",
+                       "steps": {"step1": {"step_name": "test step1", "script_name": "step1_of_testing_pipeline.py",
+                                           "input_datasets": {"--new-data": "test", "--missing": "missing_1"}},
+                                 "step2": {"step_name": "test step2", "script_name": "step2_of_testing_pipeline.py",
+                                           "input_datasets": {"--other": "missing_2"}},
+                                 "step3": {"script_name": "step2_of_testing_pipeline.py"}}}
+    with pytest.raises(KeyError, match="step3"):
+        PipelineWrapper.from_config(pipeline_config)
+    del pipeline_config["steps"]["step3"]
+    with pytest.raises(NameError, match="missing_1.*missing_2"):
+        PipelineWrapper.from_config(pipeline_config)
+
+
+def test_dag_PipelineWrapper(config: Dict[str, str], pipeline_wrapper: PipelineWrapper):
+
+    dag_config = {**config,
+                  "env_name": "test-env",
+                  "compute_name": "test-compute00001",
+                  "steps": {"source": {"step_name": "source", "script_name": "step1_of_testing_pipeline.py", "outputs": ["left", "right"]},
+                            "left": {"step_name": "left", "script_name": "step2_of_testing_pipeline.py", "depends_on": ["source:left"]},
+                            "right": {"step_name": "right", "script_name": "step2_of_testing_pipeline.py", "depends_on": ["source:right"]},
+                            "merge": {"step_name": "merge", "script_name": "step2_of_testing_pipeline.py", "depends_on": ["left", "right"]}}}
+    dag = PipelineWrapper.from_config(dag_config)
+    assert([step.name for step in dag.steps] == ["source", "left", "right", "merge"])
+    assert("--output-folder-left" in dag.steps[0].arguments and "--output-folder-right" in dag.steps[0].arguments)
+    assert("--input-folder" in dag.steps[1].arguments and "--output-folder" in dag.steps[1].arguments)
+    assert("--input-folder-left" in dag.steps[3].arguments and "--input-folder-right" in dag.steps[3].arguments)
+    with pytest.raises(ValueError):
+        dag_config["steps"]["source"]["depends_on"] = ["merge"]
+        PipelineWrapper.from_config(dag_config)
+
+
 def test_run_PipelineWrapper(pipeline_wrapper: PipelineWrapper, ws_wrapper: WorkspaceWrapper):
 
     pipeline_wrapper.run("test_run")
@@ -117,5 +181,12 @@ def test_run_PipelineWrapper(pipeline_wrapper: PipelineWrapper, ws_wrapper: Work
     assert(pipeline_wrapper._run.experiment.name == pipeline_wrapper.experiment.name)
 
 
+def test_run_local_PipelineWrapper(pipeline_wrapper: PipelineWrapper, tmp_path):
+
+    results = pipeline_wrapper.run_local(working_directory=str(tmp_path))
+    assert([results[step.name]["status"] for step in pipeline_wrapper.steps] == ["Completed", "Completed"])
+    assert(any(file.startswith("test.") for file in os.listdir(tmp_path / "outputs" / "test-step1" / "output")))
+
+
 def test_register_PipelineWrapper(config: Dict[str, str], ws_wrapper: WorkspaceWrapper):
     pass
@@ -0,0 +1,109 @@
+import pandas as pd
+import pytest
+
+from azureml_wrapper.data_formats import (FORMATS, get_format, find_file, format_from_path, compression_from_path, shard_bounds,
+                                          read_schema, write_schema)
+
+
+@pytest.fixture
+def dataframe():
+
+    return pd.DataFrame({"id": [1, 2, 3],
+                         "label": pd.Categorical(["a", "b", "a"]),
+                         "date": pd.to_datetime(["2022-01-01", "2022-02-01", "2022-03-01"])})
+
+
+@pytest.mark.parametrize("format_name", ["parquet", "arrow"])
+def test_columnar_formats_keep_dtypes(tmp_path, dataframe: pd.DataFrame, format_name: str):
+
+    data_format = get_format(format_name)
+    path = str(tmp_path / data_format.file_name("data"))
+    data_format.write(dataframe, path)
+    loaded = data_format.read(path)
+    assert(list(loaded.columns) == list(dataframe.columns))
+    assert(isinstance(loaded["label"].dtype, pd.CategoricalDtype))
+    assert(pd.api.types.is_datetime64_any_dtype(loaded["date"]))
+
+
+def test_find_file(tmp_path, dataframe: pd.DataFrame):
+
+    get_format("arrow").write(dataframe, str(tmp_path / "data.arrow"))
+    assert(find_file(str(tmp_path), "data").endswith("data.arrow"))
+    assert(format_from_path("data.parquet") is FORMATS["parquet"])
+    with pytest.raises(FileNotFoundError):
+        find_file(str(tmp_path), "missing")
+    with pytest.raises(ValueError):
+        get_format("xlsx")
+
+
+@pytest.mark.parametrize("format_name", ["csv", "parquet", "arrow"])
+def test_chunked_read_and_write(tmp_path, format_name: str):
+
+    data_format = get_format(format_name)
+    dataframe = pd.DataFrame({"id": range(25), "value": [i / 2 for i in range(25)]})
+    path = str(tmp_path / data_format.file_name("data"))
+    with data_format.open_writer(path) as writer:
+        for start in range(0, 25, 10):
+            writer.write(dataframe.iloc[start:start + 10])
+    assert(writer.rows == 25)
+    chunks = list(data_format.iter_read(path, chunksize=4))
+    assert(all(len(chunk) <= 4 for chunk in chunks))
+    assert(pd.concat(chunks, ignore_index=True)["id"].tolist() == list(range(25)))
+
+
+@pytest.mark.parametrize("format_name", ["csv", "parquet", "arrow"])
+def test_read_rows_shards(tmp_path, format_name: str):
+
+    data_format = get_format(format_name)
+    path = str(tmp_path / data_format.file_name("data"))
+    with data_format.open_writer(path) as writer:
+        for start in range(0, 100, 30):
+            writer.write(pd.DataFrame({"x": range(start, min(start + 30, 100))}))
+    assert(data_format.count_rows(path) == 100)
+    shards = [data_format.read_rows(path, *shard_bounds(100, i, 3)) for i in range(3)]
+    assert([len(shard) for shard in shards] == [33, 33, 34])
+    assert(pd.concat(shards)["x"].tolist() == list(range(100)))
+
+
+@pytest.mark.parametrize("format_name", ["csv", "parquet", "arrow"])
+def test_projection_and_filters(tmp_path, format_name: str):
+
+    data_format = get_format(format_name)
+    path = str(tmp_path / data_format.file_name("data"))
+    data_format.write(pd.DataFrame({"id": range(20), "annee": [2018 + i % 4 for i in range(20)], "texte": ["x"] * 20}), path)
+    filters = [("annee", ">=", 2020), ("id", "not in", [2, 3])]
+    loaded = data_format.read(path, columns=["id"], filters=filters)
+    expected = [i for i in range(20) if 2018 + i % 4 >= 2020 and i not in (2, 3)]
+    assert(list(loaded.columns) == ["id"])
+    assert(loaded["id"].tolist() == expected)
+    chunks = list(data_format.iter_read(path, chunksize=3, columns=["id"], filters=filters))
+    assert(pd.concat(chunks, ignore_index=True)["id"].tolist() == expected)
+    with pytest.raises(ValueError):
+        data_format.read(path, filters=[("annee", "~", 2020)])
+
+
+def test_csv_schema_sidecar(tmp_path, dataframe: pd.DataFrame):
+
+    path = str(tmp_path / "data.csv")
+    get_format("csv").write(dataframe, path)
+    write_schema(dataframe, path)
+    assert(read_schema(path) == {column: str(dtype) for column, dtype in dataframe.dtypes.items()})
+    loaded = get_format("csv").read(path)
+    assert(isinstance(loaded["label"].dtype, pd.CategoricalDtype))
+    assert(pd.api.types.is_datetime64_any_dtype(loaded["date"]))
+    assert(get_format("csv").read(path, dtypes={"id": "float64"})["id"].dtype == "float64")
+
+
+@pytest.mark.parametrize("format_name, compression", [("csv", "gzip"), ("parquet", "zstd"), ("arrow", "zstd"), ("arrow", "lz4")])
+def test_compression(tmp_path, dataframe: pd.DataFrame, format_name: str, compression: str):
+
+    data_format = get_format(format_name)
+    path = str(tmp_path / data_format.file_name("data", compression))
+    data_format.write(dataframe, path, compression=compression)
+    assert(format_from_path(path) is data_format)
+    assert(find_file(str(tmp_path), "data") == path)
+    assert(data_format.read(path)["id"].tolist() == [1, 2, 3])
+    if data_format.compressions[compression]:
+        assert(compression_from_path(path) == compression)
+    with pytest.raises(ValueError):
+        data_format.write(dataframe, path, compression="rar")
@@ -0,0 +1,41 @@
+import os
+
+import pandas as pd
+
+from azureml_wrapper.dataset_cache import DatasetCache
+from azureml_wrapper.local_run import LocalDataset
+
+
+def local_dataset(tmp_path, name: str, rows: int) -> LocalDataset:
+
+    path = tmp_path / f"{name}.parquet"
+    pd.DataFrame({"a": range(rows)}).to_parquet(path)
+    return LocalDataset(name, str(path))
+
+
+def test_fetch_DatasetCache(tmp_path):
+
+    cache = DatasetCache(str(tmp_path / "cache"))
+    dataset = local_dataset(tmp_path, "ventes", 10)
+    paths = cache.fetch("ventes", dataset)
+    assert((cache.hits, cache.misses) == (0, 1))
+    assert(pd.concat([pd.read_parquet(path) for path in paths])["a"].tolist() == list(range(10)))
+    assert(cache.fetch("ventes", dataset) == paths)
+    assert((cache.hits, cache.misses) == (1, 1))
+    assert(list(cache.entries()) == [DatasetCache.key("ventes", dataset)])
+    dataset.version = 2
+    cache.fetch("ventes", dataset)
+    assert((cache.hits, cache.misses) == (1, 2))
+
+
+def test_evict_DatasetCache(tmp_path):
+
+    datasets = [local_dataset(tmp_path, f"table{i}", 1000) for i in range(3)]
+    cache = DatasetCache(str(tmp_path / "cache"))
+    cache.fetch("table0", datasets[0])
+    cache.max_size = int(cache.size() * 2.5)
+    for name, dataset in [("table1", datasets[1]), ("table0", datasets[0]), ("table2", datasets[2])]:
+        cache.fetch(name, dataset)
+    assert(sorted(metadata["name"] for metadata in cache.entries().values()) == ["table0", "table2"])
+    assert(cache.size() <= cache.max_size)
+    assert(not any(key.endswith(".tmp") for key in os.listdir(cache.directory)))
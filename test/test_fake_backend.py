@@ -0,0 +1,251 @@
+import json
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from .fake_azureml import FakeAzureML
+from .conftest import pipeline_config
+
+
+def test_remote_calls_from_config(backend: FakeAzureML):
+
+    from azureml_wrapper import PipelineWrapper
+    steps = {f"step{i}": {"step_name": f"step{i}", "script_name": "step.py", "input_datasets": {"--data": "ventes"}} for i in range(30)}
+    pipeline = PipelineWrapper.from_config(pipeline_config(steps))
+    assert(len(pipeline.pipeline_steps) == 30)
+    assert(backend.calls["Workspace.get"] == 1)
+    assert(backend.calls["Workspace.datasets"] == 1)
+    backend.reset_calls()
+    pipeline.run("experience")
+    assert(backend.calls["Experiment.submit"] == 1)
+    assert(backend.submitted[0].pipeline.steps == pipeline.pipeline_steps)
+
+
+def test_missing_datasets_from_config(backend: FakeAzureML):
+
+    from azureml_wrapper import PipelineWrapper
+    steps = {"step1": {"step_name": "step1", "script_name": "step.py", "input_datasets": {"--a": "absent", "--b": "ventes:2"}}}
+    with pytest.raises(NameError, match="absent"):
+        PipelineWrapper.from_config(pipeline_config(steps))
+
+
+def test_resolve_generator_DatasetResolver(backend: FakeAzureML):
+
+    from azureml.core import Workspace
+    from azureml_wrapper.dataset_resolver import DatasetResolver
+    resolver = DatasetResolver(Workspace.get("ws", resource_group="rg", subscription_id="sub"))
+    assert(list(resolver.resolve(reference for reference in ["ventes"])) == ["ventes"])
+
+
+def test_dag_from_config(backend: FakeAzureML):
+
+    from azureml_wrapper import PipelineWrapper
+    steps = {"prep": {"step_name": "prep", "script_name": "prep.py", "outputs": ["train", "test"]},
+             "fit": {"step_name": "fit", "script_name": "fit.py", "depends_on": ["prep:train"]},
+             "score": {"step_name": "score", "script_name": "score.py", "depends_on": ["fit", "prep:test"]}}
+    pipeline = PipelineWrapper.from_config(pipeline_config(steps))
+    score = pipeline.pipeline_steps[-1]
+    assert("--input-folder-fit" in score.arguments and "--input-folder-prep-test" in score.arguments)
+
+
+def test_provision_WorkspaceWrapper(backend: FakeAzureML):
+
+    from azureml_wrapper import WorkspaceWrapper
+    backend.add_datastore("ds", {"clients.csv": pd.DataFrame({"b": [1]})})
+    wrapper = WorkspaceWrapper("ws", "rg", "sub")
+    backend.reset_calls()
+    results = wrapper.provision({"environments": {"env": ["pandas"], "env2": ["numpy"]},
+                                 "computes": {"gpu": {"compute_max_nodes": 2}, "gpu2": {"compute_max_nodes": 2}},
+                                 "datasets": {"clients": "ds", "ventes": "ds"}})
+    assert(all(backend.calls[f"Workspace.{kind}"] == 1 for kind in ["environments", "datastores", "compute_targets", "datasets"]))
+    statuses = {result["name"]: result["status"] for result in results}
+    assert(statuses == {"env": "Exists", "env2": "Created", "gpu": "Created", "gpu2": "Created", "clients": "Created", "ventes": "Exists"})
+    assert(wrapper.ws.datasets["clients"].to_pandas_dataframe()["b"].tolist() == [1])
+
+
+def test_register_checks_WorkspaceWrapper(backend: FakeAzureML):
+
+    from azureml_wrapper import WorkspaceWrapper
+    backend.add_datastore("ds", {"clients.csv": pd.DataFrame({"b": [1]})})
+    wrapper = WorkspaceWrapper("ws", "rg", "sub")
+    with pytest.raises(TypeError):
+        wrapper.register_env("env", "pandas")  # type: ignore[arg-type]
+    with pytest.raises(TypeError):
+        wrapper.provision({"environments": {"env": "pandas"}})
+    results = wrapper.provision({"datasets": {"clients.csv": "ds"}})
+    assert([(result["name"], result["status"]) for result in results] == [("clients", "Created")])
+    assert(wrapper.ws.datasets["clients"].to_pandas_dataframe()["b"].tolist() == [1])
+
+
+def test_sharded_step_run_local(backend: FakeAzureML, tmp_path):
+
+    from azureml_wrapper import PipelineWrapper
+    (tmp_path / "produce.py").write_text(
+        "import pandas as pd\nfrom azureml_wrapper import ScriptWrapper\n"
+        "script = ScriptWrapper()\nscript.save_in_output_folder(pd.DataFrame({'x': range(10)}), 'data')\nscript.complete()\n")
+    (tmp_path / "double.py").write_text(
+        "from azureml_wrapper import ScriptWrapper\n"
+        "script = ScriptWrapper()\ndata = script.get_shard_from_input_folder('data')\ndata['shard'] = script.shard_index\n"
+        "data['x'] = data['x'] * 2\nscript.save_in_output_folder(data, 'data')\nscript.save_partition(data, 'parts')\nscript.complete()\n")
+    (tmp_path / "collect.py").write_text("from azureml_wrapper import ScriptWrapper\nScriptWrapper().complete()\n")
+    steps = {"produce": {"step_name": "produce", "script_name": "produce.py", "script_directory": str(tmp_path)},
+             "double": {"step_name": "double", "script_name": "double.py", "script_directory": str(tmp_path), "shards": 3},
+             "collect": {"step_name": "collect", "script_name": "collect.py", "script_directory": str(tmp_path)}}
+    pipeline = PipelineWrapper.from_config({**pipeline_config(steps), "data_format": "parquet"})
+    assert([step.name for step in pipeline.steps] == ["produce", "double_shard0", "double_shard1", "double_shard2", "double_reduce", "collect"])
+    results = pipeline.run_local(str(tmp_path / "run"))
+    assert(all(result["status"] == "Completed" for result in results.values()))
+    reduced = pd.read_parquet(tmp_path / "run" / "outputs" / "double-reduce" / "output" / "data.parquet")
+    assert(reduced["x"].tolist() == [x * 2 for x in range(10)])
+    assert(reduced["shard"].tolist() == [0, 0, 0, 1, 1, 1, 2, 2, 2, 2])
+    partitions = sorted((tmp_path / "run" / "outputs" / "double-reduce" / "output" / "parts").glob("part-*.parquet"))
+    assert(sorted(pd.concat(pd.read_parquet(path) for path in partitions)["shard"].tolist()) == [0, 0, 0, 1, 1, 1, 2, 2, 2, 2])
+    assert((tmp_path / "run" / "outputs" / "double-reduce" / "output" / "_checkpoint.json").exists())
+
+
+def test_step_cache_run_local(backend: FakeAzureML, tmp_path):
+
+    from azureml_wrapper import PipelineWrapper
+    from azureml_wrapper.step_cache import StepCache
+    for name in ["prep", "fit", "report"]:
+        (tmp_path / f"{name}.py").write_text("from azureml_wrapper import ScriptWrapper\nScriptWrapper().complete()\n")
+    steps = {"prep": {"step_name": "prep", "script_name": "prep.py", "script_directory": str(tmp_path), "outputs": ["train"]},
+             "fit": {"step_name": "fit", "script_name": "fit.py", "script_directory": str(tmp_path), "depends_on": ["prep:train"]},
+             "report": {"step_name": "report", "script_name": "report.py", "script_directory": str(tmp_path)}}
+    pipeline = PipelineWrapper.from_config(pipeline_config(steps))
+    cache = StepCache(str(tmp_path / "cache"))
+    results = pipeline.run_local(str(tmp_path / "run"), cache=cache)
+    assert({name: result["status"] for name, result in results.items()} == {"prep": "Completed", "fit": "Completed", "report": "Completed"})
+    results = pipeline.run_local(str(tmp_path / "run"), cache=cache)
+    assert({name: result["status"] for name, result in results.items()} == {"prep": "Cached", "fit": "Cached", "report": "Cached"})
+    (tmp_path / "prep.py").write_text("from azureml_wrapper import ScriptWrapper\nScriptWrapper().complete()  # modifié\n")
+    results = pipeline.run_local(str(tmp_path / "run"), cache=cache)
+    assert({name: result["status"] for name, result in results.items()} == {"prep": "Completed", "fit": "Completed", "report": "Cached"})
+
+
+def test_dataset_modes_run_local(backend: FakeAzureML, tmp_path):
+
+    from azureml_wrapper import PipelineWrapper
+    (tmp_path / "read.py").write_text(
+        "import json\nfrom azureml_wrapper import ScriptWrapper\nfrom azureml_wrapper.dataset_cache import DatasetCache\n"
+        f"script = ScriptWrapper()\nscript.dataset_cache = DatasetCache({str(tmp_path / 'cache')!r})\n"
+        "mounted = script.get_csv_from_config('ventes')\ncached = [script.get_csv_from_config('clients', cache=True) for _ in range(2)]\n"
+        "sources = [record['source'] for record in script.profiler.records]\n"
+        "json.dump({'mounted': mounted['a'].tolist(), 'cached': cached[1]['b'].tolist(), 'sources': sources}, open('result.json', 'w'))\n"
+        "script.complete()\n")
+    backend.add_dataset("clients", pd.DataFrame({"b": [4, 5]}))
+    steps = {"read": {"step_name": "read", "script_name": "read.py", "script_directory": str(tmp_path),
+                      "step_config": {"ventes": "ventes", "clients": "clients"},
+                      "input_datasets": {"--ventes": "ventes", "--clients": "clients"}, "dataset_modes": {"--ventes": "mount"}}}
+    pipeline = PipelineWrapper.from_config(pipeline_config(steps))
+    modes = {arg.name: arg.mode for arg in pipeline.steps[0].arguments if hasattr(arg, "mode")}
+    assert(modes == {"ventes": "mount", "clients": "direct"})
+    results = pipeline.run_local(str(tmp_path / "run"))
+    assert(results["read"]["status"] == "Completed")
+    with open(tmp_path / "result.json") as result_file:
+        assert(json.load(result_file) == {"mounted": [1, 2, 3], "cached": [4, 5], "sources": ["local", "blob", "cache"]})
+    with pytest.raises(ValueError, match="copy"):
+        steps["read"]["dataset_modes"] = {"--ventes": "copy"}
+        PipelineWrapper.from_config(pipeline_config(steps))
+    with pytest.raises(KeyError, match="--absent"):
+        steps["read"]["dataset_modes"] = {"--absent": "mount"}
+        PipelineWrapper.from_config(pipeline_config(steps))
+
+
+def test_submit_and_monitor_runs(backend: FakeAzureML):
+
+    from azureml_wrapper import PipelineWrapper, RunMonitor
+    backend.run_duration = 0.2
+    steps = {"step1": {"step_name": "step1", "script_name": "step.py"}, "step2": {"step_name": "step2", "script_name": "step.py"}}
+    pipelines = [PipelineWrapper.from_config(pipeline_config(steps)) for _ in range(5)]
+    start = time.perf_counter()
+    monitor = RunMonitor.submit_all(pipelines, "sweep", [{"lr": str(i)} for i in range(5)], [f"lr{i}" for i in range(5)],
+                                    min_interval=0.01, max_interval=0.05)
+    assert(time.perf_counter() - start < 0.2)
+    assert([handle.name for handle in monitor.handles] == [f"lr{i}" for i in range(5)])
+    assert(monitor.handles[3].run.get_tags() == {"lr": "3", RunMonitor.VARIANT_TAG: "3"})
+    with pytest.raises(ValueError, match="names"):
+        RunMonitor.submit_all(pipelines, "sweep", names=["lr0"])
+    assert(monitor.wait_any(timeout=5))
+    assert(all(handle.status == "Completed" for handle in monitor.wait_all(timeout=5)))
+    assert(time.perf_counter() - start < 1.0)
+    durations = monitor.step_durations()
+    assert(set(durations) == {handle.name for handle in monitor.handles})
+    assert(all(abs(duration - 0.1) < 0.05 for run_durations in durations.values() for duration in run_durations.values()))
+    with pytest.raises(TimeoutError):
+        backend.run_duration = 10
+        RunMonitor([pipelines[0].submit("sweep")], min_interval=0.01).wait_all(timeout=0.05)
+
+
+def test_snapshot_from_config(backend: FakeAzureML, tmp_path):
+
+    from azureml_wrapper import PipelineWrapper
+    (tmp_path / "step.py").write_text("import utils")
+    (tmp_path / "utils.py").write_text("")
+    (tmp_path / "big.bin").write_bytes(b"0" * 1000)
+    steps = {f"step{i}": {"step_name": f"step{i}", "script_name": "step.py", "script_directory": str(tmp_path)} for i in range(3)}
+    pipeline = PipelineWrapper.from_config({**pipeline_config(steps), "snapshot": str(tmp_path / "snapshots")})
+    assert(len({step.kwargs["source_directory"] for step in pipeline.pipeline_steps}) == 1)
+    assert(sorted(os.listdir(pipeline.pipeline_steps[0].kwargs["source_directory"])) == ["step.py", "utils.py"])
+    assert([snapshot["reused"] for snapshot in pipeline.snapshots.values()] == [False, True, True])
+
+
+def test_per_step_compute_from_config(backend: FakeAzureML):
+
+    from azureml_wrapper import PipelineWrapper
+    backend.add_compute("gpu", max_nodes=4)
+    backend.add_environment("env-gpu")
+    steps = {"prep": {"step_name": "prep", "script_name": "prep.py"},
+             "split": {"step_name": "split", "script_name": "split.py"},
+             "fit": {"step_name": "fit", "script_name": "fit.py", "compute_name": "gpu", "env_name": "env-gpu", "node_count": 2, "process_count": 4}}
+    backend.reset_calls()
+    pipeline = PipelineWrapper.from_config(pipeline_config(steps))
+    prep, split, fit = pipeline.pipeline_steps
+    assert(prep.kwargs["compute_target"].name == "cpu" and fit.kwargs["compute_target"].name == "gpu")
+    assert(prep.kwargs["runconfig"] is split.kwargs["runconfig"])
+    assert(fit.kwargs["runconfig"].environment.name == "env-gpu")
+    assert((fit.kwargs["runconfig"].node_count, fit.kwargs["runconfig"].mpi.process_count_per_node) == (2, 4))
+    assert(prep.kwargs["runconfig"].mpi is None)
+    assert(backend.calls["ComputeTarget.get"] == 2 and backend.calls["Environment.get"] == 2)
+    sharded = PipelineWrapper.from_config(pipeline_config({"fit": {**steps["fit"], "outputs": ["model"], "shards": 2,
+                                                                   "step_config": {"lr": 0.1}, "extra_files": ["utils.py"]}}))
+    shard0, shard1, reduce_step = sharded.steps
+    assert((reduce_step.compute_name, reduce_step.env_name, reduce_step.node_count, reduce_step.process_count) == ("gpu", "env-gpu", 2, 4))
+    assert(shard0.extra_files == shard1.extra_files and shard0.extra_files is not shard1.extra_files)
+    assert(shard0.ws is shard1.ws)
+    with pytest.raises(ValueError, match="node_count"):
+        PipelineWrapper.from_config(pipeline_config({"fit": {**steps["fit"], "node_count": 8}}))
+    with pytest.raises(TypeError, match="absent"):
+        PipelineWrapper.from_config(pipeline_config({"fit": {**steps["fit"], "compute_name": "absent"}}))
+
+
+def test_resume_from_checkpoints(backend: FakeAzureML):
+
+    from azureml_wrapper import PipelineWrapper
+    datastore = backend.add_datastore("checkpoints")
+    steps = {name: {"step_name": name, "script_name": f"{name}.py"} for name in ["extract", "clean", "fit", "score"]}
+    pipeline = PipelineWrapper.from_config({**pipeline_config(steps), "checkpoints": "checkpoints"})
+    outputs = [step.arguments[step.arguments.index("--output-folder") + 1] for step in pipeline.pipeline_steps[:3]]
+    assert([output.destination[1] for output in outputs] == [f"azureml_wrapper/checkpoints/{{run-id}}/{name}" for name in ["extract", "clean", "fit"]])
+    previous = pipeline.submit("experience")
+    for step_run in previous.run.get_steps()[:3]:
+        datastore.put(f"azureml_wrapper/checkpoints/{step_run.id}/{step_run.name}/_checkpoint.json", b"{}")
+    handle = pipeline.submit("experience")
+    step_paths = {step_run.name: f"azureml_wrapper/checkpoints/{step_run.id}/{step_run.name}" for step_run in handle.run.get_steps()}
+    for name in ["extract", "clean"]:
+        datastore.put(f"{step_paths[name]}/_checkpoint.json", b"{}")
+    with pytest.warns(UserWarning, match="fit"):
+        manifest = pipeline.checkpoint_manifest(handle.run.id, "experience")
+    assert([manifest[name]["complete"] for name in ["extract", "clean", "fit", "score"]] == [True, True, False, False])
+    with pytest.warns(UserWarning, match="fit"):
+        resumed = pipeline.resume(handle.run.id, "experience")
+    fit, score = resumed.run.pipeline.steps
+    assert((fit.name, score.name) == ("fit", "score"))
+    checkpoint_input = fit.arguments[fit.arguments.index("--input-folder") + 1]
+    assert(checkpoint_input.dataset._path == [(datastore, step_paths["clean"])])
+    fit_run = resumed.run.get_steps()[0]
+    datastore.put(f"azureml_wrapper/checkpoints/{fit_run.id}/fit/_checkpoint.json", b"{}")
+    resumed_again = PipelineWrapper.from_config({**pipeline_config(steps), "checkpoints": "checkpoints"}).resume(resumed.run.id, "experience")
+    assert([step.name for step in resumed_again.run.pipeline.steps] == ["score"])
@@ -0,0 +1,32 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def imported_modules(statement: str):
+
+    probe = f"import json, sys\n{statement}\nprint(json.dumps(sorted(sys.modules)))"
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(path for path in [ROOT, os.environ.get("PYTHONPATH", "")] if path)}
+    output = subprocess.run([sys.executable, "-c", probe], env=env, capture_output=True, text=True, check=True)
+    return set(json.loads(output.stdout))
+
+
+@pytest.mark.parametrize("statement", ["import azureml_wrapper", "from azureml_wrapper import ScriptWrapper"])
+def test_import_is_lazy(statement: str):
+
+    modules = imported_modules(statement)
+    heavy = [module for module in modules if module.split(".")[0] in ("pandas", "pyarrow") or module.startswith("azureml.")]
+    assert(heavy == [])
+
+
+def test_lazy_attributes():
+
+    import azureml_wrapper
+    assert(set(azureml_wrapper.__all__) <= set(dir(azureml_wrapper)))
+    with pytest.raises(AttributeError):
+        azureml_wrapper.NotAWrapper
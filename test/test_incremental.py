@@ -0,0 +1,73 @@
+import os
+
+import pandas as pd
+import pytest
+
+from .fake_azureml import FakeAzureML
+from azureml_wrapper.incremental import DatastoreStorage, IncrementalManifest
+
+
+def test_manifest_on_datastore():
+
+    with FakeAzureML() as backend:
+        datastore = backend.add_datastore("lac", {"ventes/01.csv": pd.DataFrame({"a": [1]}), "ventes/02.csv": pd.DataFrame({"a": [2]}),
+                                                  "ventes/02.csv.bak": pd.DataFrame({"a": [0]})})
+        manifest = IncrementalManifest(DatastoreStorage(datastore), "ventes/", "_manifests/step.json").load()
+        names = manifest.new_blobs()
+        assert(names == ["ventes/01.csv", "ventes/02.csv", "ventes/02.csv.bak"])
+        names = names[:2]
+        assert([pd.read_csv(path)["a"].tolist() for path in manifest.download(names)] == [[1], [2]])
+        assert(not any(file_name.endswith(".bak") for _, _, file_names in os.walk(manifest._folder) for file_name in file_names))
+        manifest.commit(names, "run-1", ["ventes/part-1.csv"])
+        datastore.put("ventes/02.csv", pd.DataFrame({"a": [3]}))
+        datastore.put("ventes/03.csv", pd.DataFrame({"a": [4]}))
+        backend.reset_calls()
+        manifest = IncrementalManifest(DatastoreStorage(datastore), "ventes/", "_manifests/step.json").load()
+        names = manifest.new_blobs()
+        assert(names == ["ventes/02.csv", "ventes/02.csv.bak", "ventes/03.csv"])
+        manifest.download(names)
+        assert(backend.calls["BlobService.get_blob_to_path"] == 4)
+        assert(manifest.history[0]["partitions"] == ["ventes/part-1.csv"])
+        with pytest.raises(ValueError):
+            IncrementalManifest(DatastoreStorage(datastore), "ventes/", "ventes/manifest.json")
+        with pytest.raises(ValueError):
+            IncrementalManifest(DatastoreStorage(datastore), "", "_manifests/step.json")
+        assert(IncrementalManifest(DatastoreStorage(datastore), "ventes", "ventes_manifests/step.json").manifest_path)
+
+
+def test_incremental_step_run_local(tmp_path):
+
+    with FakeAzureML() as backend:
+        backend.add_environment("env")
+        backend.add_compute("cpu")
+        backend.add_datastore("lac")
+        from azureml_wrapper import PipelineWrapper
+        (tmp_path / "ingest.py").write_text(
+            "import pandas as pd\nfrom azureml_wrapper import ScriptWrapper\nscript = ScriptWrapper()\n"
+            "for path in script.incremental_files():\n    script.save_partition(pd.read_csv(path), 'ventes')\nscript.complete()\n")
+        (tmp_path / "report.py").write_text(
+            "import pandas as pd\nfrom azureml_wrapper import ScriptWrapper\nscript = ScriptWrapper()\n"
+            "print(sum(len(chunk) for chunk in script.iter_partitions_from_input_folder('ventes')))\nscript.complete()\n")
+        lake = tmp_path / "lac"
+        (lake / "ventes").mkdir(parents=True)
+        (lake / "ventes" / "01.csv").write_text("a\n1\n2\n")
+        steps = {"ingest": {"step_name": "ingest", "script_name": "ingest.py", "script_directory": str(tmp_path),
+                            "incremental": {"datastore": "lac", "path": "ventes/"}},
+                 "report": {"step_name": "report", "script_name": "report.py", "script_directory": str(tmp_path)}}
+        config = {"ws_name": "ws", "resource_group": "rg", "subscription_id": "sub", "env_name": "env", "compute_name": "cpu", "steps": steps}
+        pipeline = PipelineWrapper.from_config(config)
+        assert(pipeline.steps[0].allow_reuse is False)
+        assert("_azureml_wrapper/manifests/ingest.json" in pipeline.steps[0].arguments)
+        output_folder = pipeline.steps[0].arguments[pipeline.steps[0].arguments.index("--output-folder") + 1]
+        assert(output_folder.destination[1] == "_azureml_wrapper/outputs/ingest/ingest")
+        output = lake / "_azureml_wrapper" / "outputs" / "ingest" / "ingest" / "ventes"
+        for expected_partitions, new_file in [(1, "02.csv"), (2, None), (2, None)]:
+            results = pipeline.run_local(str(tmp_path / "run"), datastores={"lac": str(lake)})
+            assert(results["ingest"]["status"] == "Completed" and results["report"]["status"] == "Completed")
+            assert(len([name for name in output.iterdir() if name.suffix == ".csv"]) == expected_partitions)
+            if new_file:
+                (lake / "ventes" / new_file).write_text("a\n3\n")
+        assert((lake / "_azureml_wrapper" / "manifests" / "ingest.json").exists())
+        steps["ingest"]["incremental"] = {"datastore": "lac", "path": "ventes/", "output": "ventes/resultats"}
+        with pytest.raises(ValueError, match="output"):
+            PipelineWrapper.from_config(config)
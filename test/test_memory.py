@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from azureml_wrapper.data_formats import get_format, write_schema
+from azureml_wrapper.memory import optimize_dataframe
+
+
+@pytest.fixture
+def dataframe():
+
+    return pd.DataFrame({"id": np.arange(1000),
+                         "delta": -np.arange(1000),
+                         "quart": np.arange(1000) / 4,
+                         "bruit": np.random.default_rng(0).random(1000),
+                         "region": ["QC", "ON"] * 500,
+                         "texte": [f"ligne {i}" for i in range(1000)],
+                         "actif": [True, False] * 500})
+
+
+def test_optimize_dataframe(dataframe: pd.DataFrame):
+
+    optimized, report = optimize_dataframe(dataframe)
+    assert(optimized["id"].dtype == "uint16")
+    assert(optimized["delta"].dtype == "int16")
+    assert(optimized["quart"].dtype == "float32")
+    assert(optimized["bruit"].dtype == "float64")
+    assert(isinstance(optimized["region"].dtype, pd.CategoricalDtype))
+    assert(not isinstance(optimized["texte"].dtype, pd.CategoricalDtype))
+    assert(optimized.astype(dataframe.dtypes.to_dict()).equals(dataframe))
+    assert(list(report.index) == [*dataframe.columns, "total"])
+    assert(report.loc["total", "bytes_after"] < report.loc["total", "bytes_before"])
+    with pytest.raises(ValueError):
+        optimize_dataframe(dataframe, max_category_ratio=2)
+
+
+@pytest.mark.parametrize("format_name", ["csv", "parquet", "arrow"])
+def test_optimized_dtypes_travel(tmp_path, dataframe: pd.DataFrame, format_name: str):
+
+    optimized, _ = optimize_dataframe(dataframe)
+    data_format = get_format(format_name)
+    path = str(tmp_path / data_format.file_name("data"))
+    data_format.write(optimized, path)
+    if not data_format.typed:
+        write_schema(optimized, path)
+    loaded = data_format.read(path)
+    assert(loaded.dtypes.astype(str).to_dict() == optimized.dtypes.astype(str).to_dict())
+
+
+def test_optimize_dataframe_edge_cases():
+
+    dataframe = pd.DataFrame([[1, -2, None], [3, 4, None]], columns=["a", "a", "vide"], index=[5, 5])
+    dataframe["vide"] = dataframe["vide"].astype("Int64")
+    optimized, report = optimize_dataframe(dataframe)
+    assert(list(optimized.columns) == ["a", "a", "vide"])
+    assert(optimized.dtypes.astype(str).tolist() == ["uint8", "int8", "UInt8"])
+    assert(optimized["vide"].isna().all())
+    assert(list(optimized.index) == [5, 5])
+    assert(len(report) == 4)
@@ -0,0 +1,24 @@
+import json
+
+from azureml_wrapper.local_run import LocalRun
+from azureml_wrapper.profiler import StepProfiler
+
+
+def test_measure_and_flush_StepProfiler(tmp_path):
+
+    profiler = StepProfiler("step")
+    with profiler.measure("read:data.csv", "read", nbytes=1000) as record:
+        record["rows"] = 10
+    chunks = list(profiler.track_iter("read:chunks", iter([[1, 2], [3]])))
+    assert(chunks == [[1, 2], [3]])
+    with profiler.profile():
+        sum(range(1000))
+    run = LocalRun("step", str(tmp_path / "run"))
+    trace_path = profiler.flush(run, str(tmp_path / "output"))
+    with open(str(trace_path)) as trace_file:
+        trace = json.load(trace_file)
+    assert([operation["rows"] for operation in trace["operations"]] == [10, 3])
+    assert(trace["operations"][0]["bytes_per_second"] > 0)
+    assert((tmp_path / "output" / "_step_profile.prof").exists())
+    assert(len(run.metrics["step_operations"]) == 2)
+    assert(profiler.flush(run, None) is None)
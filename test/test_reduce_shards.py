@@ -0,0 +1,45 @@
+import types
+
+import pandas as pd
+import pytest
+
+from azureml_wrapper.data_formats import get_format, read_schema, write_schema
+from azureml_wrapper.profiler import StepProfiler
+from azureml_wrapper.reduce_shards import reduce_output
+
+
+@pytest.fixture
+def script():
+
+    return types.SimpleNamespace(profiler=StepProfiler("reduce"))
+
+
+@pytest.mark.parametrize("format_name", ["parquet", "arrow"])
+def test_reduce_output_unifies_schemas(tmp_path, script, format_name: str):
+
+    data_format = get_format(format_name)
+    shards = [pd.DataFrame({"x": [1, 2], "note": [None, None]}), pd.DataFrame({"x": [2.5], "note": ["a"]})]
+    for i, shard in enumerate(shards):
+        (tmp_path / f"shard{i}").mkdir()
+        data_format.write(shard, str(tmp_path / f"shard{i}" / data_format.file_name("data")))
+    reduce_output(script, [str(tmp_path / f"shard{i}") for i in range(2)], str(tmp_path / "output"))
+    reduced = data_format.read(str(tmp_path / "output" / data_format.file_name("data")))
+    assert(reduced["x"].tolist() == [1.0, 2.0, 2.5])
+    assert(reduced["note"].tolist()[2] == "a" and reduced["note"].isna().sum() == 2)
+
+
+def test_reduce_output_merges_csv_schemas_and_warns(tmp_path, script):
+
+    csv = get_format("csv")
+    shards = [pd.DataFrame({"id": [1], "note": [None]}), pd.DataFrame({"id": [2], "note": ["a"]})]
+    for i, shard in enumerate(shards):
+        folder = tmp_path / f"shard{i}"
+        folder.mkdir()
+        csv.write(shard, str(folder / "data.csv"))
+        write_schema(shard, str(folder / "data.csv"))
+        (folder / "model.txt").write_text(f"shard {i}")
+    with pytest.warns(UserWarning, match="model.txt"):
+        reduce_output(script, [str(tmp_path / f"shard{i}") for i in range(2)], str(tmp_path / "output"))
+    assert(read_schema(str(tmp_path / "output" / "data.csv")) == {"id": "int64"})
+    assert(csv.read(str(tmp_path / "output" / "data.csv"))["id"].tolist() == [1, 2])
+    assert((tmp_path / "output" / "model.txt").read_text() == "shard 0")
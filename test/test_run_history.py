@@ -0,0 +1,98 @@
+import pandas as pd
+import pytest
+
+from .fake_azureml import FakeAzureML
+from azureml_wrapper.run_history import RunHistory, _table_rows, step_record
+from .conftest import pipeline_config
+
+STEPS = {"prep": {"step_name": "prep", "script_name": "prep.py"}, "fit": {"step_name": "fit", "script_name": "fit.py"}}
+
+
+def submit(pipeline, backend: FakeAzureML, duration: float, rows: int):
+
+    backend.run_duration = duration
+    run = pipeline.submit("entrainement").run
+    for step_run in run.get_steps():
+        step_run.log("step_wall_seconds", duration / 4)
+        step_run.log_row("step_operations", operation="read:data", kind="read", rows=rows, bytes=rows * 8)
+    run.wait_for_completion()
+    return run
+
+
+def test_step_record():
+
+    class StepRun():
+        id = "fit-run"
+        name = "fit"
+        _run_dto = {"created_utc": "2022-03-01T12:00:00.000000Z"}
+
+        def get_details(self):
+            return {"status": "Completed", "startTimeUtc": "2022-03-01T12:00:30.000000Z", "endTimeUtc": "2022-03-01T12:02:30.000000Z"}
+
+        def get_metrics(self):
+            return {"step_wall_seconds": 100.0, "step_operations": {"kind": ["read", "write", "read"], "rows": [10, 5, 20],
+                                                                    "bytes": [100, 50, -1]}}
+
+    record = step_record(StepRun())
+    assert((record["queue_seconds"], record["execution_seconds"], record["startup_seconds"]) == (30.0, 120.0, 20.0))
+    assert((record["rows_read"], record["bytes_read"], record["rows_written"], record["bytes_written"]) == (30, 100, 5, 50))
+    with pytest.warns(UserWarning, match="même nombre de lignes"):
+        assert(_table_rows({"kind": ["read", "write"], "rows": [10]}) == [])
+
+
+def test_profiler_operations_step_record(backend: FakeAzureML, tmp_path):
+
+    from azureml_wrapper import PipelineWrapper
+    from azureml_wrapper.profiler import StepProfiler
+    pipeline = PipelineWrapper.from_config(pipeline_config(STEPS))
+    step_run = pipeline.submit("entrainement").run.get_steps()[0]
+    profiler = StepProfiler("prep")
+    profiler.add({"operation": "read:ventes", "kind": "read", "rows": None, "bytes": 800, "source": "cache"}, 0.5)
+    profiler.add({"operation": "read:clients", "kind": "read", "rows": 10, "bytes": None}, 0.0)
+    profiler.add({"operation": "write:data", "kind": "write", "rows": 30, "bytes": 300}, 1.0)
+    profiler.flush(step_run, None)
+    operations = step_run.get_metrics()["step_operations"]
+    assert(len({len(column) for column in operations.values()}) == 1)
+    record = step_record(step_run)
+    assert((record["rows_read"], record["bytes_read"], record["rows_written"], record["bytes_written"]) == (10, 800, 30, 300))
+
+
+def test_collect_and_compare_RunHistory(backend: FakeAzureML, tmp_path):
+
+    from azureml_wrapper import PipelineWrapper
+    path = str(tmp_path / "history.sqlite")
+    pipeline = PipelineWrapper.from_config(pipeline_config(STEPS, history=path))
+    pipeline.run("entrainement")
+    history = RunHistory(path)
+    assert(len(history.runs("entrainement")) == 1)
+    assert(sorted(history.steps("entrainement")["step_name"]) == ["fit", "prep"])
+    baseline_runs = [submit(pipeline, backend, 0.1, 1000) for _ in range(3)]
+    for run in baseline_runs:
+        history.collect(run)
+    slow_run = submit(pipeline, backend, 0.4, 1000)
+    history.collect(slow_run, "entrainement")
+    assert(history.baseline("entrainement")["runs"].tolist() == [5, 5])
+    comparison = history.compare(slow_run.id, window=3, min_seconds=0.0)
+    assert(set(comparison["metric"]) == {"queue_seconds", "startup_seconds", "execution_seconds", "rows_per_second", "bytes_per_second"})
+    regressions = history.regressions(slow_run.id, window=3, min_seconds=0.0)
+    assert({"execution_seconds", "rows_per_second"} <= set(regressions["metric"]))
+    assert(regressions["change"].notna().all())
+    assert(history.regressions(slow_run.id, window=3, min_seconds=60.0)["metric"].isin(["rows_per_second", "bytes_per_second"]).all())
+    assert(history.regressions(baseline_runs[-1].id, window=2, min_seconds=0.0).query("metric == 'execution_seconds'").empty)
+    with pytest.raises(KeyError, match="absente"):
+        history.compare("absente")
+    assert(isinstance(history.steps(step_name="fit"), pd.DataFrame))
+
+
+def test_repeated_step_names_RunHistory(backend: FakeAzureML, tmp_path):
+
+    from azureml_wrapper import PipelineWrapper
+    path = str(tmp_path / "history.sqlite")
+    steps = {f"score{i}": {"step_name": "score", "script_name": "score.py", "step_config": {"part": i}} for i in range(3)}
+    pipeline = PipelineWrapper.from_config(pipeline_config(steps, history=path))
+    assert([step.arguments[:2] for step in pipeline.steps] == [["--config", f'{{"part": {i}}}'] for i in range(3)])
+    pipeline.run("scoring")
+    history = RunHistory(path)
+    assert(history.steps("scoring")["step_name"].tolist() == ["score"] * 3)
+    run_id = history.runs("scoring")["run_id"].iloc[0]
+    assert(len(history.compare(run_id)) == 3 * 5)
@@ -0,0 +1,113 @@
+import json
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+from azureml_wrapper.data_formats import read_schema
+from azureml_wrapper.local_run import LocalRun
+from azureml_wrapper.script_wrapper import ScriptWrapper
+
+
+@pytest.fixture
+def script(tmp_path, monkeypatch):
+
+    spec_path = tmp_path / "run.json"
+    spec_path.write_text(json.dumps({"step_name": "step", "run_directory": str(tmp_path / "run"),
+                                     "input_datasets": {"ventes": str(tmp_path / "ventes.pkl")}}))
+    monkeypatch.setenv(LocalRun.ENV_VARIABLE, str(spec_path))
+    folder = str(tmp_path / "data")
+    monkeypatch.setattr(sys, "argv", ["step.py", "--config", json.dumps({"ventes": "ventes"}), "--input-folder", folder,
+                                      "--output-folder", folder])
+    return ScriptWrapper()
+
+
+@pytest.fixture
+def dataframe():
+
+    return pd.DataFrame({"id": [1, 2, 3, 4],
+                         "region": pd.Categorical(["QC", "ON", "QC", "BC"]),
+                         "date": pd.to_datetime(["2022-01-01", "2022-02-01", "2022-03-01", "2022-04-01"]),
+                         "montant": [10.5, 20.0, 30.25, 40.0]})
+
+
+def test_csv_schema_round_trip_ScriptWrapper(script: ScriptWrapper, dataframe: pd.DataFrame):
+
+    script.save_csv_in_output_folder(dataframe, "ventes")
+    path = os.path.join(script.output_folders["output_folder"], "ventes.csv")
+    assert(read_schema(path) == {"id": "int64", "region": "category", "date": str(dataframe["date"].dtype), "montant": "float64"})
+    loaded = script.get_csv_from_input_folder("ventes")
+    assert(loaded.dtypes.to_dict() == dataframe.dtypes.to_dict())
+    assert(loaded.equals(dataframe))
+    script.save_csv_in_output_folder(dataframe, "brut", persist_schema=False)
+    assert(read_schema(os.path.join(script.output_folders["output_folder"], "brut.csv")) is None)
+    assert(script.get_csv_from_input_folder("brut")["region"].dtype != "category")
+
+
+@pytest.mark.parametrize("format_name, compression", [("csv", "gzip"), ("parquet", "zstd"), ("arrow", "zstd")])
+def test_columns_filters_compression_ScriptWrapper(script: ScriptWrapper, dataframe: pd.DataFrame, format_name: str, compression: str):
+
+    script.save_in_output_folder(dataframe, "ventes", data_format=format_name, compression=compression)
+    loaded = script.get_from_input_folder("ventes", format_name, columns=["id", "region"], filters=[("montant", ">", 15), ("region", "in", ["QC"])])
+    assert(list(loaded.columns) == ["id", "region"])
+    assert(loaded["id"].tolist() == [3])
+    assert(isinstance(loaded["region"].dtype, pd.CategoricalDtype))
+    chunks = list(script.iter_from_input_folder("ventes", chunksize=2, data_format=format_name, columns=["id"], filters=[("id", "!=", 2)]))
+    assert(pd.concat(chunks)["id"].tolist() == [1, 3, 4])
+
+
+def test_optimize_on_read_ScriptWrapper(tmp_path, script: ScriptWrapper):
+
+    dataframe = pd.DataFrame([[1, -2, None], [3, 4, None]], columns=["a", "a", "vide"])
+    dataframe["vide"] = dataframe["vide"].astype("Int64")
+    dataframe.to_pickle(str(tmp_path / "ventes.pkl"))
+    optimized = script.get_csv_from_config("ventes", optimize=True)
+    assert(list(optimized.columns) == ["a", "a", "vide"])
+    assert(optimized.dtypes.astype(str).tolist() == ["uint8", "int8", "UInt8"])
+    assert(script.memory_reports["ventes"].loc["total", "bytes_after"] < script.memory_reports["ventes"].loc["total", "bytes_before"])
+    script.save_in_output_folder(optimized.iloc[:, 1:], "optimise", data_format="parquet")
+    loaded = script.get_from_input_folder("optimise", "parquet", optimize=True)
+    assert(loaded.dtypes.astype(str).tolist() == ["int8", "UInt8"])
+    assert(loaded["vide"].isna().all())
+    assert(script.profiler.records[-1]["memory_bytes_after"] <= script.profiler.records[-1]["memory_bytes_before"])
+
+
+@pytest.mark.parametrize("format_name", ["csv", "parquet", "arrow"])
+def test_output_writer_round_trip_ScriptWrapper(script: ScriptWrapper, dataframe: pd.DataFrame, format_name: str):
+
+    with script.open_output_writer("ventes", data_format=format_name) as writer:
+        for start in range(0, len(dataframe), 3):
+            writer.write(dataframe.iloc[start:start + 3])
+    assert(writer.rows == len(dataframe))
+    chunks = list(script.iter_from_input_folder("ventes", chunksize=2, data_format=format_name))
+    assert(all(len(chunk) <= 2 for chunk in chunks))
+    # Les catégories d'un morceau csv sont celles de ses lignes : la concaténation les réunit
+    assert(all(isinstance(chunk["region"].dtype, pd.CategoricalDtype) for chunk in chunks))
+    loaded = pd.concat(chunks, ignore_index=True).astype({"region": "category"})
+    assert(loaded.dtypes.to_dict() == dataframe.dtypes.to_dict())
+    assert(loaded.equals(dataframe))
+    assert(script.profiler.records[0]["rows"] == len(dataframe) and script.profiler.records[0]["kind"] == "write")
+
+
+@pytest.mark.parametrize("format_name", ["csv", "parquet"])
+def test_partitions_round_trip_ScriptWrapper(script: ScriptWrapper, dataframe: pd.DataFrame, format_name: str):
+
+    paths = [script.save_partition(dataframe.iloc[start:start + 2], "ventes", data_format=format_name) for start in (0, 2)]
+    assert(len(set(paths)) == 2 and all(os.path.dirname(path).endswith("ventes") for path in paths))
+    loaded = pd.concat(script.iter_partitions_from_input_folder("ventes"), ignore_index=True)
+    assert(loaded["id"].tolist() == [1, 2, 3, 4])
+    assert(loaded["date"].dtype == dataframe["date"].dtype and loaded["montant"].dtype == "float64")
+    filtered = pd.concat(script.iter_partitions_from_input_folder("ventes", columns=["id"], filters=[("montant", ">=", 20)]))
+    assert(filtered["id"].tolist() == [2, 3, 4] and list(filtered.columns) == ["id"])
+    with pytest.raises(FileNotFoundError):
+        list(script.iter_partitions_from_input_folder("absent"))
+
+
+def test_complete_keeps_trace_out_of_outputs_ScriptWrapper(tmp_path, script: ScriptWrapper, dataframe: pd.DataFrame):
+
+    (tmp_path / "run").mkdir()
+    script.save_in_output_folder(dataframe, "ventes", data_format="parquet")
+    trace_path = script.complete()
+    assert(trace_path == str(tmp_path / "run" / "outputs" / "_step_trace.json") and os.path.exists(str(trace_path)))
+    assert(sorted(os.listdir(script.output_folders["output_folder"])) == ["_checkpoint.json", "ventes.parquet"])
@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+from azureml_wrapper.snapshot import SnapshotBuilder
+
+
+@pytest.fixture
+def script_directory(tmp_path):
+
+    directory = tmp_path / "src"
+    (directory / "pkg").mkdir(parents=True)
+    (directory / "step.py").write_text("import os\nimport utils\nfrom pkg import helpers\nprint(helpers.VALUE)")
+    (directory / "other_step.py").write_text("import utils")
+    (directory / "utils.py").write_text("import pandas")
+    (directory / "pkg" / "__init__.py").write_text("")
+    (directory / "pkg" / "helpers.py").write_text("from .constants import VALUE")
+    (directory / "pkg" / "constants.py").write_text("VALUE = 1")
+    (directory / "unrelated.py").write_text("x = 1")
+    (directory / "config.json").write_text("{}")
+    return str(directory)
+
+
+def test_discover_SnapshotBuilder(tmp_path, script_directory: str):
+
+    builder = SnapshotBuilder(str(tmp_path / "snapshots"))
+    expected = {"step.py", "utils.py", os.path.join("pkg", "__init__.py"), os.path.join("pkg", "helpers.py"), os.path.join("pkg", "constants.py")}
+    assert(builder.discover(script_directory, "step.py") == expected)
+    snapshot = builder.build(script_directory, "step.py", ["config.json"])
+    assert(set(snapshot["files"]) == expected | {"config.json"})
+    assert(sorted(os.listdir(snapshot["path"])) == ["config.json", "pkg", "step.py", "utils.py"])
+    with pytest.raises(FileNotFoundError):
+        builder.build(script_directory, "step.py", ["missing.json"])
+
+
+def test_hash_and_reuse_SnapshotBuilder(tmp_path, script_directory: str):
+
+    snapshot = SnapshotBuilder(str(tmp_path / "snapshots")).build(script_directory, "step.py")
+    assert(not snapshot["reused"] and snapshot["size"] > 0)
+    with open(os.path.join(script_directory, "unrelated.py"), "w") as unrelated:
+        unrelated.write("x = 2")
+    rebuilt = SnapshotBuilder(str(tmp_path / "snapshots")).build(script_directory, "step.py")
+    assert(rebuilt["reused"] and rebuilt["hash"] == snapshot["hash"])
+    with open(os.path.join(script_directory, "pkg", "constants.py"), "w") as constants:
+        constants.write("VALUE = 2")
+    assert(SnapshotBuilder(str(tmp_path / "snapshots")).build(script_directory, "step.py")["hash"] != snapshot["hash"])
+    assert(SnapshotBuilder(str(tmp_path / "snapshots")).build(script_directory, "other_step.py")["files"] == ["other_step.py", "utils.py"])
+
+
+def test_same_builder_sees_changes_SnapshotBuilder(tmp_path, script_directory: str):
+
+    builder = SnapshotBuilder(str(tmp_path / "snapshots"))
+    snapshot = builder.build(script_directory, "step.py")
+    assert(builder.build(script_directory, "step.py")["reused"])
+    with open(os.path.join(script_directory, "step.py"), "a") as step:
+        step.write("\nprint('modifié')")
+    rebuilt = builder.build(script_directory, "step.py")
+    assert(not rebuilt["reused"] and rebuilt["hash"] != snapshot["hash"])
+    with open(os.path.join(rebuilt["path"], "step.py")) as step:
+        assert("modifié" in step.read())
@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+from azureml_wrapper.step_cache import StepCache
+
+
+@pytest.fixture
+def script_directory(tmp_path):
+
+    directory = tmp_path / "src"
+    directory.mkdir()
+    (directory / "step.py").write_text("import utils\nprint('step')")
+    (directory / "utils.py").write_text("VALUE = 1")
+    (directory / "other.py").write_text("print('other')")
+    return str(directory)
+
+
+def test_key_StepCache(tmp_path, script_directory: str):
+
+    cache = StepCache(str(tmp_path / "cache"))
+    key = cache.key(script_directory, "step.py", ["--config", '{"lr": 0.1}'], {"data": "data:1"})
+    assert(key == cache.key(script_directory, "step.py", ["--config", '{"lr": 0.1}'], {"data": "data:1"}))
+    assert(key != cache.key(script_directory, "step.py", ["--config", '{"lr": 0.2}'], {"data": "data:1"}))
+    assert(key != cache.key(script_directory, "step.py", ["--config", '{"lr": 0.1}'], {"data": "data:2"}))
+    with open(os.path.join(script_directory, "other.py"), "w") as other:
+        other.write("print('autre')")
+    assert(key == cache.key(script_directory, "step.py", ["--config", '{"lr": 0.1}'], {"data": "data:1"}))
+    with open(os.path.join(script_directory, "utils.py"), "w") as utils:
+        utils.write("VALUE = 2")
+    assert(key != cache.key(script_directory, "step.py", ["--config", '{"lr": 0.1}'], {"data": "data:1"}))
+    assert(key != cache.key(script_directory, "step.py", ["--config", '{"lr": 0.1}'], {"data": "data:1"}, ["other.py"]))
+
+
+def test_put_restore_evict_StepCache(tmp_path):
+
+    cache = StepCache(str(tmp_path / "cache"), max_size=150)
+    output = tmp_path / "output"
+    output.mkdir()
+    (output / "data.csv").write_text("a" * 100)
+    cache.put("key1", "step1", {"output": str(output)})
+    restored = tmp_path / "restored"
+    assert(cache.restore("key1", {"output": str(restored)}))
+    assert((restored / "data.csv").read_text() == "a" * 100)
+    assert(not cache.restore("missing", {"output": str(restored)}))
+    cache.put("key2", "step2", {"output": str(output)})
+    assert(list(cache.entries()) == ["key2"])
+    cache.invalidate(step_name="step2")
+    assert(cache.entries() == {})
+    with pytest.raises(ValueError):
+        cache.invalidate()